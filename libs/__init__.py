@@ -8,6 +8,11 @@ try:
 except Exception as e:
     print("{}: Failed to import `fw_common.libs.json`: {}'".format(e.__class__.__name__, e.message))
 
+try:
+    from . import mayaascii
+except Exception as e:
+    print("{}: Failed to import `fw_common.libs.mayaascii`: {}'".format(e.__class__.__name__, e.message))
+
 try:
     from . import system
 except Exception as e:
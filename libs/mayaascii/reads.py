@@ -0,0 +1,458 @@
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+#   AUTHORS :           Nicolas Dorey
+#                       Romain Leclerc
+#
+#   DESCRIPTION :       Streaming parser of maya ascii files (.ma), without maya.
+#                       Statements are read line by line: only the head of a statement is kept in memory,
+#                       big payloads (geometry arrays...) are skipped and indexed by byte offset.
+#                       Builds an index of requires, references, nodes, attributes, connections and relationships.
+#
+#   Update  1.0.0 :     We start here.
+#
+#   KnownBugs :         A string value ending with ; at the end of a line is read as the end of the statement.
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+
+from collections import OrderedDict
+import re
+import sys
+
+
+# bytes of a statement kept in memory, the rest is only indexed by offset
+HEAD_SIZE = 4096
+# values of setAttr bigger than this (in bytes) are not kept in the index, only their offset
+MAX_VALUE_SIZE = 1024
+
+FLAG_PATTERN = re.compile(r'-[A-Za-z]')
+TOKEN_PATTERN = re.compile(r'"((?:[^"\\]|\\.)*)"|([^\s;]+)')
+ESCAPES = {"n": "\n", "t": "\t", "r": "\r", '"': '"', "\\": "\\"}
+
+# flags taking an argument, for each command
+FLAGS_WITH_ARG = {
+    "createNode": set(["-n", "-name", "-p", "-parent"]),
+    "setAttr": set(["-k", "-keyable", "-l", "-lock", "-s", "-size", "-type", "-typ", "-ca", "-caching",
+                    "-ch", "-capacityHint", "-cb", "-channelBox"]),
+    "connectAttr": set(["-l", "-lock"]),
+    "file": set(["-rdi", "-referenceDepthInfo", "-ns", "-namespace", "-rfn", "-referenceNode", "-op", "-options",
+                 "-typ", "-type", "-dr", "-deferReference", "-shd", "-sharedNodes", "-rpr", "-renamingPrefix",
+                 "-gl", "-mnc"]),
+    "requires": set(["-nodeType", "-dataType"]),
+    "currentUnit": set(["-l", "-linear", "-a", "-angle", "-t", "-time"]),
+    "select": set([]),
+}
+
+
+def _to_text(data):
+    """
+    Lines are read as bytes: decode them in python 3, python 2 str are already text
+    """
+    if sys.version_info[0] >= 3 and isinstance(data, bytes):
+        return data.decode("utf-8", "replace")
+    return data
+
+
+def unescape(value):
+    """
+    :param: value => content of a maya ascii string, without quotes
+    :rtype: string
+    """
+    if "\\" not in value:
+        return value
+    return re.sub(r'\\(.)', lambda match: ESCAPES.get(match.group(1), match.group(1)), value)
+
+
+def tokenize(text):
+    """
+    Split a statement in tokens.
+    :param: text
+    :return: tokens => list of (value, quoted)
+    :rtype: list
+    """
+    tokens = []
+    for match in TOKEN_PATTERN.finditer(text):
+        if match.group(2) is not None:
+            tokens.append((match.group(2), False))
+        else:
+            tokens.append((unescape(match.group(1)), True))
+    return tokens
+
+
+def split_flags(tokens, flags_with_arg):
+    """
+    :param: tokens => from tokenize, without the command
+    :param: flags_with_arg => flags followed by a value
+    :return: flags => {flag: value or True}, positionals => values which are not flags
+    :rtype: tuple
+    """
+    flags = OrderedDict()
+    positionals = []
+    idx = 0
+    while idx < len(tokens):
+        value, quoted = tokens[idx]
+        # negative numbers are values, not flags
+        if not quoted and FLAG_PATTERN.match(value):
+            if value in flags_with_arg and idx + 1 < len(tokens):
+                flags[value] = tokens[idx + 1][0]
+                idx += 2
+                continue
+            flags[value] = True
+        else:
+            positionals.append(value)
+        idx += 1
+    return flags, positionals
+
+
+class Statement(object):
+    """
+    One statement of a maya ascii file.
+    head => first HEAD_SIZE bytes (text), offset/length => position of the whole statement in file, in bytes
+    """
+    __slots__ = ("head", "offset", "length", "truncated")
+
+    def __init__(self, head, offset, length, truncated):
+        self.head = head
+        self.offset = offset
+        self.length = length
+        self.truncated = truncated
+
+    @property
+    def command(self):
+        return self.head.split(None, 1)[0] if self.head.strip() else ""
+
+    def get_tokens(self):
+        """
+        :return: tokens of head without the command. Last token is dropped if head is truncated.
+        :rtype: list
+        """
+        tokens = tokenize(self.head)[1:]
+        if self.truncated and tokens:
+            tokens = tokens[:-1]
+        return tokens
+
+
+def iter_statements(input_file, head_size=HEAD_SIZE):
+    """
+    Yield statements of a maya ascii file opened in binary mode.
+    Memory doesnt depend on statement size: only head_size bytes of each statement are kept.
+    :param: input_file => file object opened with 'rb'
+    :param: head_size
+    """
+    offset = 0
+    start = None
+    head_parts = []
+    head_length = 0
+    for line in input_file:
+        line_length = len(line)
+        if start is None:
+            stripped = line.strip()
+            # empty lines and comments between statements
+            if not stripped or stripped.startswith(b"//"):
+                offset += line_length
+                continue
+            start = offset
+        if head_length < head_size:
+            part = line[:head_size - head_length]
+            head_parts.append(part)
+            head_length += len(part)
+        offset += line_length
+        if line.rstrip().endswith(b";"):
+            yield Statement(_to_text(b"".join(head_parts)), start, offset - start, offset - start > head_length)
+            start = None
+            head_parts = []
+            head_length = 0
+    if start is not None:
+        yield Statement(_to_text(b"".join(head_parts)), start, offset - start, offset - start > head_length)
+
+
+def read_statement(file_path, offset, length):
+    """
+    Read a whole statement, for ex a payload skipped by the index.
+    :param: file_path
+    :param: offset, length => from Statement or from attributes of SceneIndex
+    :rtype: string
+    """
+    with open(file_path, "rb") as input_file:
+        input_file.seek(offset)
+        return _to_text(input_file.read(length))
+
+
+class SceneIndex(object):
+    """
+    Content of a maya ascii file:
+    requires      => list of {"plugin", "version", "node_types", "data_types"}
+    references    => list of {"path", "namespace", "reference_node", "type", "deferred", "depth_info", "offset"}
+    nodes         => {path: {"name", "type", "parent", "path", "shared", "offset", "attributes"}}
+                     attributes => {name: {"type", "size", "offset", "length", "values"}}, values is None if skipped
+    connections   => list of (source plug, destination plug)
+    relationships => list of [relationship, members...]
+    units         => currentUnit flags, {"linear", "angle", "time"}
+    file_info     => fileInfo values
+    commands      => nb of statements of each command
+    """
+    def __init__(self, file_path=None):
+        self.file_path = file_path
+        self.requires = []
+        self.references = []
+        self.nodes = OrderedDict()
+        self.connections = []
+        self.relationships = []
+        self.units = {}
+        self.file_info = OrderedDict()
+        self.commands = {}
+        self.node_paths = {}
+
+    def get_node_path(self, name):
+        """
+        :param: name => name or partial path of a node, as written in .ma or as returned by maya (|a|b)
+        :return: full path of node, name itself if unknown
+        :rtype: string
+        """
+        if name in self.node_paths:
+            return self.node_paths[name]
+        return self.node_paths.get(name.lstrip("|"), name)
+
+    def register_node(self, node):
+        """
+        Full path of node can be found from every partial path of it: c, b|c, a|b|c, |a|b|c
+        """
+        self.nodes[node["path"]] = node
+        parts = node["path"].lstrip("|").split("|")
+        for idx in range(len(parts)):
+            self.node_paths["|".join(parts[idx:])] = node["path"]
+        self.node_paths[node["path"]] = node["path"]
+
+    def get_nodes_by_type(self, node_type):
+        """
+        :rtype: list
+        """
+        return [node for node in self.nodes.values() if node["type"] == node_type]
+
+    def get_node_types(self):
+        """
+        :return: nb of nodes of each type
+        :rtype: dict
+        """
+        node_types = {}
+        for node in self.nodes.values():
+            if node["type"] is not None:
+                node_types[node["type"]] = node_types.get(node["type"], 0) + 1
+        return node_types
+
+    def get_attribute(self, node_path, attribute):
+        """
+        :return: attribute of node, None if not set in file
+        :rtype: dict
+        """
+        node = self.nodes.get(self.get_node_path(node_path))
+        if node is None:
+            return None
+        return node["attributes"].get(attribute)
+
+    def to_dict(self):
+        """
+        :return: index as json compatible dict
+        :rtype: dict
+        """
+        return {"file_path": self.file_path,
+                "requires": self.requires,
+                "references": self.references,
+                "nodes": list(self.nodes.values()),
+                "connections": self.connections,
+                "relationships": self.relationships,
+                "units": self.units,
+                "file_info": self.file_info,
+                "commands": self.commands}
+
+
+def get_array_size(node, attribute):
+    """
+    Nb of elements of an array attribute, from headers of its setAttr: sizes (-s) and index ranges ([0:7]).
+    Values dont need to be kept in the index.
+    :param: node => node of SceneIndex
+    :param: attribute => for ex ".vt", ".fc", ".uvst[0].uvsp"
+    :return: size, None if attribute is not set in file
+    :rtype: int
+    """
+    pattern = re.compile(r"{}\[(\d+)(?::(\d+))?\]$".format(re.escape(attribute)))
+    size = None
+    for name, values in node["attributes"].items():
+        if name == attribute:
+            size = max(size or 0, values["size"] or 0)
+            continue
+        match = pattern.match(name)
+        if match is None:
+            continue
+        last = int(match.group(2) if match.group(2) is not None else match.group(1))
+        size = max(size or 0, last + 1, values["size"] or 0)
+    return size
+
+
+class SceneParser(object):
+    """
+    Build a SceneIndex from statements of a maya ascii file.
+    Ex:
+        index = SceneParser().parse(file_path)
+        meshes = index.get_nodes_by_type("mesh")
+    """
+    def __init__(self, keep_attributes=True, max_value_size=MAX_VALUE_SIZE, head_size=HEAD_SIZE,
+                 attribute_node_types=None):
+        """
+        :param: keep_attributes => False to skip setAttr statements (faster, for references only for ex)
+        :param: max_value_size => values of statements bigger than this are not kept, only their offset
+        :param: head_size => bytes of each statement kept in memory
+        :param: attribute_node_types => only keep attributes of nodes of these types, None for all nodes
+        """
+        self.keep_attributes = keep_attributes
+        self.attribute_node_types = set(attribute_node_types) if attribute_node_types is not None else None
+        self.max_value_size = max_value_size
+        self.head_size = head_size
+        self.index = None
+        self.current_node = None
+
+    def parse(self, file_path, until=None):
+        """
+        :param: file_path => .ma file
+        :param: until => command stopping the parsing, for ex "createNode" to only read the header
+        :rtype: SceneIndex
+        """
+        with open(file_path, "rb") as input_file:
+            return self.parse_file(input_file, file_path=file_path, until=until)
+
+    def parse_file(self, input_file, file_path=None, until=None):
+        """
+        :param: input_file => file object opened with 'rb'
+        :param: until => command stopping the parsing, None to read the whole file
+        :rtype: SceneIndex
+        """
+        self.index = SceneIndex(file_path)
+        self.current_node = None
+        for statement in iter_statements(input_file, head_size=self.head_size):
+            if until is not None and statement.command == until:
+                break
+            self.add_statement(statement)
+        return self.index
+
+    def add_statement(self, statement):
+        command = statement.command
+        self.index.commands[command] = self.index.commands.get(command, 0) + 1
+        if command == "setAttr":
+            if self.keep_attributes:
+                self.add_set_attr(statement)
+            return
+        method = getattr(self, "add_{}".format(command), None)
+        if method is not None:
+            flags, positionals = split_flags(statement.get_tokens(), FLAGS_WITH_ARG.get(command, set()))
+            method(statement, flags, positionals)
+
+    def add_createNode(self, statement, flags, positionals):
+        name = flags.get("-n", flags.get("-name"))
+        parent = flags.get("-p", flags.get("-parent"))
+        node_type = positionals[0] if positionals else None
+        if parent:
+            parent = self.index.get_node_path(parent)
+        path = name
+        if parent:
+            path = "{}|{}".format(parent, name)
+        node = {"name": name, "type": node_type, "parent": parent, "path": path,
+                "shared": "-s" in flags or "-shared" in flags, "offset": statement.offset, "attributes": OrderedDict()}
+        self.index.register_node(node)
+        self.current_node = node
+
+    def add_select(self, statement, flags, positionals):
+        """
+        select -ne :time1; => next setAttr are on an existing node
+        """
+        if not positionals:
+            self.current_node = None
+            return
+        name = positionals[0]
+        path = self.index.get_node_path(name)
+        node = self.index.nodes.get(path)
+        if node is None:
+            node = {"name": name, "type": None, "parent": None, "path": path,
+                    "shared": True, "offset": statement.offset, "attributes": OrderedDict()}
+            self.index.register_node(node)
+        self.current_node = node
+
+    def add_set_attr(self, statement):
+        if self.current_node is None:
+            return
+        if self.attribute_node_types is not None and self.current_node["type"] not in self.attribute_node_types:
+            return
+        # only the beginning is read: attribute and flags are before the values
+        flags, positionals = split_flags(statement.get_tokens(), FLAGS_WITH_ARG["setAttr"])
+        if not positionals:
+            return
+        attribute = positionals[0]
+        values = None
+        if statement.length <= self.max_value_size and not statement.truncated:
+            values = positionals[1:]
+        size = flags.get("-s", flags.get("-size"))
+        self.current_node["attributes"][attribute] = {
+            "type": flags.get("-type", flags.get("-typ")),
+            "size": int(size) if size is not None and size.isdigit() else None,
+            "offset": statement.offset,
+            "length": statement.length,
+            "values": values}
+
+    def add_connectAttr(self, statement, flags, positionals):
+        if len(positionals) >= 2:
+            self.index.connections.append((positionals[0], positionals[1]))
+
+    def add_relationship(self, statement, flags, positionals):
+        if positionals:
+            self.index.relationships.append(positionals)
+
+    def add_requires(self, statement, flags, positionals):
+        self.index.requires.append({
+            "plugin": positionals[0] if positionals else None,
+            "version": positionals[1] if len(positionals) > 1 else None,
+            "node_types": [flags["-nodeType"]] if "-nodeType" in flags else [],
+            "data_types": [flags["-dataType"]] if "-dataType" in flags else []})
+
+    def add_file(self, statement, flags, positionals):
+        """
+        file -rdi 1 -ns "ns" -rfn "nsRN" "path"; => reference depth info in header
+        file -r -ns "ns" -dr 1 -rfn "nsRN" "path"; => reference
+        """
+        if "-r" not in flags and "-reference" not in flags and "-rdi" not in flags:
+            return
+        self.index.references.append({
+            "path": positionals[-1] if positionals else None,
+            "namespace": flags.get("-ns", flags.get("-namespace")),
+            "reference_node": flags.get("-rfn", flags.get("-referenceNode")),
+            "type": flags.get("-typ", flags.get("-type")),
+            "deferred": flags.get("-dr", flags.get("-deferReference")) in ("1", "on", "true"),
+            "depth_info": flags.get("-rdi", flags.get("-referenceDepthInfo")),
+            "offset": statement.offset})
+
+    def add_currentUnit(self, statement, flags, positionals):
+        for short_flag, long_flag, key in (("-l", "-linear", "linear"), ("-a", "-angle", "angle"), ("-t", "-time", "time")):
+            value = flags.get(short_flag, flags.get(long_flag))
+            if value is not None:
+                self.index.units[key] = value
+
+    def add_fileInfo(self, statement, flags, positionals):
+        if len(positionals) >= 2:
+            self.index.file_info[positionals[0]] = positionals[1]
+
+
+def parse_scene(file_path, keep_attributes=True, max_value_size=MAX_VALUE_SIZE, attribute_node_types=None):
+    """
+    :param: file_path => .ma file
+    :param: attribute_node_types => only keep attributes of nodes of these types, None for all nodes
+    :rtype: SceneIndex
+    """
+    return SceneParser(keep_attributes=keep_attributes, max_value_size=max_value_size,
+                       attribute_node_types=attribute_node_types).parse(file_path)
+
+
+def parse_references(file_path):
+    """
+    References of a .ma file. They are written before the nodes: only the header of file is read.
+    :param: file_path => .ma file
+    :return: references => see SceneIndex.references
+    :rtype: list
+    """
+    return SceneParser(keep_attributes=False).parse(file_path, until="createNode").references
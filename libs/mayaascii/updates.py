@@ -0,0 +1,517 @@
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+#   AUTHORS :           Nicolas Dorey
+#                       Romain Leclerc
+#
+#   DESCRIPTION :       Remap paths of maya ascii files (.ma), without maya.
+#                       Only statements holding a path are edited: file -r, file textures, caches, proxies...
+#                       Old roots are found with a prefix tree of the mapping table, everything else of the file
+#                       is copied byte for byte, and files without anything to remap are not written.
+#                       Paths still using an obsolete root are reported in the same pass.
+#
+#   Update  1.0.0 :     We start here.
+#           1.0.1 :     Paths of roots which should be remapped but are not in the mapping table are reported.
+#
+#   KnownBugs :         A path statement bigger than reads.HEAD_SIZE is not remapped (a warning is returned).
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+
+import logging
+import multiprocessing
+import re
+import sys
+
+from ..system import updates as system_updates
+from . import reads
+
+
+# string attributes holding a path, for each node type
+PATH_ATTRIBUTES = {
+    "file": set([".ftn", ".fileTextureName"]),
+    "imagePlane": set([".imn", ".imageName"]),
+    "audio": set([".f", ".filename"]),
+    "cacheFile": set([".cp", ".cachePath"]),
+    "AlembicNode": set([".fn", ".abc_File"]),
+    "gpuCache": set([".cfn", ".cacheFileName"]),
+    "aiStandIn": set([".dso"]),
+    "aiImage": set([".filename"]),
+    "RedshiftProxyMesh": set([".fp", ".fileName"]),
+    "RedshiftVolumeShape": set([".fp", ".fileName"]),
+    "RedshiftNormalMap": set([".tex0"]),
+    "RedshiftSprite": set([".tex0"]),
+    "RedshiftDomeLight": set([".tex0"]),
+}
+MAYA_ESCAPES = {"\\": "\\\\", '"': '\\"', "\n": "\\n", "\t": "\\t", "\r": "\\r"}
+# size of chunks copied from a file to its remapped version
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# remapper of each worker process, see init_worker
+worker_remapper = None
+
+
+def escape(value):
+    """
+    :param: value => text to write between quotes in a maya ascii file
+    :rtype: string
+    """
+    return "".join(MAYA_ESCAPES.get(char, char) for char in value)
+
+
+def _normalize_char(char):
+    """
+    Paths are compared without case and separators differences
+    """
+    return "/" if char == "\\" else char.lower()
+
+
+class PrefixTrie(object):
+    """
+    Ordered table of prefixes, as a prefix tree: a path is compared to all prefixes in one walk over its chars.
+    Ex:
+        trie = PrefixTrie([("P:/Pirata2/", "L:/PirataEtCapitano02/"), ("C:", None)])
+        trie.lookup("p:\\pirata2\\assets\\Hero.ma") => 11, "L:/PirataEtCapitano02/"
+    """
+    def __init__(self, table=None):
+        """
+        :param: table => list of (prefix, value), when many prefixes start a path, the first one in table is used
+        """
+        self.root = {}
+        self.size = 0
+        for prefix, value in table or []:
+            self.add(prefix, value)
+
+    def add(self, prefix, value):
+        node = self.root
+        for char in prefix:
+            node = node.setdefault(_normalize_char(char), {})
+        # first one in table order wins
+        if None not in node:
+            node[None] = (self.size, value)
+        self.size += 1
+
+    def lookup(self, path):
+        """
+        :param: path
+        :return: length of prefix found in path, value of prefix => None, None if no prefix starts path
+        :rtype: tuple
+        """
+        node = self.root
+        found = None
+        for idx, char in enumerate(path):
+            node = node.get(_normalize_char(char))
+            if node is None:
+                break
+            if None in node:
+                order, value = node[None]
+                if found is None or order < found[0]:
+                    found = (order, idx + 1, value)
+        if found is None:
+            return None, None
+        return found[1], found[2]
+
+
+class PathRemapper(object):
+    """
+    Ex:
+        remapper = PathRemapper([("P:/Pirata2/", "L:/PirataEtCapitano02/")], obsolete_roots=["SCALE3", "C:"],
+                                unmapped_roots=["P:"])
+        result = remapper.remap_file(path, write=True)
+    """
+    def __init__(self, mapping, obsolete_roots=None, path_attributes=None, unmapped_roots=None):
+        """
+        :param: mapping => ordered list of (old prefix, new prefix)
+        :param: obsolete_roots => strings paths shouldnt contain anymore
+        :param: path_attributes => {node type: attributes holding a path}, PATH_ATTRIBUTES by default
+        :param: unmapped_roots => roots which should all be remapped: paths starting with one of them
+                                  but no prefix of mapping are reported in result["unmapped"]
+        """
+        self.mapping = [(old_prefix, new_prefix) for old_prefix, new_prefix in mapping]
+        self.trie = PrefixTrie(self.mapping)
+        self.unmapped_trie = PrefixTrie([(root, root) for root in unmapped_roots or []])
+        self.obsolete_roots = list(obsolete_roots or [])
+        # all obsolete roots are looked for in one search
+        self.obsolete_pattern = None
+        if self.obsolete_roots:
+            self.obsolete_pattern = re.compile("|".join(re.escape(root) for root in
+                                                        sorted(self.obsolete_roots, key=len, reverse=True)))
+        self.path_attributes = path_attributes if path_attributes is not None else PATH_ATTRIBUTES
+
+    def remap_path(self, path):
+        """
+        :param: path
+        :return: path with its old prefix replaced, None if no prefix of mapping starts path
+        :rtype: string
+        """
+        length, new_prefix = self.trie.lookup(path)
+        if length is None:
+            return None
+        return new_prefix + path[length:]
+
+    def get_obsolete_roots(self, path):
+        """
+        :return: obsolete roots found in path
+        :rtype: list
+        """
+        if self.obsolete_pattern is None:
+            return []
+        return sorted(set(self.obsolete_pattern.findall(path)))
+
+    def is_path_statement(self, statement, node_type):
+        """
+        :param: statement => reads.Statement
+        :param: node_type => type of node the setAttr are applied on
+        :rtype: boolean
+        """
+        command = statement.command
+        if command == "file":
+            return True
+        if command != "setAttr" or node_type not in self.path_attributes:
+            return False
+        flags, positionals = reads.split_flags(statement.get_tokens(), reads.FLAGS_WITH_ARG["setAttr"])
+        return bool(positionals) and positionals[0] in self.path_attributes[node_type]
+
+    def get_edits(self, file_path):
+        """
+        Read file_path once, and find how its path statements have to change.
+        :param: file_path => .ma file
+        :return: edits => list of (offset, length, new bytes),
+                 result => {"remapped": [(old, new)], "obsolete": [(root, path)], "unmapped": [path], "warnings"}
+        :rtype: tuple
+        """
+        edits = []
+        result = {"remapped": [], "obsolete": [], "unmapped": [], "warnings": []}
+        node_type = None
+        with open(file_path, "rb") as input_file:
+            for statement in reads.iter_statements(input_file):
+                command = statement.command
+                if command == "createNode":
+                    flags, positionals = reads.split_flags(statement.get_tokens(), reads.FLAGS_WITH_ARG["createNode"])
+                    node_type = positionals[0] if positionals else None
+                    continue
+                if command == "select":
+                    node_type = None
+                    continue
+                if not self.is_path_statement(statement, node_type):
+                    continue
+                if statement.truncated:
+                    result["warnings"].append('Statement at byte {} is too big to be remapped'.format(statement.offset))
+                    continue
+                edit = self.get_statement_edit(statement, result)
+                if edit is not None:
+                    edits.append(edit)
+        return edits, result
+
+    def get_statement_edit(self, statement, result):
+        """
+        :param: statement => path statement, not truncated
+        :param: result => remapped paths and obsolete roots found are added to it
+        :return: (offset, length, new bytes), None if statement doesnt change
+        :rtype: tuple
+        """
+        text = statement.head
+        # path is the last string of file and setAttr statements
+        matches = [match for match in reads.TOKEN_PATTERN.finditer(text) if match.group(1) is not None]
+        if not matches:
+            return None
+        match = matches[-1]
+        path = reads.unescape(match.group(1))
+        new_path = self.remap_path(path)
+        for root in self.get_obsolete_roots(new_path if new_path is not None else path):
+            result["obsolete"].append((root, new_path if new_path is not None else path))
+        if new_path is None and self.unmapped_trie.lookup(path)[0] is not None:
+            result["unmapped"].append(path)
+        if new_path is None or new_path == path:
+            return None
+
+        data = text[:match.start(1)] + escape(new_path) + text[match.end(1):]
+        if sys.version_info[0] >= 3:
+            if len(text.encode("utf-8")) != statement.length:
+                # not utf-8, it cant be written back as it was read
+                result["warnings"].append('Statement at byte {} is not utf-8, it is not remapped'.format(statement.offset))
+                return None
+            data = data.encode("utf-8")
+        result["remapped"].append((path, new_path))
+        return statement.offset, statement.length, data
+
+    def remap_file(self, file_path, write=False):
+        """
+        :param: file_path => .ma file
+        :param: write => False to only report what would change
+        :return: result => {"path", "remapped": [(old, new)], "obsolete": [(root, path)], "unmapped": [path],
+                            "warnings", "updated"}
+        :rtype: dict
+        """
+        edits, result = self.get_edits(file_path)
+        result["path"] = file_path
+        result["updated"] = False
+        if write and edits:
+            write_edits(file_path, edits)
+            result["updated"] = True
+        return result
+
+
+def write_edits(file_path, edits, output_path=None):
+    """
+    Rewrite file_path with edits: bytes between edits are copied as they are.
+    File is written in a temp file moved over file_path (or output_path).
+    :param: file_path
+    :param: edits => sorted list of (offset, length, new bytes), length is 0 to insert bytes
+    :param: output_path => where to write, None to rewrite file_path
+    """
+    with open(file_path, "rb") as input_file:
+        with system_updates.AtomicFile(output_path or file_path, mode="wb") as output_file:
+            position = 0
+            for offset, length, data in edits:
+                if offset < position:
+                    # inside bytes already replaced
+                    continue
+                _copy_bytes(input_file, output_file, offset - position)
+                output_file.write(data)
+                input_file.seek(length, 1)
+                position = offset + length
+            while True:
+                chunk = input_file.read(COPY_CHUNK_SIZE)
+                if not chunk:
+                    break
+                output_file.write(chunk)
+            output_file.commit()
+
+
+def _copy_bytes(input_file, output_file, size):
+    while size > 0:
+        chunk = input_file.read(min(size, COPY_CHUNK_SIZE))
+        if not chunk:
+            break
+        output_file.write(chunk)
+        size -= len(chunk)
+
+
+def _to_bytes(text):
+    """
+    Edits are written in a binary file: encode text in python 3, python 2 str are already bytes
+    """
+    if sys.version_info[0] >= 3 and not isinstance(text, bytes):
+        return text.encode("utf-8")
+    return text
+
+
+class SceneFilter(object):
+    """
+    Statements of a maya ascii file read once, to write many filtered versions of it:
+    nodes deleted with their attributes and connections, attributes set, all other bytes copied as they are.
+    Ex:
+        scene_filter = SceneFilter(file_path)
+        edits = scene_filter.get_delete_edits(scene_filter.get_nodes_to_delete(["shot02_cam", "shot02_shot"]))
+        edits += scene_filter.get_set_attr_edits(":defaultRenderGlobals", [(".fs", "1001"), (".ef", "1050")])
+        scene_filter.write(output_path, edits)
+    """
+    # statements applied on the node created / selected before them
+    NODE_COMMANDS = set(["setAttr", "addAttr", "rename", "lockNode"])
+    # statements linking nodes
+    LINK_COMMANDS = set(["connectAttr", "disconnectAttr", "relationship", "parent"])
+
+    def __init__(self, file_path):
+        """
+        :param: file_path => .ma file, read once
+        """
+        self.file_path = file_path
+        self.index = reads.SceneIndex(file_path)
+        # node path => [(offset, length)] of its createNode / select and attributes statements
+        self.node_blocks = {}
+        # (node path, attribute) => [(offset, length)] of setAttr statements
+        self.attributes = {}
+        # (offset, length, node paths) of connections, relationships...
+        self.links = []
+        self.size = 0
+        self.read()
+
+    def read(self):
+        current_node = None
+        with open(self.file_path, "rb") as input_file:
+            for statement in reads.iter_statements(input_file):
+                command = statement.command
+                position = (statement.offset, statement.length)
+                if command in ("createNode", "select"):
+                    current_node = self.add_node(statement)
+                    if current_node is not None:
+                        self.node_blocks.setdefault(current_node, []).append(position)
+                elif command in self.NODE_COMMANDS:
+                    if current_node is None:
+                        continue
+                    self.node_blocks[current_node].append(position)
+                    if command == "setAttr":
+                        flags, positionals = reads.split_flags(statement.get_tokens(), reads.FLAGS_WITH_ARG["setAttr"])
+                        if positionals:
+                            self.attributes.setdefault((current_node, positionals[0]), []).append(position)
+                else:
+                    current_node = None
+                    if command in self.LINK_COMMANDS:
+                        flags, positionals = reads.split_flags(statement.get_tokens(), set(["-l", "-lock"]))
+                        nodes = [self.index.get_node_path(value.split(".")[0]) for value in positionals]
+                        self.links.append((statement.offset, statement.length, nodes))
+            input_file.seek(0, 2)
+            self.size = input_file.tell()
+
+    def add_node(self, statement):
+        """
+        :return: path of node created or selected by statement, None if select has no node
+        :rtype: string
+        """
+        command = statement.command
+        flags, positionals = reads.split_flags(statement.get_tokens(), reads.FLAGS_WITH_ARG[command])
+        if command == "select":
+            if not positionals:
+                return None
+            path = self.index.get_node_path(positionals[0])
+            if path not in self.index.nodes:
+                self.index.register_node({"name": positionals[0], "type": None, "parent": None, "path": path,
+                                          "shared": True, "offset": statement.offset, "attributes": {}})
+            return path
+        name = flags.get("-n", flags.get("-name"))
+        parent = flags.get("-p", flags.get("-parent"))
+        if parent:
+            parent = self.index.get_node_path(parent)
+        path = "{}|{}".format(parent, name) if parent else name
+        self.index.register_node({"name": name, "type": positionals[0] if positionals else None, "parent": parent,
+                                  "path": path, "shared": "-s" in flags or "-shared" in flags,
+                                  "offset": statement.offset, "attributes": {}})
+        return path
+
+    def get_nodes_to_delete(self, names):
+        """
+        Nodes deleted like cmds.delete: nodes, their children, and anim curves only driving them.
+        :param: names => names or paths of nodes
+        :return: node paths
+        :rtype: set
+        """
+        paths = set(self.index.get_node_path(name) for name in names)
+        paths = set(path for path in paths if path in self.index.nodes)
+        prefixes = tuple("{}|".format(path) for path in paths)
+        if prefixes:
+            paths.update(path for path in self.index.nodes if path.startswith(prefixes))
+        # anim curves connected to deleted nodes only
+        destinations = {}
+        for offset, length, nodes in self.links:
+            if len(nodes) == 2:
+                destinations.setdefault(nodes[0], set()).add(nodes[1])
+        for source, source_destinations in destinations.items():
+            node_type = self.index.nodes[source]["type"] if source in self.index.nodes else None
+            if node_type and node_type.startswith("animCurve") and source_destinations <= paths:
+                paths.add(source)
+        return paths
+
+    def get_delete_edits(self, node_paths):
+        """
+        :param: node_paths => from get_nodes_to_delete
+        :return: edits removing statements of nodes, and statements linking them
+        :rtype: list
+        """
+        edits = []
+        for path in node_paths:
+            edits.extend((offset, length, b"") for offset, length in self.node_blocks.get(path, []))
+        edits.extend((offset, length, b"") for offset, length, nodes in self.links
+                     if any(node in node_paths for node in nodes))
+        return edits
+
+    def get_append_edits(self, node_name, statements):
+        """
+        Add statements at the end of the statements of node, for ex setAttr -l on ".tx".
+        A select of node is added at the end of file if node has no statement.
+        :param: node_name => name or path of node
+        :param: statements => texts of statements, without line break
+        :return: edits
+        :rtype: list
+        """
+        path = self.index.get_node_path(node_name)
+        data = "".join("\t{}\n".format(statement) for statement in statements)
+        blocks = self.node_blocks.get(path)
+        if blocks:
+            offset, length = blocks[-1]
+            return [(offset + length, 0, _to_bytes(data))]
+        return [(self.size, 0, _to_bytes("select -ne {};\n{}".format(node_name, data)))]
+
+    def get_set_attr_edits(self, node_name, values):
+        """
+        Replace setAttr statements of attributes of node, or add them.
+        :param: node_name => name or path of node
+        :param: values => list of (attribute as written in file, value as written in file), like (".fs", "1001")
+        :return: edits
+        :rtype: list
+        """
+        path = self.index.get_node_path(node_name)
+        edits = []
+        for attribute, value in values:
+            edits.extend((offset, length, b"") for offset, length in self.attributes.get((path, attribute), []))
+        edits.extend(self.get_append_edits(node_name, ['setAttr "{}" {};'.format(attribute, value)
+                                                       for attribute, value in values]))
+        return edits
+
+    def read_attribute(self, node_name, attribute):
+        """
+        :return: text of last setAttr statement of attribute, None if not set in file
+        :rtype: string
+        """
+        positions = self.attributes.get((self.index.get_node_path(node_name), attribute))
+        if not positions:
+            return None
+        offset, length = positions[-1]
+        return reads.read_statement(self.file_path, offset, length)
+
+    def write(self, output_path, edits):
+        """
+        :param: output_path => filtered .ma
+        :param: edits => from get_*_edits, in any order
+        """
+        # insertions stay before deletions at the same offset
+        write_edits(self.file_path, sorted(edits, key=lambda edit: (edit[0], edit[1])), output_path=output_path)
+
+
+def init_worker(mapping, obsolete_roots, unmapped_roots=None):
+    """
+    Initializer of worker processes: build the remapper once
+    """
+    global worker_remapper
+    worker_remapper = PathRemapper(mapping, obsolete_roots=obsolete_roots, unmapped_roots=unmapped_roots)
+
+
+def remap_file_job(job):
+    """
+    Work of one file in a worker process.
+    :param: job => (file_path, write)
+    :rtype: dict
+    """
+    file_path, write = job
+    try:
+        return worker_remapper.remap_file(file_path, write=write)
+    except (IOError, OSError) as e:
+        return {"path": file_path, "remapped": [], "obsolete": [], "unmapped": [], "warnings": [str(e)], "updated": False}
+
+
+def remap_files(files_path_list, mapping, obsolete_roots=None, write=False, processes=None, unmapped_roots=None):
+    """
+    Remap paths of all files, shared between processes.
+    Processes re-import the main module on windows: call it under if __name__ == "__main__".
+    :param: files_path_list => .ma files
+    :param: mapping => ordered list of (old prefix, new prefix)
+    :param: obsolete_roots => strings paths shouldnt contain anymore
+    :param: unmapped_roots => roots which should all be remapped, see PathRemapper
+    :param: write => False to only report what would change
+    :param: processes => nb of processes, None for nb of cpus, 0 or 1 to stay in current process
+    :return: results => one per file, same order as files_path_list, see PathRemapper.remap_file
+    :rtype: list
+    """
+    jobs = [(file_path, write) for file_path in files_path_list]
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    processes = min(processes, len(jobs))
+    if processes <= 1:
+        init_worker(mapping, obsolete_roots, unmapped_roots)
+        return [remap_file_job(job) for job in jobs]
+
+    logging.info("Remapping {} files on {} processes".format(len(jobs), processes))
+    pool = multiprocessing.Pool(processes, initializer=init_worker, initargs=(mapping, obsolete_roots, unmapped_roots))
+    try:
+        return pool.map(remap_file_job, jobs, max(1, len(jobs) // (processes * 8)))
+    finally:
+        pool.close()
+        pool.join()
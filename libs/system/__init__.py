@@ -3,6 +3,11 @@ try:
 except Exception as e:
     print("{}: Failed to import `fw_common.system.reads`: {}'".format(e.__class__.__name__, e.message))
 
+try:
+    from . import crawler
+except Exception as e:
+    print("{}: Failed to import `fw_common.system.crawler`: {}'".format(e.__class__.__name__, e.message))
+
 try:
     from . import creates
 except Exception as e:
@@ -0,0 +1,252 @@
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+#   AUTHORS :           Nicolas Dorey
+#                       Romain Leclerc
+#
+#   DESCRIPTION :       Directory crawler shared by our tools.
+#                       Folders of a same depth are listed concurrently (network storage is latency bound),
+#                       filters are applied on directory entries, and a manifest of files (path, size, mtime)
+#                       can be saved: next crawls only list again folders whose mtime changed.
+#
+#   Update  1.0.0 :     We start here.
+#           1.0.1 :     Links to folders are not followed, like os.walk.
+#
+#   KnownBugs :         Folder mtime doesnt change when a file is edited in place:
+#                       size / mtime of files read from manifest can be outdated, paths cant.
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+
+import json
+import logging
+import os
+from multiprocessing.pool import ThreadPool
+
+try:
+    from os import scandir
+except ImportError:
+    try:
+        from scandir import scandir
+    except ImportError:
+        scandir = None
+
+
+MANIFEST_VERSION = 1
+DEFAULT_THREADS = 16
+# extensions meaning "all files"
+ALL_EXTENSIONS = (None, "", ".*", "*")
+
+
+class ListDirEntry(object):
+    """
+    Same interface as os.DirEntry, for python without scandir
+    """
+    def __init__(self, folder, name):
+        self.name = name
+        self.path = os.path.join(folder, name)
+        self._stat = None
+
+    def stat(self):
+        if self._stat is None:
+            self._stat = os.stat(self.path)
+        return self._stat
+
+    def is_dir(self, follow_symlinks=True):
+        if not follow_symlinks and os.path.islink(self.path):
+            return False
+        return os.path.isdir(self.path)
+
+    def is_file(self):
+        return os.path.isfile(self.path)
+
+
+def list_entries(folder):
+    """
+    :param: folder
+    :return: entries of folder, see os.scandir
+    :rtype: list
+    """
+    if scandir is not None:
+        iterator = scandir(folder)
+        try:
+            return list(iterator)
+        finally:
+            # scandir iterator has no close() in python 2
+            if hasattr(iterator, "close"):
+                iterator.close()
+    return [ListDirEntry(folder, name) for name in os.listdir(folder)]
+
+
+def get_extension_filter(extensions):
+    """
+    :param: extensions => list of extensions like [".ma", ".nk"], or None / [".*"] for all files
+    :return: set of lower case extensions, None for all files
+    :rtype: set
+    """
+    if extensions is None or any(extension in ALL_EXTENSIONS for extension in extensions):
+        return None
+    return set(extension.lower() for extension in extensions)
+
+
+class Crawler(object):
+    """
+    Ex:
+        files = Crawler(exclude_dirs=["reference"], extensions=[".ma"], manifest_path=path).get_files(top_folder)
+    """
+    def __init__(self, exclude_dirs=None, extensions=None, threads=DEFAULT_THREADS, manifest_path=None):
+        """
+        :param: exclude_dirs => names of folders not to go in
+        :param: extensions => extensions of files to keep, None for all
+        :param: threads => nb of folders listed at the same time
+        :param: manifest_path => json where folders content is cached, None to always list everything
+        """
+        self.exclude_dirs = set(name for name in (exclude_dirs or []) if name)
+        self.extensions = get_extension_filter(extensions)
+        self.threads = max(1, threads)
+        self.manifest_path = manifest_path
+        self.filters = {"exclude_dirs": sorted(self.exclude_dirs),
+                        "extensions": sorted(self.extensions) if self.extensions is not None else None}
+        self.folders = {}
+        self.nb_listed = 0
+        self.nb_cached = 0
+
+    def load_manifest(self):
+        """
+        :return: folders of manifest => {folder: {"mtime", "files": [[name, size, mtime]], "subdirs": [name]}}
+        :rtype: dict
+        """
+        if not self.manifest_path or not os.path.exists(self.manifest_path):
+            return {}
+        try:
+            with open(self.manifest_path, 'r') as manifest_file:
+                manifest = json.load(manifest_file)
+        except Exception as e:
+            logging.warning('Manifest "{}" cant be read, folders will be listed again: {}'.format(self.manifest_path, e))
+            return {}
+        if manifest.get("version") != MANIFEST_VERSION or manifest.get("filters") != self.filters:
+            return {}
+        return manifest.get("folders", {})
+
+    def save_manifest(self):
+        if not self.manifest_path:
+            return
+        folder = os.path.dirname(self.manifest_path)
+        try:
+            if folder and not os.path.exists(folder):
+                os.makedirs(folder)
+            with open(self.manifest_path, 'w') as manifest_file:
+                json.dump({"version": MANIFEST_VERSION, "filters": self.filters, "folders": self.folders}, manifest_file)
+        except Exception as e:
+            logging.warning('Manifest "{}" cant be saved: {}'.format(self.manifest_path, e))
+
+    def list_folder(self, folder):
+        """
+        Files and sub folders of folder, filters are applied on names.
+        Only kept files are stat.
+        :return: folder, content => {"mtime", "files": [[name, size, mtime]], "subdirs": [name]}
+        :rtype: tuple
+        """
+        content = {"mtime": None, "files": [], "subdirs": []}
+        try:
+            content["mtime"] = os.stat(folder).st_mtime
+            entries = list_entries(folder)
+        except OSError as e:
+            logging.warning('Folder "{}" cant be listed: {}'.format(folder, e))
+            return folder, content
+        for entry in entries:
+            try:
+                # like os.walk, links to folders are not followed: a link cycle would be listed forever
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in self.exclude_dirs:
+                        content["subdirs"].append(entry.name)
+                    continue
+                if self.extensions is not None and os.path.splitext(entry.name)[1].lower() not in self.extensions:
+                    continue
+                if entry.is_file():
+                    stat = entry.stat()
+                    content["files"].append([entry.name, stat.st_size, stat.st_mtime])
+            except OSError as e:
+                logging.warning('"{}" cant be read: {}'.format(entry.path, e))
+        return folder, content
+
+    def revalidate_folder(self, folder, cached_content):
+        """
+        Content from manifest if folder mtime didnt change, else list it again.
+        :return: folder, content, listed
+        :rtype: tuple
+        """
+        if cached_content is not None:
+            try:
+                if os.stat(folder).st_mtime == cached_content["mtime"]:
+                    return folder, cached_content, False
+            except OSError:
+                pass
+        folder, content = self.list_folder(folder)
+        return folder, content, True
+
+    def crawl(self, top_folders):
+        """
+        Walk top_folders, depth by depth. Folders of a depth are listed by a pool of threads.
+        :param: top_folders => folder or list of folders
+        :return: files => sorted list of (path, size, mtime)
+        :rtype: list
+        """
+        if not isinstance(top_folders, (list, tuple)):
+            top_folders = [top_folders]
+        cached_folders = self.load_manifest()
+        self.folders = {}
+        self.nb_listed = 0
+        self.nb_cached = 0
+        files = []
+
+        level = [os.path.normpath(folder) for folder in top_folders if os.path.isdir(folder)]
+        pool = ThreadPool(self.threads)
+        try:
+            while level:
+                next_level = []
+                results = pool.map(lambda folder: self.revalidate_folder(folder, cached_folders.get(folder)), level)
+                for folder, content, listed in results:
+                    self.folders[folder] = content
+                    if listed:
+                        self.nb_listed += 1
+                    else:
+                        self.nb_cached += 1
+                    files.extend((os.path.join(folder, name), size, mtime) for name, size, mtime in content["files"])
+                    next_level.extend(os.path.join(folder, name) for name in content["subdirs"])
+                level = next_level
+        finally:
+            pool.close()
+            pool.join()
+
+        logging.debug("{} folders listed, {} read from manifest".format(self.nb_listed, self.nb_cached))
+        # keep folders of other top folders in manifest
+        top_prefixes = tuple(os.path.join(os.path.normpath(folder), "") for folder in top_folders)
+        for folder, content in cached_folders.items():
+            if folder not in self.folders and not os.path.join(folder, "").startswith(top_prefixes):
+                self.folders[folder] = content
+        self.save_manifest()
+        return sorted(files)
+
+    def get_files(self, top_folders):
+        """
+        :return: files_path_list => sorted paths of files
+        :rtype: list
+        """
+        return [path for path, size, mtime in self.crawl(top_folders)]
+
+
+def crawl(top_folders, exclude_dirs=None, extensions=None, threads=DEFAULT_THREADS, manifest_path=None):
+    """
+    :return: files => sorted list of (path, size, mtime), see Crawler.crawl
+    :rtype: list
+    """
+    return Crawler(exclude_dirs=exclude_dirs, extensions=extensions, threads=threads,
+                   manifest_path=manifest_path).crawl(top_folders)
+
+
+def get_files(top_folders, exclude_dirs=None, extensions=None, threads=DEFAULT_THREADS, manifest_path=None):
+    """
+    :return: files_path_list => sorted paths of files, see Crawler.get_files
+    :rtype: list
+    """
+    return Crawler(exclude_dirs=exclude_dirs, extensions=extensions, threads=threads,
+                   manifest_path=manifest_path).get_files(top_folders)
@@ -14,6 +14,8 @@
 
 import os
 import re
+import shutil
+import tempfile
 
 
 def increment_file(path):
@@ -27,3 +29,73 @@ def increment_file(path):
     version = re.findall(r'v\d+', file_name)[0]
     new_version = r'v%03d' % (int(version.replace('v', '')) + 1)
     return path.replace(version, new_version)
+
+
+def replace_file(source_path, destination_path):
+    """
+    Move source_path over destination_path in one step: destination is never half written.
+    Both paths must be on the same drive.
+    :param: source_path
+    :param: destination_path
+    """
+    if hasattr(os, "replace"):
+        os.replace(source_path, destination_path)
+    elif os.name == "nt":
+        # python 2 on windows: os.rename fails if destination exists
+        import ctypes
+        MOVEFILE_REPLACE_EXISTING = 0x1
+        MOVEFILE_WRITE_THROUGH = 0x8
+        if not ctypes.windll.kernel32.MoveFileExW(unicode(source_path), unicode(destination_path),
+                                                  MOVEFILE_REPLACE_EXISTING | MOVEFILE_WRITE_THROUGH):
+            raise ctypes.WinError()
+    else:
+        os.rename(source_path, destination_path)
+
+
+class AtomicFile(object):
+    """
+    File written in a temp file next to path, moved over path on commit().
+    If not commited (or on error), temp file is removed and path is untouched.
+    Ex:
+        with AtomicFile(path) as output_file:
+            output_file.write(content)
+            output_file.commit()
+    """
+    def __init__(self, path, mode='w'):
+        self.path = path
+        folder, name = os.path.split(os.path.abspath(path))
+        file_descriptor, self.temp_path = tempfile.mkstemp(prefix=".{}.".format(name), suffix=".tmp", dir=folder)
+        self.file = os.fdopen(file_descriptor, mode)
+        self.commited = False
+
+    def write(self, data):
+        self.file.write(data)
+
+    def commit(self):
+        """
+        Replace path by what has been written
+        """
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+        if os.path.exists(self.path):
+            shutil.copymode(self.path, self.temp_path)
+        replace_file(self.temp_path, self.path)
+        self.commited = True
+
+    def discard(self):
+        """
+        Remove what has been written
+        """
+        if not self.file.closed:
+            self.file.close()
+        if os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if not self.commited:
+            self.discard()
+        return False
@@ -95,24 +95,31 @@ class UpdateMasterScene(object):
         # NOTE Vicky: Shortcut:
         # self.extra_logging = extra_logger.ExtraLogger().execute_logger(logger_path)
         # and inside your execute_logger() you do a `return logging.getLogger()` in the end?
-        self.extra_logger.execute_logger(log_path)
+        # Time of each step is written at the end of the log, and in a chrome trace
+        trace_path = '{}_trace.json'.format(os.path.splitext(log_path)[0])
+        self.extra_logger.execute_logger(log_path, trace_path=trace_path)
         self.extra_logging = logging.getLogger()
-        # Get assetlib variation from SG
-        sg_variation_tmp = self.shotgun_read_asset_libraries.get_assets_from_assetslib_name(self.sg, self.assetlib_name, self.project_id)
-        # Create the task template helper for each variation
-        sg_variation = self.update_variations_task_template(sg_variation_tmp)
-        # Remove var which are not in the right Task Template
-        self.sg_variation = self.clean_sg_variation(sg_variation)
-        # Get variations and subs from assetlib_name
-        self.shotgun_assets = self.get_asset_from_sg()
+        with self.extra_logger.span('read_shotgun'):
+            # Get assetlib variation from SG
+            sg_variation_tmp = self.shotgun_read_asset_libraries.get_assets_from_assetslib_name(self.sg, self.assetlib_name, self.project_id)
+            # Create the task template helper for each variation
+            sg_variation = self.update_variations_task_template(sg_variation_tmp)
+            # Remove var which are not in the right Task Template
+            self.sg_variation = self.clean_sg_variation(sg_variation)
+            # Get variations and subs from assetlib_name
+            self.shotgun_assets = self.get_asset_from_sg()
 
     def execute(self):
-        self.update_master_sets()
-        self.update_elt_default()
-        self.import_missing_references()
-        self.update_existing_references()
-        self.quick_sorting_set()
-        self.apply_outliner_color()
+        with self.extra_logger.span('execute'):
+            for step in [self.update_master_sets,
+                         self.update_elt_default,
+                         self.import_missing_references,
+                         self.update_existing_references,
+                         self.quick_sorting_set,
+                         self.apply_outliner_color]:
+                with self.extra_logger.span(step.__name__):
+                    step()
+        self.extra_logger.stop_logger()
 
     # -------------------------------------------------------------------------------------------------------------------------------
     # UTILS
@@ -3,6 +3,26 @@ try:
 except Exception as e:
     print("{}: Failed to import `detect_sym_auto`: {}'".format(e.__class__.__name__, e.message))
 
+try:
+    from . import sym_cache
+except Exception as e:
+    print("{}: Failed to import `sym_cache`: {}'".format(e.__class__.__name__, e.message))
+
+try:
+    from . import sym_engine
+except Exception as e:
+    print("{}: Failed to import `sym_engine`: {}'".format(e.__class__.__name__, e.message))
+
+try:
+    from . import sym_matching
+except Exception as e:
+    print("{}: Failed to import `sym_matching`: {}'".format(e.__class__.__name__, e.message))
+
+try:
+    from . import sym_rename
+except Exception as e:
+    print("{}: Failed to import `sym_rename`: {}'".format(e.__class__.__name__, e.message))
+
 try:
     from . import mdl_checker
 except Exception as e:
@@ -13,28 +13,93 @@
 import logging
 from decimal import getcontext
 import math
+import os
+import shutil
+import tempfile
 import webbrowser
 
 try:
     import maya.cmds as cmds
-    import pymel.core as pm
 except ImportError:
     pass
 
 from ....studio.libs.reads import nodes as read_nodes
+from ....studio.libs.reads import meshes as read_meshes
 from ....studio.libs.reads import scene as read_scene
 from ....studio.libs.updates import nodes as update_nodes
 from ....studio.libs.deletes import nodes as delete_nodes
+from . import sym_cache
+from . import sym_engine
+from . import sym_rename
 
 logging.basicConfig()
 logging.getLogger().setLevel(logging.DEBUG)
 
 getcontext().prec = 12
 
+# world space vtx buffers, fetched once per mesh and per run
+points_cache = read_meshes.MeshPointsCache()
 
-def rename_grps():
+# width of area buckets in compare_all_meshes: areas matching at 0.1% are in neighbour buckets
+AREA_BUCKET_SIZE = math.log(1.002)
+
+
+def get_rename_plan():
+    """
+    Rename plan with all short names of the scene, see sym_rename.
+    :rtype : sym_rename.RenamePlan
+    """
+    return sym_rename.RenamePlan(sym_rename.NameRegistry.from_scene())
+
+
+def get_prefixed_name(name, good_prefix):
+    """
+    Name with the right prefix.
+    Ex: toto_Msh => C_toto_Msh, L_toto_Msh => C_toto_Msh
+    :param : name : short name
+    :param : good_prefix : C_, U_, R_ or L_
+    :rtype : string
+    """
+    prefix = read_nodes.get_prefix(name)
+    # if there is no prefix
+    if prefix is None:
+        return good_prefix + name
+    # if the prefix is wrong
+    if prefix != good_prefix:
+        return good_prefix + name[len(prefix):]
+    return name
+
+
+def get_groups_children(top_node):
+    """
+    Groups of scene (transforms with only transforms as children) with their children.
+    Queried in two calls instead of one listRelatives per group.
+    :param : top_node : long name, excluded from groups
+    :return groups_children : {grp: [children long names]}
+    :rtype : dict
+    """
+    dag_nodes = cmds.ls(dag=True, long=True) or []
+    transforms = set(cmds.ls(dag=True, long=True, transforms=True) or [])
+    children = {}
+    for node in dag_nodes:
+        parent = node.rsplit('|', 1)[0]
+        if parent:
+            children.setdefault(parent, []).append(node)
+
+    groups_children = {}
+    for grp in transforms:
+        if grp == top_node or grp not in children:
+            continue
+        if all(child in transforms for child in children[grp]):
+            groups_children[grp] = children[grp]
+    return groups_children
+
+
+def rename_grps(plan=None):
     """
     Check what childs are in groups, and rename group.
+    Children names are read from the plan, so groups follow the renaming of meshes
+    and of their sub groups.
 
     Rules :
     if only U       => U
@@ -46,75 +111,64 @@ def rename_grps():
     if U + L,R       => U
     if L + R         => C
     if C + L,R       => C
-    """
-    top_node = read_nodes.get_top_node()[0]
-    transfr = cmds.ls(exactType="transform")
-    grps = [cmds.ls(grp, long=True)[0]
-            for grp in transfr if read_nodes.is_group(grp) and grp not in top_node]
-    grps = [grp for grp in grps if grp not in top_node]
-
-    # dict with grp: place in hi
-    grp_place = {}
-
-    # groupe to check the futur names / update
-    grp_futures_name = {}
-
-    for grp in grps:
-        nb = grp.split('|')
-        nb = len(nb) - 2
-        grp_place[grp] = nb
-
-    for grp in grps:
-        grp_futures_name[grp] = grp
-
-    list_grp_place = sorted(
-        grp_place.items(), key=lambda x: x[0], reverse=True)
-
-    while len(list_grp_place) > 0:
-        for index, elmt in enumerate(list_grp_place):
-            grp = elmt[0]
-            # take new name
-            grp = grp_futures_name[grp]
-
-            try:
-                grp_sn = cmds.ls(grp, sn=True)[0]
-            except Exception as e:
-                list_grp_place.remove(elmt)
-                print(e)
-                continue
 
-            new_grp_name = update_nodes.correct_grp_prefix(grp_sn)
-            if new_grp_name != grp_sn:
-                logging.info(
-                    "OLD GRP NAME // NEW GRP NAME\n{}\n{} \n\n ".format(grp_sn, new_grp_name))
-                # rename grp
-                update_nodes.rename_obj(obj=grp_sn, new_name=new_grp_name)
+    :param plan : RenamePlan to fill. If None, renames are applied at the end.
+    """
+    apply_plan = plan is None
+    if apply_plan:
+        plan = get_rename_plan()
 
-            new_grp_name = cmds.ls(new_grp_name, long=True)[0]
-            grp_futures_name[grp] = new_grp_name
-            list_grp_place.remove(elmt)
+    top_node = read_nodes.get_top_node()[0]
+    groups_children = get_groups_children(top_node)
+
+    # deepest groups first, so parents see new names of their sub groups
+    for grp in sorted(groups_children, key=lambda grp: grp.count('|'), reverse=True):
+        grp_sn = plan.get_name(grp)
+        prefix_grp = read_nodes.get_prefix(grp_sn)
+        all_pref_childs = [read_nodes.get_prefix(plan.get_name(child)) for child in groups_children[grp]]
+        # Remove dupplicate in list; has for ex ["C,"L","R"]
+        all_pref_childs = list(dict.fromkeys(all_pref_childs))
+        # Determine what prefix must be used
+        prefix = read_nodes.determine_prefix(all_pref_childs)
+        if prefix is None or prefix == prefix_grp:
+            continue
+
+        new_grp_name = get_prefixed_name(grp_sn, prefix)
+        logging.info(
+            "OLD GRP NAME // NEW GRP NAME\n{}\n{} \n\n ".format(grp_sn, new_grp_name))
+        plan.rename(grp, new_grp_name)
+
+    if apply_plan:
+        plan.apply(chunk_name="rename_grps")
 
     logging.info('*' * 10 + "END OF GRP RENAME" + "*" * 10)
 
 
-
-def rename_with_unique_name():
+def rename_with_unique_name(plan=None):
     """
     Check if after rename, name are dupplicated and correct it
+    :param plan : RenamePlan to fill. If None, renames are applied at the end.
     """
-    wrong_names = read_nodes.list_wrong_mesh_names()
+    apply_plan = plan is None
+    if apply_plan:
+        plan = get_rename_plan()
 
-    for mesh in wrong_names:
-        # get short name and split | in case Toto|Bidule_Msh is returned instead of Bidule_Msh
-        mesh = cmds.ls(mesh, sn=True)[0].split('|')[-1]
-        final_name = update_nodes.replace_suffixe(mesh)
-        update_nodes.rename_obj(obj=mesh, new_name=final_name)
+    for mesh in read_nodes.list_all_meshes():
+        mesh_name = plan.get_name(mesh)
+        # Get the meshes with the name doesnt end with _Msh
+        if mesh_name.endswith('_Msh'):
+            continue
+        final_name = sym_rename.remove_suffixe(mesh_name)
+        if final_name != mesh_name:
+            plan.rename(mesh, final_name)
 
-    logging.info('*' * 10 + "END OF UNIQUE RENAME" + "*" * 10)
+    if apply_plan:
+        plan.apply(chunk_name="rename_with_unique_name")
 
+    logging.info('*' * 10 + "END OF UNIQUE RENAME" + "*" * 10)
 
 
-def check_names_and_rename(meshes, category, *args):
+def check_names_and_rename(meshes, category, *args, **kwargs):
     """
     Rename the meshes with given category, and if its paired if L/R.
 
@@ -129,313 +183,51 @@ def check_names_and_rename(meshes, category, *args):
     :param category : string
     :param dict_of_pairs : dict of pairs {mesh01: mesh02} are pairs.
     :param dict_of_pairs : dict
+    :param plan : keyword only, RenamePlan to fill. If None, renames are applied at the end.
     """
     global dict_of_pairs
+    plan = kwargs.get("plan")
 
     cat_prefix = {"c": "C_", "u": "U_"}
     cat_lr_prefix = {"right": "R_", "left": "L_"}
 
+    apply_plan = plan is None
+    if apply_plan:
+        plan = get_rename_plan()
+
     if category != "lr":
         good_prefix = cat_prefix[category]
         # for u and c categories
-        rename = True
-        for mesh in meshes:
-            mesh = cmds.ls(str(mesh), sn=True)[0].split('|')[-1]
-            prefix = read_nodes.get_prefix(mesh)
-            # if there is no prefix
-            if prefix is None:
-                rename = True
-                new_name = mesh.replace(mesh, good_prefix + mesh)
-            # if the prefix is wrong
-            elif prefix != good_prefix:
-                rename = True
-                new_name = mesh.replace(prefix, good_prefix)
-            # if prefix is correct
-            else:
-                new_name = mesh
-                rename = False
-            # at the end, rename only the meshes
-            if rename is True:
-                update_nodes.rename_obj(obj=mesh, new_name=new_name)
+        for mesh in cmds.ls(meshes, long=True) or []:
+            plan.rename(mesh, get_prefixed_name(plan.get_name(mesh), good_prefix))
 
     # for L/R category
     else:
+        pairs_meshes = list(dict_of_pairs.keys()) + list(dict_of_pairs.values())
+        existing_meshes = set(cmds.ls(pairs_meshes, long=True) or [])
         for mesh, next_mesh in dict_of_pairs.items():
-            long_mesh = str(mesh)
-            long_next_mesh = str(next_mesh)
-            if cmds.objExists(mesh) is False:
-                continue
-            if cmds.objExists(next_mesh) is False:
+            if mesh not in existing_meshes or next_mesh not in existing_meshes:
                 continue
-            # get short name
-            mesh = cmds.ls(str(mesh), sn=True)[0].split('|')[-1]
-            next_mesh = cmds.ls(str(next_mesh), sn=True)[0].split('|')[-1]
             # determine if objects are left or right pos
-            if read_nodes.get_right_or_left(long_mesh) == "right":
-                right_mesh = mesh
-                left_mesh = next_mesh
-                long_right = long_mesh
-                long_left = long_next_mesh
-
+            if read_nodes.get_right_or_left(mesh) == "right":
+                right_mesh, left_mesh = mesh, next_mesh
             else:
-                left_mesh = mesh
-                right_mesh = next_mesh
-                long_right = long_next_mesh
-                long_left = long_mesh
-
-            rename_right = True
-            rename_left = True
-
-            # check the prefix
-            ideal_right_prefix = cat_lr_prefix["right"]
-            ideal_left_prefix = cat_lr_prefix["left"]
+                left_mesh, right_mesh = mesh, next_mesh
 
-            right_mesh_prefix = read_nodes.get_prefix(right_mesh)
-            left_mesh_prefix = read_nodes.get_prefix(left_mesh)
+            # check the prefix, add or replace it
+            plan.rename(right_mesh, get_prefixed_name(plan.get_name(right_mesh), cat_lr_prefix["right"]))
+            plan.rename(left_mesh, get_prefixed_name(plan.get_name(left_mesh), cat_lr_prefix["left"]))
 
-            # check the letter and replace it for right mesh
-            if right_mesh_prefix is not None:
-                if right_mesh_prefix != ideal_right_prefix:
-                    new_name_right = right_mesh.replace(right_mesh_prefix, ideal_right_prefix)
-
-                # if first letter is right, no changes
-                else:
-                    new_name_right = right_mesh
-                    rename_right = False
-
-            # else add a correct prefix
-            else:
-                new_name_right = right_mesh.replace(right_mesh, "R_" + right_mesh)
-
-            if left_mesh_prefix is not None:
-                if left_mesh_prefix != ideal_left_prefix:
-                    new_name_left = left_mesh.replace(left_mesh_prefix, ideal_left_prefix)
-                    # prevent conflit names
-                # if first letter is right, no changes
-                else:
-                    new_name_left = left_mesh
-                    rename_left = False
-            # else add a correct prefix
-            else:
-                new_name_left = left_mesh.replace(left_mesh, "L_" + left_mesh)
-
-            # rename
-            try:
-                if rename_right is True:
-                    if cmds.objExists(new_name_right):
-                        new_name_right = update_nodes.increment_name(new_name_right)
-                    pm.rename(long_right, new_name_right)
-                if rename_left is True:
-                    if cmds.objExists(new_name_left):
-                        new_name_left = update_nodes.increment_name(new_name_left)
-                    pm.rename(long_left, new_name_left)
-
-            except Exception as e:
-                logging.error(e)
-                raise ValueError('PROBLEME RENAME WITH {} /{}//{} _ {}//'.format(right_mesh, new_name_right, left_mesh, new_name_left))
+    if apply_plan:
+        plan.apply(chunk_name="check_names_and_rename")
 
     logging.info("*" * 10 + "END OF RENAMING CATEGORY: {}".format(category) + "*" * 10)
 
 
-def create_dict_of_vtx(mesh, axis):
-    """
-    Create a dict of vtx number and pos of given axis.
-    Ex: {vtx01: 125} where 125 is the pos of for ex x axis.
-    :param mesh
-    :param axis : given axis.
-    :type : int
-    :return : distance_of_vertex
-    :rtype : dict
-    """
-    # dict with :
-    # {index of vertex : distance from origin}
-    distance_of_vertex = {}
-    vertices = cmds.polyEvaluate(mesh, v=True)
-    # create a dict with each vertex from world 0,0,0
-    i = 0
-    while i < vertices:
-        vertex_pos = cmds.pointPosition(
-            mesh + '.pt[{index}]'.format(index=i), w=True)
-
-        vertex_pos_axis = list(vertex_pos)
-        vertex_pos_axis = vertex_pos_axis[axis]
-        distance_of_vertex[i] = vertex_pos_axis
-        i += 1
-    return distance_of_vertex
-
-
-def compare_angles(dict_vtx1, dict_vtx2, dict_axis1, dict_axis2):
-    """
-    Compare values of 2 dict with vertexes and return percentage of match.
-    Function works for one mesh.
-    :param dict vtx 1 : (88, 103) where 88 is the vtx number and 103 is the pos in given axis but positive in world.
-    :param dict vtx 2 : values of vtx in given axis but negative in world.
-    :param dict_axis1 : param of all vtx on other axis number 1
-    :param dict_axis2 : param of all vtx on other axis number 2
-    :return : percentage
-    :rtype : float
-    """
-    # threshold of substraction between axis
-    seuil_symetry = 0.1
-    # 5 degrees of threshold
-    seuil_angle = 20
-
-    idx_vtx = 0
-    comparaison = 0
-    # lenght = 0
-
-    lenght = len(dict_vtx1)
-
-    # each vertex, check the vertex of the left list
-    while idx_vtx < lenght:
-        idx_right = dict_vtx1[idx_vtx][0]
-        pos_right = dict_vtx1[idx_vtx][1]
-
-        # index in other dict
-        index_neg = 0
-        lenght_max = len(dict_vtx2)
-
-        # others values of current vtx (on other axis)
-        axis11 = dict_axis1[idx_right]
-        axis12 = dict_axis2[idx_right]
-        # calcul of angle of current vtx
-        angle1 = math.atan2(axis11, axis12) / math.pi * 180
-
-        while index_neg < lenght_max:
-            # check the angle difference between current vtx and next
-            idx_left = dict_vtx2[index_neg][0]
-            pos_left = dict_vtx2[index_neg][1]
-
-            if pos_right > pos_left:
-                diff = math.fabs(pos_right + pos_left)
-            else:
-                diff = math.fabs(pos_left + pos_right)
-
-            # others values of next vtx (on other axis)
-            axis21 = dict_axis1[idx_left]
-            axis22 = dict_axis2[idx_left]
-            # calcul of angle of next vtx
-            angle2 = math.atan2(axis21, axis22) / math.pi * 180
-
-            # delta of angle between current and next vtx
-            delta_angle = math.fabs(angle1 - angle2)
-
-            # check if values of first axis are matching
-            # then check if the delta angle is under the threshold (5 degrees)
-            if diff < seuil_symetry:
-                # logging.debug('DIFF : {}'.format(diff))
-                if delta_angle < seuil_angle:
-                    # logging.debug('DELTA ANGLE : {}'.format(delta_angle))
-                    # logging.debug('ANGLE 1 et 2 : {} // {}'.format(angle1, angle2))
-                    comparaison += 1
-                    dict_vtx2.remove(dict_vtx2[index_neg])
-                    # refresh lengh of dict
-                    lenght_max = len(dict_vtx2)
-
-            index_neg += 1
-        idx_vtx += 1
-
-    if len(dict_vtx1) != 0:
-        corresp = float((float(100) * float(comparaison)) / len(dict_vtx1))
-    else:
-        corresp = 0
-
-    # logging.debug('COMPARAISON {}'.format(comparaison))
-    # logging.debug('LEN DICT POSTIV {}'.format(len(dict_vtx1)))
-    # logging.debug('CORRESPONDANCE ANGLES {}'.format(corresp))
-    return corresp
-
-
-def compare_angles_two_meshes(dict_axis0_msh1, dict_axis0_msh2,
-                              dict_axis1_msh1, dict_axis1_msh2,
-                              dict_axis2_msh1, dict_axis2_msh2):
-    """
-    Compare values of 2 dict with vertexes and return percentage of match.
-
-    Function works for TWO meshes. Almost the same as funct compare angles.
-    :param dict_axis0_msh1 /dict_axis0_msh2: (88, 103) where 88 is the vtx number
-    and 103 is the pos in given axis but positive in world.
-
-    :param dict vtx 2 : values of vtx in given axis but negative in world.
-    :param dict_axis1_msh*: param of all vtx on other axis number 1 for mesh01 AND MESH02
-    :param dict_axis2_msh* : param of all vtx on other axis number 2 for mesh01 AND MESH02
-    :return corresp : percentage of matching.
-    :rtype : float
-    """
-    # threshold of substraction between axis
-    seuil_symetry = 0.1
-    # 5 degrees of threshold
-    seuil_angle = 5
-
-    idx_vtx = 0
-    comparaison = 0
-    lenght = 0
-
-    lenght = len(dict_axis0_msh1)
-
-    # each vertex, check the vertex of the left list
-    while idx_vtx < lenght:
-        idx_right = dict_axis0_msh1[idx_vtx][0]
-        pos_right = dict_axis0_msh1[idx_vtx][1]
-
-        # index in other dict
-        index_neg = 0
-        lenght_max = len(dict_axis0_msh2)
-
-        # others values of current vtx (on other axis)
-        axis11 = dict_axis1_msh1[idx_right]
-        axis12 = dict_axis2_msh1[idx_right]
-        # calcul of angle of current vtx
-        angle1 = math.atan2(axis11, axis12) / math.pi * 180
-
-        while index_neg < lenght_max:
-            # check the angle difference between current vtx and next
-            idx_left = dict_axis0_msh2[index_neg][0]
-            pos_left = dict_axis0_msh2[index_neg][1]
-
-            if pos_right > pos_left:
-                diff = math.fabs(pos_right + pos_left)
-            else:
-                diff = math.fabs(pos_left + pos_right)
-
-            # others values of next vtx (on other axis)
-            axis21 = dict_axis1_msh2[idx_left]
-            axis22 = dict_axis2_msh2[idx_left]
-            # calcul of angle of next vtx
-            angle2 = math.atan2(axis21, axis22) / math.pi * 180
-
-            # delta of angle between current and next vtx
-            delta_angle = math.fabs(angle1 - angle2)
-
-            # check if values of first axis are matching
-            # then check if the delta angle is under the threshold (5 degrees)
-            if diff < seuil_symetry:
-                if delta_angle < seuil_angle:
-                    # logging.debug('DELTA ANGLE : {}'.format(delta_angle))
-                    # logging.debug('ANGLE 1 et 2 : {} // {}'.format(angle1, angle2))
-                    comparaison += 1
-                    dict_axis0_msh2.remove(dict_axis0_msh2[index_neg])
-                    # refresh lengh of dict
-                    lenght_max = len(dict_axis0_msh2)
-
-            index_neg += 1
-        idx_vtx += 1
-
-    if len(dict_axis0_msh1) != 0:
-        corresp = float((float(100) * float(comparaison)) / len(dict_axis0_msh1))
-    else:
-        corresp = 0
-
-    # logging.debug('COMPARAISON {}'.format(comparaison))
-    # logging.debug('LEN DICT POSTIV {}'.format(len(dict_axis0_msh1)))
-    # logging.debug('CORRESPONDANCE ANGLES {}'.format(corresp))
-    return corresp
-
-
 def check_sym_along_axis(axis, mesh01, mesh02=None, piv=0, self_check=False):
     """
     Check the symetry on an axis based on vertex pos. Can be with two meshes,
-    or along one.
+    or along one. Scores are computed by sym_engine on the points of points_cache.
     :param : axis : given axis; x, y or z.
     :type : axis : string
     :param : mesh 01, mesh02
@@ -446,151 +238,63 @@ def check_sym_along_axis(axis, mesh01, mesh02=None, piv=0, self_check=False):
     :return : corresp in percentage of match.
     :rtype : float
     """
-    idx_axis = {"x": 0, "y": 1, "z": 2}
-    axis_select = idx_axis[axis]
-
-    if axis_select == 0:
-        axis1 = 1
-        axis2 = 2
-    elif axis_select == 1:
-        axis1 = 2
-        axis2 = 0
-    elif axis_select == 2:
-        axis1 = 0
-        axis2 = 1
-
     # check on mesh01 itself:
     if self_check is True:
-        # compare vertex inside one object
-        vtx_postv = []
-        vtx_neg = []
-
-        # all vtx coordonate of mesh01 in given axis
-        all_vtx_axis0 = create_dict_of_vtx(mesh=mesh01, axis=axis_select)
-        all_vtx_axis1 = create_dict_of_vtx(mesh=mesh01, axis=axis1)
-        all_vtx_axis2 = create_dict_of_vtx(mesh=mesh01, axis=axis2)
-
-        # OBJECT CENTER// OLD
-        # piv_center_object = cmds.objectCenter(mesh01)[axis_select]
-        # piv = cmds.objectCenter(mesh01)[axis_select]
-        # world 0
-        # piv = 0
-
-        # take values of bounding box in given axis
-        bbox = cmds.polyEvaluate(mesh01, b=True)[axis_select]
-        bb_min = bbox[0]
-        bb_max = bbox[1]
-        if bb_min < bb_max:
-            dist = bb_max - bb_min
-        else:
-            dist = bb_min - bb_max
-        length = math.sqrt(math.pow(dist, 2))
-
-        # threshold = un per cent of bouding box
-        threshold = length / 100
-
-        # sort all vtx and create a list instead a dict.
-        # form : [(88, 68)] where 88 is the vtx number and 68 is the pos in given axis.
-        all_vtx = sorted(all_vtx_axis0.items(), key=lambda x: x[1])
-
-        # COMPARAISON ENTRE UN SEUL AXE donne
-        for vertex in all_vtx:
-            vtx_num = vertex[0]
-            vtx_pos = vertex[1]
-
-            # difference between vertex and pivot's axis
-            diff = vtx_pos - piv
-
-            # threshold of diff  to remove small vertex in the middle
-            if math.fabs(diff) > threshold:
-                if vtx_pos > piv:
-                    vtx_postv.append((vtx_num, diff))
-
-                elif vtx_pos < piv:
-                    vtx_neg.append((vtx_num, diff))
-
-        vtx_postv = sorted(vtx_postv, key=lambda tup: tup[1])
-        vtx_neg = sorted(vtx_neg, key=lambda tup: tup[1], reverse=True)
-
-        # if the mesh has not the same nb of vtx on each side.
-        if len(vtx_postv) != len(vtx_neg):
-            # logging.debug("NOT THE SAME LENGHT OF DICT : {}".format(diff))
-            comparaison = 0
-        else:
-            comparaison = compare_angles(
-                dict_vtx1=vtx_postv, dict_vtx2=vtx_neg, dict_axis1=all_vtx_axis1, dict_axis2=all_vtx_axis2)
+        comparaison = sym_engine.score_self_symetry(points_cache.get_points(mesh01), axis=axis, piv=piv)
 
     # compare between to meshes
     else:
-        # logging.debug("MESH 01// 02 {} // {}".format(mesh01, mesh02))
         # compare pivots of meshes. Result:
         # ([piv mesh01], [piv mesh02])
         points_pivots = compare_pivots(mesh01, mesh02, detailled=True)
-        piv_mesh01 = points_pivots[0]
-        # only on x axis
-        piv_mesh01 = piv_mesh01[axis_select]
-        piv_mesh02 = points_pivots[-1]
-        piv_mesh02 = piv_mesh02[axis_select]
-
-        # check with pivot if mesh01/mesh02 are right or left
-        if piv_mesh01 > piv_mesh02:
-            right_mesh = mesh01
-            left_mesh = mesh02
-        else:
-            right_mesh = mesh02
-            left_mesh = mesh01
-
-        # get the vtx in X of the 2 meshes
-        vtx_mesh_right = create_dict_of_vtx(mesh=right_mesh, axis=axis_select)
-        vtx_mesh_left = create_dict_of_vtx(mesh=left_mesh, axis=axis_select)
-        vtx_mesh_right = sorted(vtx_mesh_right.items(), key=lambda x: x[1])
-        vtx_mesh_left = sorted(vtx_mesh_left.items(),
-                               key=lambda x: x[1], reverse=True)
-
-        # get the vtx in 2 other axis of the 2 meshes
-        dict_axis1_msh1 = create_dict_of_vtx(mesh=mesh01, axis=axis1)
-        dict_axis2_msh1 = create_dict_of_vtx(mesh=mesh01, axis=axis2)
-        dict_axis1_msh2 = create_dict_of_vtx(mesh=mesh02, axis=axis1)
-        dict_axis2_msh2 = create_dict_of_vtx(mesh=mesh02, axis=axis2)
-
-        # compare vtx only in multiple axis
-        comparaison = compare_angles_two_meshes(
-            dict_axis0_msh1=vtx_mesh_right, dict_axis0_msh2=vtx_mesh_left, dict_axis1_msh1=dict_axis1_msh1,
-            dict_axis1_msh2=dict_axis1_msh2, dict_axis2_msh1=dict_axis2_msh1, dict_axis2_msh2=dict_axis2_msh2)
+        comparaison = sym_engine.score_pair(
+            points_cache.get_points(mesh01), points_cache.get_points(mesh02),
+            points_pivots[0], points_pivots[-1], axis=axis)
         # logging.debug("RESULT COMPARAISON {}".format(comparaison))
 
     return comparaison
 
 
-def check_sym_of_all_obj(meshes, colorMeshes):
+def check_sym_of_all_obj(meshes, colorMeshes, cache=None, processes=None):
     """
     Check the self symetry on X axis on all meshes.
     Returns a list with mesh wich are potential symetrical.
+    Scores of meshes which didnt change since last run are read from cache.
     :param : meshes
+    :param : cache : SymCache, see get_sym_cache. None to disable it.
+    :param : processes : nb of processes to score meshes, see score_meshes.
     :return sym_meshes : list of meshes symetrical of 65 percent
     :rtype : list
     """
     sym_meshes = []
     potential_sym = []
 
+    # pivot of meshes to check
+    self_items = []
     for mesh in meshes:
         CENTERX = cmds.objectCenter(mesh)[0]
         # check if mesh is really near to world
         if math.fabs(CENTERX) < 0.0001:
-            result_x = check_sym_along_axis(
-                axis="x", mesh01=mesh, self_check=True)
-            results = result_x
-            if results > 95:
-                sym_meshes.append(mesh)
-                if colorMeshes:
-                    update_nodes.color_meshes(mesh01=mesh, mesh02=mesh, rgba="r")
-
+            self_items.append((mesh, 0))
         # check if mesh is not aligned but near to world
         elif 0.0001 <= math.fabs(CENTERX) <= 0.3:
-            result_poten = check_sym_along_axis(
-                axis="x", mesh01=mesh, piv=CENTERX, self_check=True)
-            if result_poten > 95:
-                potential_sym.append(mesh)
+            self_items.append((mesh, CENTERX))
+
+    self_scores = score_meshes(self_items=self_items, cache=cache, processes=processes)[0]
+
+    for mesh, piv in self_items:
+        if self_scores[mesh]["x"] <= 95:
+            continue
+        if piv == 0:
+            sym_meshes.append(mesh)
+            if colorMeshes:
+                update_nodes.color_meshes(mesh01=mesh, mesh02=mesh, rgba="r")
+        else:
+            potential_sym.append(mesh)
+
+    if cache is not None:
+        cache.evict("self")
+        cache.save()
 
     logging.info("*" * 10 + "SYMETRICAL MESHES : {}".format(sym_meshes))
     logging.info("*" * 10 + "POTENTIAL SYMETRICAL : {}".format(potential_sym))
@@ -598,6 +302,157 @@ def check_sym_of_all_obj(meshes, colorMeshes):
     return (sym_meshes, potential_sym)
 
 
+def score_meshes(self_items=None, pair_items=None, records=None, cache=None, processes=None):
+    """
+    Self symetry scores of meshes on the 3 axis, and symetry scores on X of pairs of meshes.
+    Scores of meshes which didnt change since last run are read from cache,
+    others are computed by sym_engine, in a process pool if there are enough of them
+    (see sym_engine.get_pool_size). A progress window is shown while the pool works.
+    :param : self_items : list of (mesh, piv) to check on itself, piv is used on X, center of mesh on Y and Z
+    :param : pair_items : list of (mesh01, mesh02) to compare
+    :param : records : records of get_mesh_records, to avoid querying centers again
+    :param : cache : SymCache or None
+    :param : processes : 0 to score in maya, None for one process per cpu, or nb of processes
+    :return : self_scores, pair_scores : {mesh: {axis: percentage}}, {(mesh01, mesh02): percentage}
+    :rtype : tuple
+    """
+    self_items = self_items or []
+    pair_items = pair_items or []
+    records = records or {}
+    self_scores = {}
+    pair_scores = {}
+    fingerprints = {}
+
+    # read cache
+    if cache is not None:
+        for mesh, piv in self_items:
+            fingerprints[mesh] = get_mesh_fingerprint(mesh, record=records.get(mesh))
+            score = cache.get_self_score(fingerprints[mesh])
+            if score is not None:
+                self_scores[mesh] = score
+        for mesh01, mesh02 in pair_items:
+            for mesh in (mesh01, mesh02):
+                if mesh not in fingerprints:
+                    fingerprints[mesh] = get_mesh_fingerprint(mesh, record=records.get(mesh))
+            score = cache.get_pair_score(fingerprints[mesh01], fingerprints[mesh02])
+            if score is not None:
+                pair_scores[(mesh01, mesh02)] = score
+
+    self_items = [(mesh, piv) for mesh, piv in self_items if mesh not in self_scores]
+    pair_items = [pair for pair in pair_items if pair not in pair_scores]
+    if not self_items and not pair_items:
+        return self_scores, pair_scores
+
+    # points of all meshes to score
+    meshes = set(mesh for mesh, piv in self_items)
+    for pair in pair_items:
+        meshes.update(pair)
+    points = dict((mesh, points_cache.get_points(mesh)) for mesh in meshes)
+    centers = dict((mesh, records[mesh]["center"] if mesh in records else cmds.objectCenter(mesh)) for mesh in meshes)
+
+    processes = sym_engine.get_pool_size(len(self_items) + len(pair_items), processes)
+    dump_folder = None
+    if processes:
+        # dump point buffers once, processes load them from disk
+        dump_folder = tempfile.mkdtemp(prefix="detect_sym_auto_")
+        points = sym_engine.dump_points(points, dump_folder)
+
+    jobs = [sym_engine.self_job(mesh, points[mesh], pivot=(piv, centers[mesh][1], centers[mesh][2]),
+                                axes=("x", "y", "z"))
+            for mesh, piv in self_items]
+    jobs.extend([sym_engine.pair_job((mesh01, mesh02), points[mesh01], points[mesh02], centers[mesh01], centers[mesh02])
+                 for mesh01, mesh02 in pair_items])
+    progress = SymProgress("Scoring symetry") if processes else None
+    try:
+        results = sym_engine.run_jobs(jobs, processes=processes, executable=get_mayapy_path(),
+                                      wait_callback=progress.update if progress else None)
+    finally:
+        if progress is not None:
+            progress.end()
+        if dump_folder is not None:
+            shutil.rmtree(dump_folder, ignore_errors=True)
+
+    for job, (key, score) in zip(jobs, results):
+        if job["type"] == "self":
+            self_scores[key] = score
+            if cache is not None:
+                cache.set_self_score(fingerprints[key], score)
+        else:
+            pair_scores[key] = score
+            if cache is not None:
+                cache.set_pair_score(fingerprints[key[0]], fingerprints[key[1]], score)
+
+    return self_scores, pair_scores
+
+
+class SymProgress(object):
+    """
+    Progress window updated while a process pool scores meshes, nothing in batch.
+    Ex:
+        progress = SymProgress("Scoring symetry")
+        sym_engine.run_jobs(jobs, wait_callback=progress.update)
+        progress.end()
+    """
+    def __init__(self, title):
+        self.enabled = not cmds.about(batch=True)
+        if self.enabled:
+            cmds.progressWindow(title=title, progress=0, status="Scoring meshes...", isInterruptable=False)
+
+    def update(self, done, total):
+        if self.enabled:
+            cmds.progressWindow(edit=True, progress=int(100 * done / max(1, total)),
+                                status="Scoring meshes: {}/{}".format(done, total))
+
+    def end(self):
+        if self.enabled:
+            cmds.progressWindow(endProgress=True)
+
+
+def get_mayapy_path():
+    """
+    Python interpreter for process pools; inside maya, sys.executable is maya itself.
+    :return : mayapy path, None outside of maya
+    :rtype : string
+    """
+    maya_location = os.environ.get("MAYA_LOCATION")
+    if not maya_location:
+        return None
+    mayapy = os.path.join(maya_location, "bin", "mayapy.exe" if os.name == "nt" else "mayapy")
+    if not os.path.exists(mayapy):
+        return None
+    return mayapy
+
+
+def get_mesh_fingerprint(mesh, record=None):
+    """
+    Fingerprint of a mesh (topology and world points), see sym_cache.get_fingerprint.
+    It's stored in record if given, so it's computed once per run.
+    :param : record : record of get_mesh_record
+    :rtype : string
+    """
+    if record is not None and "fingerprint" in record:
+        return record["fingerprint"]
+    if record is None:
+        record = cmds.polyEvaluate(mesh, vertex=True, edge=True, face=True)
+    fingerprint = sym_cache.get_fingerprint(
+        record["vertex"], record["edge"], record["face"], points_cache.get_points(mesh))
+    record["fingerprint"] = fingerprint
+    return fingerprint
+
+
+def get_sym_cache(cache_path=None):
+    """
+    Cache of scores of the current scene.
+    :param : cache_path : json file of the cache. By default, in a temp folder (see sym_cache.get_cache_path).
+    :return : SymCache, None if the scene is not saved yet
+    """
+    if cache_path is None:
+        cache_path = sym_cache.get_cache_path(cmds.file(q=True, sn=True))
+    if cache_path is None:
+        return None
+    return sym_cache.SymCache(cache_path)
+
+
 def compare_areas_of_two_meshes(mesh01, mesh02):
     """
     Compare two meshes, the values of area.
@@ -671,7 +526,112 @@ def store_into_set(meshes, set_name):
         cmds.select(cl=True)
 
 
-def compare_two_meshes(mesh01, mesh02, centred=True):
+def get_mesh_record(mesh):
+    """
+    Query once everything needed to pair a mesh:
+    nb of components, world area, center and bounding box.
+    :param mesh
+    :return record : {"mesh", "vertex", "edge", "face", "area", "center", "bbox", "signature"}
+    :rtype : dict
+    """
+    evaluation = cmds.polyEvaluate(mesh, vertex=True, edge=True, face=True, worldArea=True)
+    record = {
+        "mesh": mesh,
+        "vertex": evaluation["vertex"],
+        "edge": evaluation["edge"],
+        "face": evaluation["face"],
+        "area": evaluation["worldArea"],
+        "center": cmds.objectCenter(mesh),
+        "bbox": cmds.exactWorldBoundingBox(mesh),
+    }
+    record["signature"] = (record["vertex"], record["edge"], record["face"], get_area_bucket(record["area"]))
+    return record
+
+
+def get_mesh_records(meshes):
+    """
+    Records of all meshes, in one sweep.
+    :return records : {mesh: record}
+    :rtype : dict
+    """
+    return dict((mesh, get_mesh_record(mesh)) for mesh in meshes)
+
+
+def get_area_bucket(area):
+    """
+    Bucket of an area, on a log scale so that two areas matching in
+    compare_areas_of_two_meshes are in the same or in a neighbour bucket.
+    :param area
+    :return bucket number, None for meshes without area
+    :rtype : int
+    """
+    if area <= 0:
+        return None
+    return int(math.floor(math.log(area) / AREA_BUCKET_SIZE))
+
+
+def get_neighbour_signatures(signature):
+    """
+    Signatures of the buckets where a pair of a mesh can be.
+    :param signature : (nb vtx, nb edges, nb faces, area bucket)
+    :rtype : list
+    """
+    area_bucket = signature[-1]
+    if area_bucket is None:
+        return [signature]
+    return [signature[:-1] + (area_bucket + delta,) for delta in (-1, 0, 1)]
+
+
+def compare_records(record01, record02, centred=True, strict=True):
+    """
+    Compare two mesh records, without any maya query.
+    Compare:
+    -Nb of components (must be identical)
+    -Areas result
+    -Center of object result
+    -Size of bounding box (strict only)
+    :param centred :if meshes are not in 0 in X.
+    :param strict : compare center on the 3 axis and size of bounding box.
+                    Else only the center on last axis is compared, like the old compare_pivots.
+    :return match : True if meshes can be a pair, vtx are not compared here
+    :rtype : Bool
+    """
+    # if a mesh have the same nb of components
+    for co_type in ("face", "edge", "vertex"):
+        if record01[co_type] != record02[co_type]:
+            return False
+
+    # if the area is the same
+    if math.fabs(record01["area"] - record02["area"]) >= record01["area"] * 0.001:
+        return False
+
+    # if pivot are the same (in absolute, one mesh is mirrored)
+    threshold = 1
+    centers = list(zip(record01["center"], record02["center"]))
+    if strict is False:
+        centers = centers[-1:]
+    for value01, value02 in centers:
+        if math.fabs(math.fabs(value01) - math.fabs(value02)) > threshold:
+            return False
+
+    # a mirrored mesh keeps the same bounding box size
+    if strict is True:
+        for idx in range(3):
+            size01 = record01["bbox"][idx + 3] - record01["bbox"][idx]
+            size02 = record02["bbox"][idx + 3] - record02["bbox"][idx]
+            if math.fabs(size01 - size02) > max(size01, size02) * 0.01 + 0.0001:
+                return False
+
+    # if we dont want the meshes to be aligned
+    if centred is False:
+        # check if the meshes are not centered in X
+        if math.fabs(record01["center"][0]) <= 0.0001 or math.fabs(record02["center"][0]) <= 0.0001:
+            return False
+
+    return True
+
+
+def compare_two_meshes(mesh01, mesh02, centred=True, records=None, cache=None, strict=False):
     """
     Compare two meshes.
     Compare:
@@ -681,100 +641,100 @@ def compare_two_meshes(mesh01, mesh02, centred=True):
     -Result of vtx comparaison
     :param centred :if meshes are not in 0 in X.
     :type : float
+    :param records : records of get_mesh_records, queried if not given
+    :type : dict
+    :param cache : SymCache to read/store the vtx comparaison. None to disable it.
+    :param strict : use the stricter criteria of compare_all_meshes, see compare_records.
+                    False by default to keep the matching of transfert_map.
     :rtype : Bool
     """
-    match = False
-    mesh = mesh01
-    next_mesh = mesh02
-
-    nb_face = read_nodes.get_nb_of_component_of_mesh(meshElement=mesh01, co_type="face")
-    nb_edge = read_nodes.get_nb_of_component_of_mesh(meshElement=mesh01, co_type="edge")
-    nb_vtx = read_nodes.get_nb_of_component_of_mesh(meshElement=mesh, co_type="vtx")
-    next_nb_face = read_nodes.get_nb_of_component_of_mesh(meshElement=next_mesh, co_type="face")
-    next_nb_edges = read_nodes.get_nb_of_component_of_mesh(meshElement=next_mesh, co_type="edge")
-    next_nb_vtx = read_nodes.get_nb_of_component_of_mesh(meshElement=next_mesh, co_type="vtx")
-    mesh_center = math.fabs(cmds.objectCenter(mesh)[0])
-    next_mesh_center = math.fabs(cmds.objectCenter(next_mesh)[0])
+    if records is None:
+        records = get_mesh_records([mesh01, mesh02])
 
-    # if a mesh have the same nb of components
-    if nb_face == next_nb_face and nb_edge == next_nb_edges and nb_vtx == next_nb_vtx:
-        result_areas = compare_areas_of_two_meshes(
-            mesh01=mesh, mesh02=next_mesh)
-
-        # if the area is the same, compare pivots
-        if result_areas is True:
-            result_pivot = compare_pivots(mesh01=mesh, mesh02=next_mesh)
-
-            # if pivot are the same, check vertex
-            if result_pivot is True:
-                result_sym_x = check_sym_along_axis(
-                    axis="x", mesh01=mesh, mesh02=next_mesh, self_check=False)
-                # if we dont want the meshes to be aligned
-                if centred is False:
-                    # check if the meshes are not centered in X
-                    if mesh_center > 0.0001 and next_mesh_center > 0.0001:
-                        if result_sym_x > 60:
-                            match = True
-                else:
-                    match = True
+    match = compare_records(records[mesh01], records[mesh02], centred=centred, strict=strict)
+
+    # if we dont want the meshes to be aligned, check vertex
+    if match is True and centred is False:
+        pair_scores = score_meshes(pair_items=[(mesh01, mesh02)], records=records, cache=cache)[1]
+        result_sym_x = pair_scores[(mesh01, mesh02)]
+        match = result_sym_x > 60
 
     return match
 
 
-def compare_all_meshes(colorMeshes=True, createSets=True, *args):
+def compare_all_meshes(colorMeshes=True, createSets=True, useCache=True, cachePath=None, processes=None, *args):
     """
     Compare all meshes based on nb of component, and area.
-    Check if vertex number, face number, edge number are identical,
-    Then, store them in pairs_found list.
-    If mesh is in pair list, it compares the two meshes based on area.
+    A record is queried once for each mesh (see get_mesh_record) and meshes are
+    stored in buckets by nb of vtx, edges, faces and area.
+    Only meshes of the same bucket are compared, based on area and center.
     And check the values of vertex in one axis.
     If positive, store the result in the list detailled_pairs (mesh01, mesh02, result)
     And store the meshes in the right list.
+    Vtx comparaisons of meshes which didnt change since last run are read from cache.
 
+    :param useCache : read/store vtx comparaisons in the sym cache
+    :param cachePath : json file of the cache. By default, in a temp folder (see sym_cache.get_cache_path).
+    :param processes : nb of processes for vtx comparaisons, see score_meshes.
+    0 to stay in maya, None for one process per cpu.
     :return dict_pairs : dict of {mesh01:mesh02} as pair.
     :rtype : dict
     """
     global dict_of_pairs
 
+    points_cache.clear()
     name_meshes = read_nodes.list_all_meshes()
     logging.debug("*" * 10 + "COMPARING MESHES" + "*" * 10)
     logging.debug(str(name_meshes))
 
     dict_of_pairs = {}
+    cache = get_sym_cache(cachePath) if useCache else None
 
-    # get nb of face, edges and vtx
-    face_nb = read_nodes.get_nb_of_component(
-        meshesList=name_meshes, co_type="face")
-    face_nb = sorted(face_nb.items(), key=lambda x: x[1])
-    len_dico_face = len(face_nb)
+    # get nb of face, edges and vtx, area, center of all meshes
+    records = get_mesh_records(name_meshes)
+    face_nb = sorted(name_meshes, key=lambda mesh: records[mesh]["face"])
+    idx_of_mesh = dict((mesh, idx) for idx, mesh in enumerate(face_nb))
 
+    buckets = {}
+    for mesh in face_nb:
+        buckets.setdefault(records[mesh]["signature"], []).append(mesh)
+    logging.debug("{} MESHES IN {} BUCKETS".format(len(face_nb), len(buckets)))
 
-    idx_mesh = 0
     match_symetry = []
     detailled_pairs = []
 
-    for mesh, nb_face in face_nb:
-        idx_next_mesh = idx_mesh + 1
-        # check with others meshes
-        while idx_next_mesh < len_dico_face:
-            next_mesh = face_nb[idx_next_mesh][0]
-            # compare two meshes
-            result = compare_two_meshes(mesh01=mesh, mesh02=next_mesh, centred=False)
-            if result is True:
-                result_areas = compare_areas_of_two_meshes(mesh01=mesh, mesh02=next_mesh)
-                # on rajoute le result dans match sym et dict of pairs
-                detailled_pairs.append(
-                    (mesh, next_mesh, result_areas))
-                dict_of_pairs[mesh] = next_mesh
-                match_symetry.append(mesh)
-                match_symetry.append(next_mesh)
-                # color both meshes
-                if colorMeshes:
-                    update_nodes.color_meshes(mesh01=mesh, mesh02=next_mesh)
-
-            idx_next_mesh += 1
-        idx_mesh += 1
-
+    # candidates matching on nb of components, area and center
+    pair_items = []
+    for mesh in face_nb:
+        # check with others meshes of the same bucket
+        candidates = []
+        for signature in get_neighbour_signatures(records[mesh]["signature"]):
+            candidates.extend(buckets.get(signature, []))
+        candidates = sorted([next_mesh for next_mesh in candidates if idx_of_mesh[next_mesh] > idx_of_mesh[mesh]],
+                            key=lambda next_mesh: idx_of_mesh[next_mesh])
+
+        for next_mesh in candidates:
+            if compare_records(records[mesh], records[next_mesh], centred=False) is True:
+                pair_items.append((mesh, next_mesh))
+
+    # vtx comparaison of all candidates at once
+    pair_scores = score_meshes(pair_items=pair_items, records=records, cache=cache, processes=processes)[1]
+
+    for mesh, next_mesh in pair_items:
+        if pair_scores[(mesh, next_mesh)] > 60:
+            # on rajoute le result dans match sym et dict of pairs
+            detailled_pairs.append(
+                (mesh, next_mesh, True))
+            dict_of_pairs[mesh] = next_mesh
+            match_symetry.append(mesh)
+            match_symetry.append(next_mesh)
+            # color both meshes
+            if colorMeshes:
+                update_nodes.color_meshes(mesh01=mesh, mesh02=next_mesh)
+
+    if cache is not None:
+        cache.evict("pairs")
+        cache.save()
 
     unique = list(set(name_meshes).difference(set(match_symetry)))
     logging.debug("UNIQUE {}".format(unique))
@@ -787,14 +747,19 @@ def compare_all_meshes(colorMeshes=True, createSets=True, *args):
     return dict_of_pairs
 
 
-def check_u_sym(*args):
+def check_u_sym(useCache=True, cachePath=None, processes=None, *args):
     """
     Launch the symetrical check for meshes if they are not already in sym with another mesh.
     Store the result into sets.
     Clean the sets after. (remove the C object from unique set).
+    :param useCache : read/store self symetry scores in the sym cache
+    :param cachePath : json file of the cache. By default, in a temp folder (see sym_cache.get_cache_path).
+    :param processes : nb of processes for self symetry scores, see score_meshes.
+    0 to stay in maya, None for one process per cpu.
     :return potentential_sym : list of mesh almost centered.
     :rtype : list
     """
+    points_cache.clear()
     obj_in_ctrl_sym = read_nodes.list_set_members(sel_set="CTRL_MATCH_SYMETRY")
     all_meshes = read_nodes.list_all_meshes()
     # remove meshes of symetry already found
@@ -802,7 +767,9 @@ def check_u_sym(*args):
         mesh for mesh in all_meshes if mesh not in obj_in_ctrl_sym]
 
     # check symetry on c and create the set CTRL C
-    all_sym_objects = check_sym_of_all_obj(meshes=mesh_to_check_sym, colorMeshes=True)
+    cache = get_sym_cache(cachePath) if useCache else None
+    all_sym_objects = check_sym_of_all_obj(meshes=mesh_to_check_sym, colorMeshes=True, cache=cache,
+                                           processes=processes)
     all_sym_obj = all_sym_objects[0]
     potential_sym = all_sym_objects[1]
     store_into_set(meshes=all_sym_obj, set_name="CTRL_C")
@@ -824,44 +791,52 @@ def check_u_sym(*args):
     return potential_sym
 
 
-def launch_renaming(*args):
+def launch_renaming(dryRun=False, *args):
     """
     Change names based on selection sets.
     Check if set is not empty, then rename obj or delate set.
     Launch rename_with_unique_name : to avoid m_Msh1 ... _Msh2...
     Launch rename_grps : recursive check of grp names with it content.
+    All final names are computed in memory first, then applied in a single undo chunk.
+    :param dryRun : only compute and log the renames, nothing is changed in scene.
+    :return renames : {long name: new short name}
+    :rtype : dict
     """
-    # clean empty select sets of match sym and launch renaming
-    obj_in_ctrl_sym = read_nodes.list_set_members('CTRL_MATCH_SYMETRY')
-    if len(obj_in_ctrl_sym) > 0:
-        check_names_and_rename(meshes=obj_in_ctrl_sym, category="lr")
-    else:
-        if cmds.objExists('CTRL_MATCH_SYMETRY'):
-            cmds.delete('CTRL_MATCH_SYMETRY')
-
-    obj_in_ctrl_c = read_nodes.list_set_members(sel_set="CTRL_C")
-    if len(obj_in_ctrl_c) > 0:
-        check_names_and_rename(meshes=obj_in_ctrl_c, category="c")
-    else:
-        if cmds.objExists('CTRL_C'):
-            cmds.delete('CTRL_C')
+    plan = get_rename_plan()
+    empty_sets = []
 
-    obj_in_ctrl_u = read_nodes.list_set_members(sel_set='CTRL_UNIQUE')
-    if len(obj_in_ctrl_u) > 0:
-        check_names_and_rename(meshes=obj_in_ctrl_u, category="u")
-    else:
-        if cmds.objExists('CTRL_UNIQUE'):
-            cmds.delete('CTRL_UNIQUE')
+    # clean empty select sets of match sym and launch renaming
+    for sel_set, category in (('CTRL_MATCH_SYMETRY', "lr"), ('CTRL_C', "c"), ('CTRL_UNIQUE', "u")):
+        obj_in_set = read_nodes.list_set_members(sel_set=sel_set)
+        if len(obj_in_set) > 0:
+            check_names_and_rename(meshes=obj_in_set, category=category, plan=plan)
+        elif cmds.objExists(sel_set):
+            empty_sets.append(sel_set)
 
     # rename top node
-    update_nodes.rename_top_node()
+    top_node = read_nodes.get_top_node()[0]
+    plan.rename(top_node, update_nodes.get_top_node_name())
     # check and rename group names
-    rename_grps()
+    rename_grps(plan=plan)
     # check unique names
-    rename_with_unique_name()
-
+    rename_with_unique_name(plan=plan)
+
+    plan.log()
+    renames = plan.as_dict()
+    if dryRun:
+        logging.info('*' * 30 + "END OF DRY RUN: {} RENAMES".format(len(renames)) + "*" * 30)
+        return renames
+
+    cmds.undoInfo(openChunk=True, chunkName="detect_sym_auto_renaming")
+    try:
+        if empty_sets:
+            cmds.delete(empty_sets)
+        plan.apply(chunk_name="detect_sym_auto_renaming")
+    finally:
+        cmds.undoInfo(closeChunk=True)
 
     logging.info('*' * 30 + "END" + "*" * 30)
+    return renames
 
 
 def format_datas(dict_of_pairs):
@@ -900,17 +875,21 @@ def launch_help():
     webbrowser.open_new(url)
 
 
-def all_actions(batch=False, *args):
+def all_actions(batch=False, cachePath=None, processes=None, *args):
     """
     Launch all sym, renaming functions.
     Returns the potential sym.
+    :param cachePath : json file of the sym cache, for ex next to the json of format_datas in batch.
+    By default, in a temp folder (see sym_cache.get_cache_path).
+    :param processes : nb of processes to score symetry, see score_meshes.
+    0 to stay in maya, None for one process per cpu.
     :return potential_sym
     :rtype : dict
     """
     logging.info('*' * 30 + "START OF ALL ACTIONS" + "*" * 30)
     init_scene()
-    dict_of_pairs = compare_all_meshes(createSets=True, colorMeshes=True)
-    check_u_sym()
+    dict_of_pairs = compare_all_meshes(createSets=True, colorMeshes=True, cachePath=cachePath, processes=processes)
+    check_u_sym(cachePath=cachePath, processes=processes)
     launch_renaming()
     if batch is True:
         datas = format_datas(dict_of_pairs)
@@ -929,6 +908,7 @@ def init_scene(*args):
     update_nodes.clean_color_mesh(all_shapes=all_shapes)
     update_nodes.unsmooth_meshes(meshes=all_shapes, state=0)
     delete_nodes.delete_sets()
+    points_cache.clear()
     logging.info("___SCENE HAS BEEN REINIT___")
 
 
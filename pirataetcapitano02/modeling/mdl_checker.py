@@ -12,6 +12,8 @@
 # ------------------------------------------------------------------------------------------------------------------------------------- #
 
 import logging
+import os
+import tempfile
 
 try:
     import maya.cmds as cmds
@@ -20,13 +22,112 @@ try:
 except ImportError:
     pass
 
+from ....studio.libs.checks import nodes as check_nodes
+from ....studio.libs.deletes import nodes as delete_nodes
+from ....studio.libs.reads import meshes as read_meshes
 from ....studio.libs.reads import nodes as read_nodes
+from ....studio.libs.updates import nodes as update_nodes
+from ....tools.logger import extra_logger
 
 # FIXME IMPORT THEM WHEN MOVED OR FROM TK-MULTI-SANITYCHECK
 from ...Common.common.sanity_checks import sanity_check
 from ..common import checker_UI
 
 
+# ________________________________________________________________________________________________________
+##########################
+# ---- MESH FIXES -------#
+##########################
+# Each fix corrects what the check_nodes check of the same name reads on a mesh inspection.
+
+def fix_mesh_ft(mesh, inspection=None):
+    """
+    Freeze transforms of mesh, see check_nodes.check_is_freeze_transf
+    :param: mesh
+    :param: inspection => MeshInspection of mesh
+    """
+    cmds.makeIdentity(mesh, apply=True, t=1, r=1, s=1, n=0)
+
+
+def fix_mesh_history(mesh, inspection=None):
+    """
+    Delete history of mesh, see check_nodes.check_history
+    :param: mesh
+    :param: inspection => MeshInspection of mesh
+    """
+    cmds.delete(mesh, constructionHistory=True)
+
+
+def fix_mesh_double_shape(mesh, inspection=None):
+    """
+    Delete the drawn shapes of mesh except the first one, see check_nodes.check_double_shape
+    Intermediate shapes are kept: deformers of mesh need them, history fix removes them.
+    :param: mesh
+    :param: inspection => MeshInspection of mesh, see check_nodes.get_inspection
+    """
+    inspection = check_nodes.get_inspection(mesh, inspection)
+    if inspection.shape is None:
+        logging.error("{} has no drawn shape, its shapes are kept".format(mesh))
+        return
+    drawn_shapes = cmds.listRelatives(mesh, shapes=True, fullPath=True, ni=True) or []
+    extra_shapes = [shape for shape in drawn_shapes if shape != inspection.shape]
+    if extra_shapes:
+        cmds.delete(extra_shapes)
+    if len(inspection.shapes) > len(drawn_shapes):
+        logging.warning("Intermediate shapes of {} are kept, delete its history to remove them".format(mesh))
+
+
+def fix_mesh_visibility(mesh, inspection=None):
+    """
+    Show mesh, see check_nodes.check_visbility
+    :param: mesh
+    :param: inspection => MeshInspection of mesh
+    """
+    update_nodes.change_visibility([mesh], state=True)
+
+
+def fix_mesh_render_stats(mesh, inspection=None):
+    """
+    Set render stats of mesh to the values of check_nodes.check_render_stats
+    :param: mesh
+    :param: inspection => MeshInspection of mesh, see check_nodes.get_inspection
+    """
+    inspection = check_nodes.get_inspection(mesh, inspection)
+    if inspection.shape is None:
+        return
+    for attr in check_nodes.RENDER_STATS_ON:
+        if inspection.render_stats.get(attr) is False:
+            cmds.setAttr(inspection.shape + "." + attr, True)
+    for attr in check_nodes.RENDER_STATS_OFF:
+        if inspection.render_stats.get(attr) is True:
+            cmds.setAttr(inspection.shape + "." + attr, False)
+
+
+def fix_mesh_instance(mesh, inspection=None):
+    """
+    Turn instances of mesh into copies, see check_nodes.check_is_instanced
+    :param: mesh
+    :param: inspection => MeshInspection of mesh
+    """
+    delete_nodes.remove_instance(mesh)
+
+
+def fix_mesh_poly_color(mesh, inspection=None):
+    """
+    Delete color sets of mesh, see check_nodes.check_polyColorSet
+    History made by the deletion is removed if mesh had none before
+    :param: mesh
+    :param: inspection => MeshInspection of mesh, see check_nodes.get_inspection
+    """
+    inspection = check_nodes.get_inspection(mesh, inspection)
+    if inspection.shape is None:
+        return
+    for color_set in inspection.color_sets:
+        cmds.polyColorSet(inspection.shape, delete=True, colorSet=color_set)
+    if not inspection.history:
+        cmds.delete(mesh, constructionHistory=True)
+
+
 class ModelingChecker(checker_UI.ModelingCheckerUI):
     """Modeling checker tool.
     Check and correct:
@@ -62,6 +163,12 @@ class ModelingChecker(checker_UI.ModelingCheckerUI):
         self.ordreButtonLst = []
         self.createButtons()
 
+        # {mesh: MeshInspection}, queried once for all mesh checks, see get_bad_meshes
+        self.mesh_inspections = None
+        # True while run_all_funct runs: refresh_lists keeps inspections
+        self.keep_inspections = False
+        # timings of checks, a new one for each run_all_funct
+        self.timings = extra_logger.Timings()
         self.refresh_lists()
 
         url = 'https://hackmd.io/CyC_faH1S0W3PgL0qg0vGg?view'
@@ -224,6 +331,39 @@ class ModelingChecker(checker_UI.ModelingCheckerUI):
         self.top_node = read_nodes.get_top_node()
         if len(self.top_node) == 1:
             self.top_node = self.top_node[0]
+        if not self.keep_inspections:
+            self.mesh_inspections = None
+
+    def get_bad_meshes(self, check):
+        """
+        Meshes failing check, evaluated on inspections of meshes (queried on first call after refresh_lists)
+        :param: check => mesh check of check_nodes, eg check_nodes.check_history
+        :return: bad meshes, None if all meshes pass
+        :rtype: list
+        """
+        if self.mesh_inspections is None:
+            self.mesh_inspections = read_meshes.inspect_meshes(self.all_meshes)
+        bad_meshes = [mesh for mesh in self.all_meshes if not check(mesh, inspection=self.mesh_inspections.get(mesh))]
+        return bad_meshes or None
+
+    def fix_bad_meshes(self, check, fix):
+        """
+        Fix the meshes failing check, so a fix button corrects exactly what its check reported
+        :param: check => mesh check of check_nodes, eg check_nodes.check_history
+        :param: fix => function(mesh, inspection) correcting one mesh
+        :return: fixed meshes
+        :rtype: list
+        """
+        self.refresh_lists()
+        bad_meshes = self.get_bad_meshes(check) or []
+        for mesh in bad_meshes:
+            try:
+                fix(mesh, self.mesh_inspections.get(mesh))
+            except RuntimeError as e:
+                logging.error("Cannot fix {}: {}".format(mesh, e))
+        # meshes changed: next check must query them again
+        self.mesh_inspections = None
+        return bad_meshes
 
     def run_rs_load_ui(self):
         """Check if scene has RedShift loaded"""
@@ -526,7 +666,7 @@ class ModelingChecker(checker_UI.ModelingCheckerUI):
     def run_mesh_ft_ui(self):
         """Check if meshes are freeze transformed"""
         self.refresh_lists()
-        self.badMshFt = self.sanity_check._valid_meshes_ft()
+        self.badMshFt = self.get_bad_meshes(check_nodes.check_is_freeze_transf)
         if self.badMshFt is None:
             self.ui.changeColorStat('Mesh freeze transform', 'green', True)
         else:
@@ -534,13 +674,13 @@ class ModelingChecker(checker_UI.ModelingCheckerUI):
 
     def fix_mesh_ft_ui(self):
         """Fixing freeze transform on meshes"""
-        self.sanity_check._fix_meshes_ft()
+        self.fix_bad_meshes(check_nodes.check_is_freeze_transf, fix_mesh_ft)
         self.run_mesh_ft_ui()
 
     def run_mesh_history_ui(self):
         """Check if meshes have history deleted."""
         self.refresh_lists()
-        self.badMshHist = self.sanity_check._valid_meshes_history()
+        self.badMshHist = self.get_bad_meshes(check_nodes.check_history)
         if self.badMshHist is None:
             self.ui.changeColorStat('Mesh history', 'green', True)
         else:
@@ -548,13 +688,13 @@ class ModelingChecker(checker_UI.ModelingCheckerUI):
 
     def fix_mesh_history(self):
         """Fixing history on meshes"""
-        self.sanity_check._fix_meshes_history()
+        self.fix_bad_meshes(check_nodes.check_history, fix_mesh_history)
         self.run_mesh_history_ui()
 
     def run_mesh_double_shape_ui(self):
         """Check of double shapes of mesh"""
         self.refresh_lists()
-        self.badMshDoubleShape = self.sanity_check._valid_meshes_double_shape()
+        self.badMshDoubleShape = self.get_bad_meshes(check_nodes.check_double_shape)
         if self.badMshDoubleShape is None:
             self.ui.changeColorStat('Mesh double shape', 'green', True)
 
@@ -563,13 +703,13 @@ class ModelingChecker(checker_UI.ModelingCheckerUI):
 
     def fix_mesh_double_shape_ui(self):
         """Fixing double Shapes"""
-        self.sanity_check._fix_meshes_double_shape()
+        self.fix_bad_meshes(check_nodes.check_double_shape, fix_mesh_double_shape)
         self.run_mesh_double_shape_ui()
 
     def run_mesh_visibility_ui(self):
         """Check if mesh is visible"""
         self.refresh_lists()
-        self.badMshVisib = self.sanity_check._valid_meshes_visibility()
+        self.badMshVisib = self.get_bad_meshes(check_nodes.check_visbility)
         if not self.badMshVisib:
             self.ui.changeColorStat('Mesh visibility', 'green', True)
         else:
@@ -577,13 +717,13 @@ class ModelingChecker(checker_UI.ModelingCheckerUI):
 
     def fix_mesh_visibility_ui(self):
         """Fixing visibility"""
-        self.sanity_check._fix_meshes_visibility()
+        self.fix_bad_meshes(check_nodes.check_visbility, fix_mesh_visibility)
         self.run_mesh_visibility_ui()
 
     def run_mesh_renderStats_ui(self):
         """Check if meshes have correct render stats"""
         self.refresh_lists()
-        self.badMshRs = self.sanity_check._valid_meshes_renderStats()
+        self.badMshRs = self.get_bad_meshes(check_nodes.check_render_stats)
         if self.badMshRs is None:
             self.ui.changeColorStat('Mesh wrong renderStats', 'green', True)
         else:
@@ -591,13 +731,13 @@ class ModelingChecker(checker_UI.ModelingCheckerUI):
 
     def fix_mesh_renderStats_ui(self):
         """Fixing render stats"""
-        self.sanity_check._fix_meshes_renderStats()
+        self.fix_bad_meshes(check_nodes.check_render_stats, fix_mesh_render_stats)
         self.run_mesh_renderStats_ui()
 
     def run_mesh_instance_ui(self):
         """Check if meshes are an instance"""
         self.refresh_lists()
-        self.badMshInst = self.sanity_check._valid_meshes_instance()
+        self.badMshInst = self.get_bad_meshes(check_nodes.check_is_instanced)
         if self.badMshInst is None:
             self.ui.changeColorStat('Mesh instance', 'green', True)
         else:
@@ -605,7 +745,7 @@ class ModelingChecker(checker_UI.ModelingCheckerUI):
 
     def fix_mesh_instance_ui(self):
         """Fixing instance on meshes"""
-        self.sanity_check._fix_meshes_instance()
+        self.fix_bad_meshes(check_nodes.check_is_instanced, fix_mesh_instance)
         self.run_mesh_instance_ui()
 
     def run_mesh_cleanup_ui(self):
@@ -620,7 +760,7 @@ class ModelingChecker(checker_UI.ModelingCheckerUI):
     def run_mesh_polyColor_ui(self):
         """"Check if polyColor is applied on mesh."""
         self.refresh_lists()
-        self.badMshPolyCol = self.sanity_check._valid_meshes_polyColor()
+        self.badMshPolyCol = self.get_bad_meshes(check_nodes.check_polyColorSet)
         if self.badMshPolyCol is None:
             self.ui.changeColorStat('Mesh polyColor', 'green', True)
         else:
@@ -628,13 +768,13 @@ class ModelingChecker(checker_UI.ModelingCheckerUI):
 
     def fix_mesh_polyColor_ui(self):
         """Fixing polyColor"""
-        self.sanity_check._fix_meshes_polyColor()
+        self.fix_bad_meshes(check_nodes.check_polyColorSet, fix_mesh_poly_color)
         self.run_mesh_polyColor_ui()
 
     def run_mesh_ngones_ui(self):
         """Check if meshes have ngones"""
         self.refresh_lists()
-        self.badMshNgones = self.sanity_check._valid_meshes_ngones()
+        self.badMshNgones = self.get_bad_meshes(check_nodes.check_n_gones)
         if self.badMshNgones is None:
             self.ui.changeColorStat('Mesh nGones', 'green', True)
         else:
@@ -643,49 +783,57 @@ class ModelingChecker(checker_UI.ModelingCheckerUI):
     def run_mesh_geo_issues_ui(self):
         """Check if meshes have geo issues"""
         self.refresh_lists()
-        self.badMshGeo = self.sanity_check._valid_meshes_geo_issues()
+        self.badMshGeo = self.get_bad_meshes(check_nodes.check_geo_size)
         if not self.badMshGeo:
             self.ui.changeColorStat('Mesh geo Issues', 'green', True)
         else:
             self.ui.changeColorStat('Mesh geo Issues', 'red', True)
 
     def run_all_funct(self):
-        """Run all functions together"""
+        """Run all functions together, time of each check is logged at the end"""
         logging.info('*'*10 + 'START OF SANITY CHECK' + "*"*10)
-        self.refresh_lists()
-        self.run_rs_load_ui()
-        self.run_check_time_unit_ui()
-        self.run_frame_range_ui()
-        self.run_ss_sets_ui()
-
-        self.run_unauthorized_ui()
-        self.run_unknown_nodes_ui()
-        self.run_dispay_layers_ui()
-        self.run_mtl_ui()
-        self.run_ref_ui()
-        self.run_namespaces_ui()
-        self.run_non_default_cam_ui()
-
-        if self.check_scene_elmt():
-            if self.run_many_top_node_ui():
-                self.run_tn_name_ui()
-                self.run_tn_piv_ui()
-                self.run_tn_ft_ui()
-            self.run_grp_nom_ui()
-            self.run_grps_ft_ui()
-            self.run_grp_visib_ui()
-            self.run_mesh_nom_ui()
-            self.run_mesh_shape_nom_ui()
-            self.run_mesh_ft_ui()
-            self.run_mesh_history_ui()
-            self.run_mesh_double_shape_ui()
-            self.run_mesh_visibility_ui()
-            self.run_mesh_renderStats_ui()
-            self.run_mesh_instance_ui()
-            self.run_mesh_cleanup_ui()
-            self.run_mesh_polyColor_ui()
-            self.run_mesh_ngones_ui()
-            self.run_mesh_geo_issues_ui()
+        # timings of this run only, a tool running this one keeps its own
+        self.timings = extra_logger.Timings()
+        with self.timings.span('run_all_funct'):
+            self.run_timed_checks([self.refresh_lists])
+            # meshes are inspected once, by the first mesh check
+            self.keep_inspections = True
+            try:
+                self.run_timed_checks([self.run_rs_load_ui,
+                                       self.run_check_time_unit_ui,
+                                       self.run_frame_range_ui,
+                                       self.run_ss_sets_ui,
+                                       self.run_unauthorized_ui,
+                                       self.run_unknown_nodes_ui,
+                                       self.run_dispay_layers_ui,
+                                       self.run_mtl_ui,
+                                       self.run_ref_ui,
+                                       self.run_namespaces_ui,
+                                       self.run_non_default_cam_ui])
+
+                if self.check_scene_elmt():
+                    if self.run_timed_checks([self.run_many_top_node_ui]):
+                        self.run_timed_checks([self.run_tn_name_ui,
+                                               self.run_tn_piv_ui,
+                                               self.run_tn_ft_ui])
+                    self.run_timed_checks([self.run_grp_nom_ui,
+                                           self.run_grps_ft_ui,
+                                           self.run_grp_visib_ui,
+                                           self.run_mesh_nom_ui,
+                                           self.run_mesh_shape_nom_ui,
+                                           self.run_mesh_ft_ui,
+                                           self.run_mesh_history_ui,
+                                           self.run_mesh_double_shape_ui,
+                                           self.run_mesh_visibility_ui,
+                                           self.run_mesh_renderStats_ui,
+                                           self.run_mesh_instance_ui,
+                                           self.run_mesh_cleanup_ui,
+                                           self.run_mesh_polyColor_ui,
+                                           self.run_mesh_ngones_ui,
+                                           self.run_mesh_geo_issues_ui])
+            finally:
+                self.keep_inspections = False
+                self.mesh_inspections = None
 
         if self.check_all is True:
             logging.info("....SCENE READY TO BE PUBLISHED ....!")
@@ -693,8 +841,24 @@ class ModelingChecker(checker_UI.ModelingCheckerUI):
         else:
             logging.info("....SCENE IS NOT CLEAN ! See log for details ....!")
 
+        logging.info("Timings:\n{}".format(self.timings.get_summary_table()))
+        trace_path = os.path.join(tempfile.gettempdir(), 'mdl_checker_trace.json')
+        self.timings.write_trace(trace_path)
+        logging.info("Trace written in {}".format(trace_path))
         logging.info('*'*10 + 'END OF SANITY CHECK' + "*"*10)
 
+    def run_timed_checks(self, checks):
+        """
+        Run checks one after the other, each one in its own timing span
+        :param: checks => methods without arguments
+        :return: result of last check
+        """
+        result = None
+        for check in checks:
+            with self.timings.span(check.__name__):
+                result = check()
+        return result
+
     def fix_all_functions(self):
         self.run_all_funct()
         self.refresh_lists()
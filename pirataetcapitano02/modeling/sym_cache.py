@@ -0,0 +1,155 @@
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+#   AUTHORS :           Sophie Chauvet
+#                       Nicolas Dorey
+#
+#   DESCRIPTION :       On disk cache of detect_sym_auto scores, keyed by geometric fingerprint of shapes.
+#                       Pure python, no maya import.
+#
+#   Update  1.0.0 :     We start here.
+#           1.0.1 :     Default cache files are in a temp folder, not next to the scene.
+#           1.0.2 :     Self scores are stored for the 3 axis.
+#
+#   KnownBugs :         None atm.
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+
+try:
+    import numpy as np
+except ImportError:
+    pass
+
+
+CACHE_VERSION = 2
+# points are rounded to this step before hashing, far under seuil_symetry
+QUANTUM = 0.0001
+SECTIONS = ("self", "pairs")
+# default folder of cache files, see get_cache_path
+CACHE_FOLDER = os.path.join(tempfile.gettempdir(), "detect_sym_auto")
+
+
+def get_fingerprint(nb_vtx, nb_edges, nb_faces, points, quantum=QUANTUM):
+    """
+    Fingerprint of a shape: topology counts plus a hash of its quantised world points.
+    Same fingerprint => same scores, the mesh doesnt need to be checked again.
+    :param: nb_vtx, nb_edges, nb_faces
+    :param: points => (nb_vtx, 3) float array
+    :param: quantum => rounding step of points
+    :return: fingerprint
+    :rtype: string
+    """
+    hasher = hashlib.sha1("{}_{}_{}".format(nb_vtx, nb_edges, nb_faces).encode("utf-8"))
+    quantised = np.round(np.asarray(points, dtype=np.float64) / quantum).astype(np.int64)
+    hasher.update(quantised.tobytes())
+    return hasher.hexdigest()
+
+
+def get_cache_path(scene_path, cache_folder=None):
+    """
+    Cache file of a scene, in a user folder: never next to the scene, which can be a publish area.
+    Version is removed from the name so that versions of a scene share the same cache,
+    and a hash of the scene folder avoids clashes between assets of the same name.
+    Eg: .../Asset/Asset_MDL_v003.ma => <tmp>/detect_sym_auto/Asset_MDL_1a2b3c4d_sym_cache.json
+    :param: scene_path
+    :param: cache_folder => folder of cache files, CACHE_FOLDER by default
+    :return: cache_path, None for an untitled scene
+    :rtype: string
+    """
+    if not scene_path:
+        return None
+    raw_name = os.path.splitext(os.path.basename(scene_path))[0]
+    raw_name = re.sub(r'[._]v\d+$', '', raw_name)
+    folder_hash = hashlib.sha1(os.path.dirname(scene_path).encode("utf-8")).hexdigest()[:8]
+    return os.path.join(cache_folder or CACHE_FOLDER, "{}_{}_sym_cache.json".format(raw_name, folder_hash))
+
+
+class SymCache(object):
+    """
+    Self symetry scores and pair scores of meshes, keyed by fingerprint.
+    Entries not used during a run are evicted by evict() before save().
+    """
+    def __init__(self, path):
+        self.path = path
+        self.datas = {"version": CACHE_VERSION, "self": {}, "pairs": {}}
+        self.used = dict((section, set()) for section in SECTIONS)
+        self.load()
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r') as cache_file:
+                datas = json.load(cache_file)
+        except Exception as e:
+            logging.warning('Sym cache "{}" cant be read, it will be rebuilt: {}'.format(self.path, e))
+            return
+        if datas.get("version") != CACHE_VERSION:
+            logging.info('Sym cache "{}" is outdated, it will be rebuilt.'.format(self.path))
+            return
+        for section in SECTIONS:
+            self.datas[section] = datas.get(section, {})
+
+    def save(self):
+        if not self.path:
+            return
+        try:
+            folder = os.path.dirname(self.path)
+            if folder and not os.path.isdir(folder):
+                os.makedirs(folder)
+            with open(self.path, 'w') as cache_file:
+                json.dump(self.datas, cache_file, indent=4)
+        except Exception as e:
+            logging.warning('Sym cache "{}" cant be saved: {}'.format(self.path, e))
+
+    @staticmethod
+    def get_pair_key(fingerprint01, fingerprint02):
+        return "|".join(sorted([fingerprint01, fingerprint02]))
+
+    def _get(self, section, key):
+        self.used[section].add(key)
+        return self.datas[section].get(key)
+
+    def _set(self, section, key, score):
+        self.used[section].add(key)
+        self.datas[section][key] = score
+
+    def get_self_score(self, fingerprint):
+        """
+        :return: cached self symetry scores {axis: percentage}, None if mesh is unknown / has changed
+        :rtype: float
+        """
+        return self._get("self", fingerprint)
+
+    def set_self_score(self, fingerprint, score):
+        self._set("self", fingerprint, score)
+
+    def get_pair_score(self, fingerprint01, fingerprint02):
+        """
+        :return: cached pair score, None if one of the meshes is unknown / has changed
+        :rtype: float
+        """
+        return self._get("pairs", self.get_pair_key(fingerprint01, fingerprint02))
+
+    def set_pair_score(self, fingerprint01, fingerprint02, score):
+        self._set("pairs", self.get_pair_key(fingerprint01, fingerprint02), score)
+
+    def evict(self, section):
+        """
+        Remove entries of section not used since the cache was loaded (stale meshes)
+        :param: section => self or pairs
+        :return: nb of evicted entries
+        :rtype: int
+        """
+        stale = [key for key in self.datas[section] if key not in self.used[section]]
+        for key in stale:
+            del self.datas[section][key]
+        if stale:
+            logging.debug('{} stale entries evicted from sym cache ({}).'.format(len(stale), section))
+        return len(stale)
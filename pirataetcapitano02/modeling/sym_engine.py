@@ -0,0 +1,248 @@
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+#   AUTHORS :           Sophie Chauvet
+#                       Nicolas Dorey
+#
+#   DESCRIPTION :       Symetry scoring engine of detect_sym_auto, working on exported point arrays.
+#                       Pure python / numpy, no maya import: scores can be computed in a process pool,
+#                       outside of maya process, or in tests and benchmarks.
+#
+#   Update  1.0.0 :     We start here.
+#           1.0.1 :     No pool without spawn, progress callback while the pool works.
+#
+#   KnownBugs :         None atm.
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+
+import logging
+import multiprocessing
+import os
+
+try:
+    import numpy as np
+except ImportError:
+    pass
+
+from . import sym_matching
+
+
+AXIS_INDEX = {"x": 0, "y": 1, "z": 2}
+# the two other axis of each axis, used to compute angles of vtx
+OTHER_AXIS = {0: (1, 2), 1: (2, 0), 2: (0, 1)}
+
+# threshold of substraction between axis
+SEUIL_SYMETRY = 0.1
+# degrees of threshold, for self symetry and for pairs
+SEUIL_ANGLE_SELF = 20
+SEUIL_ANGLE_PAIRS = 5
+
+# under this nb of jobs, starting processes is slower than scoring in current process
+MIN_POOL_JOBS = 32
+# seconds between two calls of wait_callback of run_jobs
+WAIT_TIME = 0.1
+
+
+# ________________________________________________________________________________________________________
+##########################
+# -------SCORING---------#
+##########################
+
+def score_self_symetry(points, axis="x", piv=0):
+    """
+    Self symetry of a mesh on an axis based on vertex pos.
+    Vtx too close to the pivot (1% of bounding box) are skipped.
+    :param: points => (nb_vtx, 3) world positions
+    :param: axis => x, y or z
+    :param: piv => 0 BY DEFAULT / Or center of object on axis
+    :return: corresp in percentage of match
+    :rtype: float
+    """
+    axis_select = AXIS_INDEX[axis]
+    axis1, axis2 = OTHER_AXIS[axis_select]
+    points = np.asarray(points, dtype=np.float64)
+    all_vtx_axis0 = points[:, axis_select]
+    if len(all_vtx_axis0) == 0:
+        return 0
+
+    # threshold = un per cent of bouding box
+    threshold = float(all_vtx_axis0.max() - all_vtx_axis0.min()) / 100
+
+    # difference between vertex and pivot's axis
+    diff = all_vtx_axis0 - piv
+    outside = np.fabs(diff) > threshold
+    idx_postv = np.flatnonzero(outside & (diff > 0))
+    idx_neg = np.flatnonzero(outside & (diff < 0))
+
+    # if the mesh has not the same nb of vtx on each side.
+    if len(idx_postv) != len(idx_neg):
+        return 0
+
+    all_angles = sym_matching.get_vtx_angles(points[:, axis1], points[:, axis2])
+    return sym_matching.mirror_match_percentage(
+        diff[idx_postv], all_angles[idx_postv], diff[idx_neg], all_angles[idx_neg],
+        seuil_symetry=SEUIL_SYMETRY, seuil_angle=SEUIL_ANGLE_SELF)
+
+
+def score_pair(points01, points02, center01, center02, axis="x"):
+    """
+    Symetry between two meshes on an axis based on vertex pos.
+    :param: points01, points02 => (nb_vtx, 3) world positions of both meshes
+    :param: center01, center02 => center of objects, to know which one is right/left
+    :param: axis => x, y or z
+    :return: corresp in percentage of match
+    :rtype: float
+    """
+    axis_select = AXIS_INDEX[axis]
+    axis1, axis2 = OTHER_AXIS[axis_select]
+    # check with pivot if mesh01/mesh02 are right or left
+    if center01[axis_select] > center02[axis_select]:
+        right_points, left_points = points01, points02
+    else:
+        right_points, left_points = points02, points01
+    right_points = np.asarray(right_points, dtype=np.float64)
+    left_points = np.asarray(left_points, dtype=np.float64)
+
+    angles_right = sym_matching.get_vtx_angles(right_points[:, axis1], right_points[:, axis2])
+    angles_left = sym_matching.get_vtx_angles(left_points[:, axis1], left_points[:, axis2])
+    return sym_matching.mirror_match_percentage(
+        right_points[:, axis_select], angles_right, left_points[:, axis_select], angles_left,
+        seuil_symetry=SEUIL_SYMETRY, seuil_angle=SEUIL_ANGLE_PAIRS)
+
+
+# ________________________________________________________________________________________________________
+##########################
+# ---------JOBS----------#
+##########################
+
+def self_job(key, points, pivot=(0, 0, 0), axes=("x", "y", "z")):
+    """
+    :param: key => anything to find back the result, for ex the mesh name
+    :param: points => (nb_vtx, 3) array or path of a .npy file (see dump_points)
+    :param: pivot => pivot of the mesh on each axis
+    :param: axes => axis to score
+    """
+    return {"type": "self", "key": key, "points": points, "pivot": list(pivot), "axes": list(axes)}
+
+
+def pair_job(key, points01, points02, center01, center02, axis="x"):
+    """
+    :param: key => anything to find back the result, for ex (mesh01, mesh02)
+    :param: points01, points02 => (nb_vtx, 3) arrays or paths of .npy files (see dump_points)
+    :param: center01, center02 => center of objects
+    """
+    return {"type": "pair", "key": key, "points01": points01, "points02": points02,
+            "center01": list(center01), "center02": list(center02), "axis": axis}
+
+
+def load_points(points):
+    """
+    :param: points => array or path of a .npy file
+    :rtype: numpy.ndarray
+    """
+    if isinstance(points, np.ndarray):
+        return points
+    return np.load(points, mmap_mode="r")
+
+
+def run_job(job):
+    """
+    Score one job. Module level function so it can be sent to a process pool.
+    :return: (key, score) => score is {axis: percentage} for self jobs, a percentage for pair jobs
+    :rtype: tuple
+    """
+    if job["type"] == "self":
+        points = load_points(job["points"])
+        score = dict((axis, score_self_symetry(points, axis=axis, piv=job["pivot"][AXIS_INDEX[axis]]))
+                     for axis in job["axes"])
+    else:
+        score = score_pair(load_points(job["points01"]), load_points(job["points02"]),
+                           job["center01"], job["center02"], axis=job["axis"])
+    return (job["key"], score)
+
+
+def run_chunk(jobs):
+    """
+    Score a chunk of jobs, in a pool process.
+    :rtype: list
+    """
+    return [run_job(job) for job in jobs]
+
+
+def get_pool_size(nb_jobs, processes=None):
+    """
+    Nb of processes to score nb_jobs, 0 to stay in current process.
+    A pool is used only with spawn (a maya session is never forked), and only if there are
+    enough jobs to pay the start of the processes.
+    :param: nb_jobs
+    :param: processes => nb of processes, None for nb of cpus, 0 or 1 to stay in current process
+    :rtype: int
+    """
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    processes = min(processes, nb_jobs)
+    if processes <= 1 or nb_jobs < MIN_POOL_JOBS:
+        return 0
+    if not hasattr(multiprocessing, "get_context"):
+        # python 2: only fork on linux, never fork a maya session
+        logging.warning("No spawn start method, {} jobs are scored in current process".format(nb_jobs))
+        return 0
+    return processes
+
+
+def run_jobs(jobs, processes=None, executable=None, wait_callback=None):
+    """
+    Score all jobs, in a process pool if more than one process is asked (see get_pool_size).
+    :param: jobs => list of self_job / pair_job
+    :param: processes => nb of processes, None for nb of cpus, 0 or 1 to stay in current process
+    :param: executable => python interpreter of the pool processes (mayapy inside maya)
+    :param: wait_callback => called with (nb of jobs done, nb of jobs) while the pool works,
+                             for ex to update a progress window
+    :return: results => list of (key, score), same order as jobs
+    :rtype: list
+    """
+    processes = get_pool_size(len(jobs), processes)
+    if not processes:
+        return [run_job(job) for job in jobs]
+
+    # never fork a maya session, start fresh interpreters
+    context = multiprocessing.get_context("spawn")
+    if executable is not None:
+        context.set_executable(executable)
+
+    logging.info("Scoring {} jobs on {} processes".format(len(jobs), processes))
+    results = []
+    pool = context.Pool(processes)
+    try:
+        chunksize = max(1, len(jobs) // (processes * 4))
+        async_results = [pool.apply_async(run_chunk, (jobs[idx:idx + chunksize],))
+                         for idx in range(0, len(jobs), chunksize)]
+        for async_result in async_results:
+            while not async_result.ready():
+                async_result.wait(WAIT_TIME)
+                if wait_callback is not None:
+                    wait_callback(len(results), len(jobs))
+            results.extend(async_result.get())
+        if wait_callback is not None:
+            wait_callback(len(results), len(jobs))
+    finally:
+        pool.close()
+        pool.join()
+    return results
+
+
+def dump_points(points_by_key, folder):
+    """
+    Dump point buffers once in .npy files, so pool processes can load them without pickling.
+    :param: points_by_key => {key: (nb_vtx, 3) array}
+    :param: folder => where to write
+    :return: paths_by_key => {key: path of .npy}
+    :rtype: dict
+    """
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+    paths_by_key = {}
+    for idx, (key, points) in enumerate(sorted(points_by_key.items())):
+        path = os.path.join(folder, "points_{:06d}.npy".format(idx))
+        np.save(path, np.ascontiguousarray(points, dtype=np.float64))
+        paths_by_key[key] = path
+    return paths_by_key
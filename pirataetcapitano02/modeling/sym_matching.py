@@ -0,0 +1,132 @@
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+#   AUTHORS :           Sophie Chauvet
+#                       Nicolas Dorey
+#
+#   DESCRIPTION :       Mirror matching of vtx positions for detect_sym_auto.
+#                       Pure math, no maya import: can be used outside of maya.
+#
+#   Update  1.0.0 :     We start here.
+#           1.0.1 :     pop_match takes the closest point of the 9 cells, not the first one found.
+#
+#   KnownBugs :         None atm.
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+
+import math
+
+try:
+    import numpy as np
+except ImportError:
+    pass
+
+
+# neighbour cells to visit around a query cell
+NEIGHBOUR_CELLS = [(du, dw) for du in (-1, 0, 1) for dw in (-1, 0, 1)]
+
+
+def get_vtx_angles(axis1_values, axis2_values):
+    """
+    Angle (in degrees) of each vtx around the mirror axis.
+    :param: axis1_values, axis2_values => pos of vtx on the two other axis
+    :return: angles
+    :rtype: numpy.ndarray
+    """
+    return np.degrees(np.arctan2(axis1_values, axis2_values))
+
+
+class MirrorIndex(object):
+    """
+    Spatial index of one side of a mesh, mirrored across the symetry plane.
+    Points are stored in a grid of (seuil_symetry x seuil_angle) cells, so a query only
+    visits the 9 cells around it instead of every point of the other side.
+    """
+    def __init__(self, axis_values, angle_values, seuil_symetry, seuil_angle):
+        """
+        :param: axis_values => pos of vtx on mirror axis (not mirrored yet)
+        :param: angle_values => angles of vtx from get_vtx_angles()
+        :param: seuil_symetry => max distance on mirror axis
+        :param: seuil_angle => max delta of angle, in degrees
+        """
+        self.seuil_symetry = float(seuil_symetry)
+        self.seuil_angle = float(seuil_angle)
+        # mirror across the plane
+        axis_values = -np.asarray(axis_values, dtype=np.float64)
+        angle_values = np.asarray(angle_values, dtype=np.float64)
+        # python lists are faster than numpy arrays for item by item lookups
+        self.axis_values = axis_values.tolist()
+        self.angle_values = angle_values.tolist()
+        self.cells = {}
+        cells_u = np.floor(axis_values / self.seuil_symetry).astype(np.int64)
+        cells_w = np.floor(angle_values / self.seuil_angle).astype(np.int64)
+        for idx, cell in enumerate(zip(cells_u.tolist(), cells_w.tolist())):
+            self.cells.setdefault(cell, []).append(idx)
+
+    def pop_match(self, axis_value, angle_value):
+        """
+        Find the closest point in tolerances and remove it from the index, so it can't be matched twice.
+        Distance is normalized by the tolerances, so both axis weigh the same.
+        :param: axis_value, angle_value => pos and angle of the query vtx
+        :return: index of matched point, None if no match
+        :rtype: int or None
+        """
+        cell_u = int(math.floor(axis_value / self.seuil_symetry))
+        cell_w = int(math.floor(angle_value / self.seuil_angle))
+        best = None
+        for du, dw in NEIGHBOUR_CELLS:
+            bucket = self.cells.get((cell_u + du, cell_w + dw))
+            if not bucket:
+                continue
+            for position, idx in enumerate(bucket):
+                delta_axis = math.fabs(axis_value - self.axis_values[idx])
+                if delta_axis >= self.seuil_symetry:
+                    continue
+                delta_angle = math.fabs(angle_value - self.angle_values[idx])
+                if delta_angle >= self.seuil_angle:
+                    continue
+                distance = (delta_axis / self.seuil_symetry) ** 2 + (delta_angle / self.seuil_angle) ** 2
+                if best is None or distance < best[0]:
+                    best = (distance, bucket, position, idx)
+        if best is None:
+            return None
+        distance, bucket, position, idx = best
+        # swap with last item to remove in O(1)
+        bucket[position] = bucket[-1]
+        bucket.pop()
+        return idx
+
+
+def count_mirror_matches(pos_axis, pos_angles, neg_axis, neg_angles, seuil_symetry, seuil_angle):
+    """
+    Count vtx of positive side having a mirrored vtx on negative side.
+    Each negative vtx can match only once.
+    :param: pos_axis, neg_axis => pos of vtx on mirror axis, for each side
+    :param: pos_angles, neg_angles => angles of vtx, for each side
+    :param: seuil_symetry, seuil_angle => tolerances
+    :return: nb of matches
+    :rtype: int
+    """
+    if len(pos_axis) == 0 or len(neg_axis) == 0:
+        return 0
+    index = MirrorIndex(neg_axis, neg_angles, seuil_symetry, seuil_angle)
+    pos_axis = np.asarray(pos_axis, dtype=np.float64)
+    pos_angles = np.asarray(pos_angles, dtype=np.float64)
+    # walk the positive side from the plane to the outside
+    order = np.argsort(pos_axis, kind="mergesort")
+    matches = 0
+    for axis_value, angle_value in zip(pos_axis[order].tolist(), pos_angles[order].tolist()):
+        if index.pop_match(axis_value, angle_value) is not None:
+            matches += 1
+    return matches
+
+
+def mirror_match_percentage(pos_axis, pos_angles, neg_axis, neg_angles, seuil_symetry, seuil_angle):
+    """
+    Percentage of vtx of positive side having a mirrored vtx on negative side.
+    :return: corresp => 0 to 100
+    :rtype: float
+    """
+    if len(pos_axis) == 0:
+        return 0
+    matches = count_mirror_matches(pos_axis, pos_angles, neg_axis, neg_angles, seuil_symetry, seuil_angle)
+    return float((float(100) * float(matches)) / len(pos_axis))
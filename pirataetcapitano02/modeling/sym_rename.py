@@ -0,0 +1,227 @@
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+#   AUTHORS :           Sophie Chauvet
+#                       Nicolas Dorey
+#
+#   DESCRIPTION :       Rename planner of detect_sym_auto.
+#                       Final names are computed in memory against a registry of all short names of the scene,
+#                       then applied in one pass, in a single undo chunk.
+#
+#   Update  1.0.0 :     We start here.
+#           1.0.1 :     apply() renames nodes to temp names first, so plans can swap names.
+#           1.0.2 :     NameRegistry counts short names used by many nodes.
+#
+#   KnownBugs :         None atm.
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+
+from collections import Counter, OrderedDict
+import logging
+import re
+
+try:
+    import maya.cmds as cmds
+except ImportError:
+    pass
+
+
+# same pattern as update_nodes.increment_name
+INCREMENT_PATTERN = r'_\d\d\d_'
+# same pattern as update_nodes.replace_suffixe
+SUFFIXE_PATTERN = r'\d{1,}$'
+
+
+def get_short_name(node):
+    """
+    :param: node => long or short name
+    :return: short name, without its parents
+    :rtype: string
+    """
+    return node.split('|')[-1]
+
+
+def remove_suffixe(name, regexp=SUFFIXE_PATTERN):
+    """
+    Remove the digits at the end of name, like update_nodes.replace_suffixe without clash check.
+    Ex: mesh23 => mesh
+    :rtype: string
+    """
+    return re.sub(regexp, '', name)
+
+
+class NameRegistry(object):
+    """
+    Short names of every node of the scene, loaded once.
+    Replace cmds.objExists() calls in increment loops by a lookup in a dict.
+    A short name can be used by many nodes under different parents: names are counted,
+    a name is free again only when no node uses it.
+    """
+    def __init__(self, names=None):
+        self.names = Counter(names or [])
+
+    @classmethod
+    def from_scene(cls):
+        """
+        :return: registry of all nodes of current scene
+        :rtype: NameRegistry
+        """
+        return cls([get_short_name(node) for node in cmds.ls(long=True)])
+
+    def exists(self, name):
+        return self.names[name] > 0
+
+    def reserve(self, name):
+        self.names[name] += 1
+
+    def release(self, name):
+        if self.names[name] > 1:
+            self.names[name] -= 1
+        else:
+            self.names.pop(name, None)
+
+    def increment_name(self, name, regex=INCREMENT_PATTERN, fill_length=3):
+        """
+        Same rules as update_nodes.increment_name: the first free number is used in the _ddd_ part.
+        :return: final_name => name unchanged if it has no _ddd_ part
+        :rtype: string
+        """
+        match = re.search(regex, name)
+        if match is None:
+            return name
+        new_name = name[:match.start()] + '_{}_' + name[match.end():]
+        int_match = 1
+        while self.exists(new_name.format(str(int_match).zfill(fill_length))):
+            int_match += 1
+        return new_name.format(str(int_match).zfill(fill_length))
+
+    def get_unique_name(self, name):
+        """
+        Name not used by any node.
+        _ddd_ part is incremented if name has one, else a number is added at the end like maya does.
+        :rtype: string
+        """
+        if not self.exists(name):
+            return name
+        final_name = self.increment_name(name)
+        if not self.exists(final_name):
+            return final_name
+        raw_name = remove_suffixe(name)
+        int_match = 1
+        while self.exists('{}{}'.format(raw_name, int_match)):
+            int_match += 1
+        return '{}{}'.format(raw_name, int_match)
+
+
+class RenamePlan(object):
+    """
+    Ordered renames of nodes, keyed by their long name when the plan was created.
+    Nothing is renamed in the scene before apply().
+    """
+    def __init__(self, registry=None):
+        self.registry = registry if registry is not None else NameRegistry.from_scene()
+        self.renames = OrderedDict()
+
+    def get_name(self, node):
+        """
+        :param: node => long name
+        :return: short name of node once the plan is applied
+        :rtype: string
+        """
+        return self.renames.get(node, get_short_name(node))
+
+    def rename(self, node, new_name):
+        """
+        Plan a rename. Name is incremented if already used.
+        :param: node => long name
+        :param: new_name => short name
+        :return: final_name => name node will have
+        :rtype: string
+        """
+        current_name = self.get_name(node)
+        if new_name == current_name:
+            return current_name
+        self.registry.release(current_name)
+        final_name = self.registry.get_unique_name(new_name)
+        self.registry.reserve(final_name)
+        if final_name == get_short_name(node):
+            self.renames.pop(node, None)
+        else:
+            self.renames[node] = final_name
+        return final_name
+
+    def as_dict(self):
+        """
+        Plan as a dry run.
+        :return: renames => {long name: new short name}
+        :rtype: dict
+        """
+        return dict(self.renames)
+
+    def log(self, logger=logging):
+        for node, new_name in self.renames.items():
+            logger.info("OLD NAME // NEW NAME\n{}\n{} \n\n ".format(node, new_name))
+
+    def get_temp_names(self, prefix="renamePlanTmp"):
+        """
+        Name not used in scene for each planned node, so the plan can swap or chain names.
+        :return: temp_names => {long name: temp short name}
+        :rtype: dict
+        """
+        temp_names = {}
+        for node in self.renames:
+            temp_names[node] = self.registry.get_unique_name('{}{}'.format(prefix, len(temp_names) + 1))
+            self.registry.reserve(temp_names[node])
+        return temp_names
+
+    @staticmethod
+    def get_renamed_path(node, names):
+        """
+        Long name of node once some of its parents (or itself) are renamed.
+        :param: node => long name
+        :param: names => {long name: new short name}
+        :rtype: string
+        """
+        parts = node.split('|')
+        new_parts = list(parts)
+        for idx in range(1, len(parts)):
+            new_name = names.get('|'.join(parts[:idx + 1]))
+            if new_name is not None:
+                new_parts[idx] = new_name
+        return '|'.join(new_parts)
+
+    def apply(self, chunk_name="rename_plan"):
+        """
+        Rename all nodes in one undo chunk, in two passes:
+        every node gets a temp name first, so a final name can be one of another planned node (swap of L/R).
+        Deepest nodes are renamed first in each pass, so long names of their parents stay valid.
+        :return: renamed => {long name: name given by maya}
+        :rtype: dict
+        """
+        renamed = {}
+        nodes = sorted(self.renames, key=lambda node: node.count('|'), reverse=True)
+        temp_names = self.get_temp_names()
+        wrong_names = []
+        cmds.undoInfo(openChunk=True, chunkName=chunk_name)
+        try:
+            renamed_to_temp = {}
+            for node in nodes:
+                try:
+                    cmds.rename(node, temp_names[node])
+                except Exception as e:
+                    logging.warning('{} // Object has no proper new name {} // {}'.format(e, node, self.renames[node]))
+                    continue
+                renamed_to_temp[node] = temp_names[node]
+            for node in nodes:
+                if node not in renamed_to_temp:
+                    continue
+                renamed[node] = cmds.rename(self.get_renamed_path(node, renamed_to_temp), self.renames[node])
+                if renamed[node] != self.renames[node]:
+                    wrong_names.append('{} renamed {} instead of {}'.format(node, renamed[node], self.renames[node]))
+        finally:
+            cmds.undoInfo(closeChunk=True)
+            for temp_name in temp_names.values():
+                self.registry.release(temp_name)
+        if wrong_names:
+            raise RuntimeError('Rename plan not applied as planned (undo "{}" to revert it):\n{}'.format(
+                chunk_name, '\n'.join(wrong_names)))
+        return renamed
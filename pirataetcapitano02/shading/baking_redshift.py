@@ -29,6 +29,7 @@ from ....studio.libs.updates import nodes as update_nodes
 from ....studio.libs.updates import references as update_references
 from ....studio.libs.updates import scene as update_scene
 from ....studio.libs.deletes import scene as delete_scene
+from ....tools.logger import extra_logger
 
 
 class BakingRedshift(object):
@@ -43,6 +44,8 @@ class BakingRedshift(object):
         unsmooth meshes and unhide groups
         """
         self.size = 2048
+        # timings of steps of the bake, a new one for each setup_scene
+        self.timings = extra_logger.Timings()
         # TODO: check via shotgun the lastest publish of arbo
         utility_path = "L:/Millimages/PirataEtCapitano/PirataEtCapitano02/ProjectFiles/assets/SHAUtilities01/SHAUtilities01_Fresnel/SHA/publish/maya"
         self.ARBO = read_scene.get_lastest_version_digit(path=utility_path, extention="ma")
@@ -577,7 +580,18 @@ class BakingRedshift(object):
         """
         Setup scene to bake and remove files.
         List all meshes, launch bake and delete temp files of bake.
-        """
+        Time of each step is logged at the end, and written in a chrome trace next to the log.
+        """
+        # timings of this run only, a tool running this one keeps its own
+        self.timings = extra_logger.Timings()
+        with self.timings.span('setup_scene'):
+            self.bake_all_meshes()
+        logging.info("Timings:\n{}".format(self.timings.get_summary_table()))
+        trace_path = '{}_trace.json'.format(os.path.splitext(self.log_file)[0])
+        self.timings.write_trace(trace_path)
+        logging.info("Trace written in {}".format(trace_path))
+
+    def bake_all_meshes(self):
         self.create_dir(self.TMP_BAKE)
         self.create_dir(self.OUT_BAKE)
         self.create_dir(self.OUTPATH_BAKE)
@@ -599,19 +613,22 @@ class BakingRedshift(object):
                 longnameMsh = mesh
                 # combine and separate
                 logging.info("Launching procedure for Mesh %s" % mesh)
-                update_nodes.combineSeparate(mesh)
+                with self.timings.span('combineSeparate', mesh=mesh):
+                    update_nodes.combineSeparate(mesh)
 
                 shader = read_shaders.get_mesh_shader(longnameMsh)
 
                 # isolate mesh
-                update_nodes.isolate_object(myObject=longnameMsh, visibility=False)
+                with self.timings.span('isolate_object', mesh=mesh):
+                    update_nodes.isolate_object(myObject=longnameMsh, visibility=False)
                 mesh = cmds.ls(mesh, sn=True)[0]
 
                 # baking
                 logging.info('Launching bake for: %s' % mesh)
 
                 if shader:
-                    self.launch_baking(mesh=mesh, shader=shader, renderPass=renderPass)
+                    with self.timings.span('launch_baking', mesh=mesh):
+                        self.launch_baking(mesh=mesh, shader=shader, renderPass=renderPass)
                 else:
                     logging.error('No shader found on mesh ! %s' % mesh)
 
@@ -622,7 +639,8 @@ class BakingRedshift(object):
                 logging.info('The mesh %s dosnt exist' % mesh)
 
         update_nodes.isolate_object(myObject=longnameMsh, visibility=True)
-        self.delete_old_files()
+        with self.timings.span('delete_old_files'):
+            self.delete_old_files()
         cmds.delete(['Mask_Shd', "Mask_Ramp"])
 
         logging.info('*' * 30 + "BAKING DONE FOR ALL MESHES" + "*" * 30)
@@ -21,4 +21,8 @@ except Exception as e:
 try:
     from . import scene
 except Exception as e:
-    print("{}: Failed to import `fw_maya.libs.checks.scene`: {}'".format(e.__class__.__name__, e.message))
\ No newline at end of file
+    print("{}: Failed to import `fw_maya.libs.checks.scene`: {}'".format(e.__class__.__name__, e.message))
+try:
+    from . import offline
+except Exception as e:
+    print("{}: Failed to import `fw_maya.libs.checks.offline`: {}'".format(e.__class__.__name__, e.message))
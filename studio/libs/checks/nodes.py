@@ -6,6 +6,7 @@
 #   DESCRIPTION :       Nodes checks lib
 #
 #   Update  1.0.0 :     We start here.
+#           1.1.0 :     Mesh checks evaluate a MeshInspection (reads.meshes), queried once per mesh.
 #
 #   KnownBugs :         None atm.
 # ------------------------------------------------------------------------------------------------------------------------------------- #
@@ -20,6 +21,7 @@ try:
 except ImportError:
     pass
 
+from ..reads import meshes as read_meshes
 from ..reads import nodes as read_nodes
 from ..reads import scene as read_scene
 
@@ -34,6 +36,12 @@ SPLIT_SET_SUFFIX = 'SplitSet'
 MDL_STEP_SN = 'MDL'
 MASTER_ROOT_SET = 'MasterSets'
 SOURCE_ATTR = 'source'
+# node types allowed by check_unauthorized_nodes
+AUTHORIZED_NODE_TYPES = ['transform', 'mesh']
+# render stats checked by check_render_stats
+RENDER_STATS_ON = ["castsShadows", "receiveShadows", "motionBlur", "primaryVisibility", "smoothShading",
+                   "visibleInReflections", "visibleInRefractions"]
+RENDER_STATS_OFF = ["holdOut"]
 
 
 # ________________________________________________________________________________________________________
@@ -77,7 +85,7 @@ def check_unauthorized_nodes(exception=None, blackList=[], logger=logging):
     :rtype: list
     """
     basic_nodes = get_basic_nodes()
-    authorized = ['transform', 'mesh']
+    authorized = list(AUTHORIZED_NODE_TYPES)
     if exception:
         if type(exception) == list:
             authorized += exception
@@ -604,32 +612,44 @@ def check_assets_sets(variationDict, step_name, logger=logging):
 # ------ HISTORY --------#
 ##########################
 
-def check_history(mesh, logger=logging):
+def get_inspection(mesh, inspection=None):
+    """
+    :param: mesh
+    :param: inspection => MeshInspection of mesh already queried, None to query it
+    :rtype: read_meshes.MeshInspection
+    """
+    if inspection is None:
+        if type(mesh) == list:
+            mesh = mesh[0]
+        inspection = read_meshes.inspect_mesh(mesh)
+    return inspection
+
+
+def check_history(mesh, logger=logging, inspection=None):
     """
     Return true / false if mesh has history
     :param: mesh
+    :param: inspection => MeshInspection of mesh, see get_inspection
     :return: check_hist
     :rtype: boolean
     """
+    inspection = get_inspection(mesh, inspection)
     check_hist = True
-    shape = read_nodes.get_shape_or_transform(mesh)
-    shape = cmds.ls(shape, sn=True)
-    history = cmds.listHistory(mesh, lv=0)
-    history = [h for h in history if h not in shape]
-    if history:
+    if inspection.history:
         check_hist = False
     return check_hist
 
 
-def check_skin_on_mesh(mesh, logger=logging):
+def check_skin_on_mesh(mesh, logger=logging, inspection=None):
     """
     Check if skin exists on mesh
     :param: mesh
+    :param: inspection => MeshInspection of mesh, see get_inspection
     :return: any node with hist
     :rtype: boolean
     """
-    hist = cmds.listHistory(mesh, lv=0)
-    return any("skinCluster" in cmds.nodeType(node) for node in hist)
+    inspection = get_inspection(mesh, inspection)
+    return any("skinCluster" in node_type for node_type in inspection.history_types)
 
 
 # ________________________________________________________________________________________________________
@@ -655,36 +675,36 @@ def check_mesh_attr(mesh, attrName):
 
 
 # TODO: clean comment
-def check_visbility(mesh, logger=logging):
+def check_visbility(mesh, logger=logging, inspection=None):
     """
     Check if shape has visibility ON
     Correct the visibility
     :param: mesh
+    :param: inspection => MeshInspection of mesh, see get_inspection
     :return: check_visib
     :rtype: boolean
     """
+    inspection = get_inspection(mesh, inspection)
     check_visib = True
-    if type(mesh) == list:
-        mesh = mesh[0]
-    visibility = cmds.getAttr(mesh + ".visibility")
-    if visibility is False:
+    if inspection.visibility is False:
         check_visib = False
         # logger.info('OBJECT HAVE BEEN DISPLAYED {}'.format(mesh))
         # cmds.setAttr(mesh+".visibility", True)
     return check_visib
 
 
-def check_is_freeze_transf(mesh, logger=logging):
+def check_is_freeze_transf(mesh, logger=logging, inspection=None):
     """
     Return true / false if mesh has transform values
     :param: mesh
+    :param: inspection => MeshInspection of mesh, see get_inspection
     :return: check_ft
     :rtype: boolean
     """
+    inspection = get_inspection(mesh, inspection)
     check_ft = True
-    dico_transf = read_nodes.get_transform_info([mesh])[mesh]
-    attr_ = dico_transf['t'] + dico_transf['r']
-    attr_scale = dico_transf['s']
+    attr_ = inspection.translate + inspection.rotate
+    attr_scale = inspection.scale
     for att in attr_:
         if att != 0:
             check_ft = False
@@ -694,7 +714,7 @@ def check_is_freeze_transf(mesh, logger=logging):
     return check_ft
 
 
-def check_render_stats(mesh, logger=logging):
+def check_render_stats(mesh, logger=logging, inspection=None):
     """
     Check render stats of mesh. Must have:
         - Cast Shadows: ON
@@ -708,31 +728,19 @@ def check_render_stats(mesh, logger=logging):
         - Double Sided: ON
     Only check, wont correct it if not good.
     :param: mesh
+    :param: inspection => MeshInspection of mesh, see get_inspection
     :return: correct_rs
     :rtype: boolean
     """
+    inspection = get_inspection(mesh, inspection)
     correct_rs = True
-    shape = read_nodes.get_shape_or_transform(mesh)
-    attrb_on = [
-        "castsShadows",
-        "receiveShadows",
-        "motionBlur",
-        "primaryVisibility",
-        "smoothShading",
-        "visibleInReflections",
-        "visibleInRefractions"]
-    attrb_off = [
-        "holdOut",
-    ]
-    if type(shape) == list:
-        shape = shape[0]
-    for attr in attrb_on:
-        if cmds.getAttr(shape + "." + attr) is False:
+    for attr in RENDER_STATS_ON:
+        if inspection.render_stats.get(attr) is False:
             correct_rs = False
             # logger.info('ATTRIBUTE HAS BEEN REINIT {}'.format(attr))
             # cmds.setAttr(shape+"."+attr, True)
-    for attr in attrb_off:
-        if cmds.getAttr(shape + "." + attr) is True:
+    for attr in RENDER_STATS_OFF:
+        if inspection.render_stats.get(attr) is True:
             correct_rs = False
             # logger.info('ATTRIBUTE HAS BEEN REINIT {}'.format(attr))
             # cmds.setAttr(shape+"."+attr, False)
@@ -785,43 +793,42 @@ def check_clean_up(mesh, logger=logging):
 
 
 # TODO: snakecase
-def check_polyColorSet(mesh, logger=logging):
+def check_polyColorSet(mesh, logger=logging, inspection=None):
     """
-    Check poly color set on mesh
+    Check poly color set on mesh: no vertex should have a color channel above 0
     :param: mesh
+    :param: inspection => MeshInspection of mesh, see get_inspection
     :return: clean_pcs
     :rtype: boolean
     """
+    inspection = get_inspection(mesh, inspection)
     clean_pcs = True
-    nb_vtx = read_nodes.get_nb_of_component_of_mesh(meshElement=mesh, co_type="vtx")
-    idx_vtx = 1
-    while idx_vtx <= nb_vtx:
-        try:
-            result = cmds.polyColorPerVertex(mesh + ".vtx[{}]".format(idx_vtx), query=True, r=True, g=True, b=True)
-        except Exception as e:
-            result = [0, 0, 0]
-            print e
-        for num in result:
-            if num > 0:
-                clean_pcs = False
-        idx_vtx += 1
+    # without color set, vertices have no color
+    if not inspection.color_sets:
+        return clean_pcs
+    colored_vertices = read_meshes.get_colored_vertices_count(inspection.shape, inspection.color_sets)
+    for color_set, nb_vtx in sorted(colored_vertices.items()):
+        if nb_vtx:
+            logger.error("Color set {} colors {} vertices of {}".format(color_set, nb_vtx, mesh))
+            clean_pcs = False
     return clean_pcs
 
 
-def check_n_gones(mesh, logger=logging):
+def check_n_gones(mesh, logger=logging, inspection=None):
     """
     Check Ngones polygones, return if mesh has non_quads
     :param: mesh
+    :param: inspection => MeshInspection of mesh, see get_inspection
     :return: check_polys
     :rtype: bool
     """
+    inspection = get_inspection(mesh, inspection)
     check_polys = True
-    cmds.select(mesh)
-    cmds.polySelectConstraint(m=3, t=8, sz=3)  # to get N-sided
-    nb_ngones = cmds.polyEvaluate()["faceComponent"]
-    cmds.polySelectConstraint(m=0)
+    nb_ngones = 0
+    if inspection.faces is not None:
+        nb_ngones = len(inspection.faces.ngons)
     if nb_ngones != 0:
-        logger.error("Ngone(s) found on " + mesh)
+        logger.error("{} Ngone(s) found on {}".format(nb_ngones, mesh))
         check_polys = False
     return check_polys
 
@@ -836,20 +843,19 @@ def check_n_gones(mesh, logger=logging):
 #         return False
 #     # then continue with the rest of the checks.
 # """
-def check_geo_size(mesh, logger=logging):
+def check_geo_size(mesh, logger=logging, inspection=None):
     """
     Check if mesh has at least one face, 4 vtx, 4 edges
     :param: mesh
+    :param: inspection => MeshInspection of mesh, see get_inspection
     :return: check_geo
     :rtype: boolean
     """
+    inspection = get_inspection(mesh, inspection)
     check_geo = True
-    nb_face = read_nodes.get_nb_of_component_of_mesh(
-        meshElement=mesh, co_type="face")
-    nb_vtx = read_nodes.get_nb_of_component_of_mesh(
-        meshElement=mesh, co_type="vtx")
-    nb_edge = read_nodes.get_nb_of_component_of_mesh(
-        meshElement=mesh, co_type="edge")
+    nb_face = inspection.counts["face"]
+    nb_vtx = inspection.counts["vtx"]
+    nb_edge = inspection.counts["edge"]
     if nb_face < 1:
         check_geo = False
     if nb_vtx < 4:
@@ -864,29 +870,32 @@ def check_geo_size(mesh, logger=logging):
 # ------- OTHERS --------#
 ##########################
 
-def check_is_instanced(mesh, logger=logging):
+def check_is_instanced(mesh, logger=logging, inspection=None):
     """
     Return false is shape is instanced
     :param: mesh
+    :param: inspection => MeshInspection of mesh, see get_inspection
     :return: check_instance
     :rtype: boolean
     """
+    inspection = get_inspection(mesh, inspection)
     check_instance = True
-    shape = read_nodes.get_shape_or_transform(mesh)
-    if len(cmds.listRelatives(shape, ap=True) or []) > 1:
+    if len(inspection.parents) > 1:
         check_instance = False
     return check_instance
 
 
-def check_double_shape(mesh, logger=logging):
+def check_double_shape(mesh, logger=logging, inspection=None):
     """
     Check if mesh has double shape
     :param: mesh
+    :param: inspection => MeshInspection of mesh, see get_inspection
     :return: no_double
     :rtype: boolean
     """
+    inspection = get_inspection(mesh, inspection)
     no_double = True
-    shapes = cmds.listRelatives(mesh, shapes=True, fullPath=True)
-    if len(shapes) > 1:
+    if len(inspection.shapes) > 1:
         no_double = False
     return no_double
+
@@ -0,0 +1,381 @@
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+#   AUTHORS :           Nicolas Dorey
+#                       Romain Leclerc
+#
+#   DESCRIPTION :       Scene checks run on maya ascii files (.ma), without maya.
+#                       Same rules and same results as the checks run in maya (scene, nodes, layers, references),
+#                       evaluated on the index of libs.mayaascii. Scenes can be shared between processes.
+#                       Names and args of checks mirror checks.nodes (startFr, check_unknow_nodes...) on purpose.
+#
+#   Update  1.0.0 :     We start here.
+#
+#   KnownBugs :         Only nodes written in the file are seen: nodes of references and default nodes
+#                       created by maya at startup are not checked.
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+
+import argparse
+import json
+import logging
+import multiprocessing
+
+from ....libs.mayaascii import reads as mayaascii_reads
+from ....libs.system import crawler as system_crawler
+from ..reads import nodes as read_nodes
+from . import nodes as check_nodes
+
+
+SCENE_CONFIGURATION_NODE = "sceneConfigurationScriptNode"
+DEFAULT_DISPLAY_LAYER = "defaultLayer"
+UNKNOWN_REF_NODE = "_UNKNOWN_REF_NODE_"
+# namespaces maya always has, see reads.references.list_namespaces
+DEFAULT_NAMESPACES = ['UI', 'shared', 'root']
+# playbackOptions flags compared by check_frame_range
+PLAYBACK_FLAGS = {"-min": "minTime", "-minTime": "minTime", "-max": "maxTime", "-maxTime": "maxTime",
+                  "-ast": "animationStartTime", "-animationStartTime": "animationStartTime",
+                  "-aet": "animationEndTime", "-animationEndTime": "animationEndTime"}
+
+# logger of pool processes: failures are logged once by the main process
+SILENT_LOGGER = logging.getLogger(__name__ + ".worker")
+SILENT_LOGGER.addHandler(logging.NullHandler())
+SILENT_LOGGER.propagate = False
+
+
+def parse_scene(file_path):
+    """
+    Index of file_path with what the checks need: all nodes, and attributes of the scene configuration script only.
+    :param: file_path => .ma file
+    :rtype: SceneIndex
+    """
+    return mayaascii_reads.parse_scene(file_path, attribute_node_types=["script"])
+
+
+def get_short_name(node):
+    """
+    :param: node => node of SceneIndex
+    :return: name as listed by cmds.ls, without the root namespace of default nodes (:time1)
+    :rtype: string
+    """
+    return node["name"].lstrip(":") if node["name"] else node["path"]
+
+
+def get_playback_options(index):
+    """
+    Values of the playbackOptions command stored in the scene configuration script node.
+    :param: index => SceneIndex
+    :return: {"minTime", "maxTime", "animationStartTime", "animationEndTime"}, empty if not found
+    :rtype: dict
+    """
+    attribute = index.get_attribute(SCENE_CONFIGURATION_NODE, ".b")
+    if attribute is None:
+        return {}
+    values = attribute["values"]
+    if values is None:
+        # script bigger than the values kept in the index
+        statement = mayaascii_reads.read_statement(index.file_path, attribute["offset"], attribute["length"])
+        flags, positionals = mayaascii_reads.split_flags(mayaascii_reads.tokenize(statement)[1:],
+                                                        mayaascii_reads.FLAGS_WITH_ARG["setAttr"])
+        values = positionals[1:]
+    if not values:
+        return {}
+    tokens = mayaascii_reads.tokenize(values[-1])
+    playback_options = {}
+    for idx, (value, quoted) in enumerate(tokens[:-1]):
+        key = PLAYBACK_FLAGS.get(value)
+        if key is None:
+            continue
+        try:
+            playback_options[key] = float(tokens[idx + 1][0])
+        except ValueError:
+            continue
+    return playback_options
+
+
+# ________________________________________________________________________________________________________
+##########################
+# -------- SCENE --------#
+##########################
+
+def check_time_unit(index, logger=logging):
+    """
+    Check if the scene is setup in pal.
+    :param: index => SceneIndex
+    :return correct_time : True if current unit is pal
+    :rtype : bool
+    """
+    return index.units.get("time") == "pal"
+
+
+def check_frame_range(index, startFr=1001, endFr=1200, logger=logging):
+    """
+    Check frame range.
+    :param: index => SceneIndex
+    :param: startFr
+    :param: endFr
+    :return: True if playback is well setted
+    :rtype: boolean
+    """
+    playback_options = get_playback_options(index)
+    correct_fr = True
+    if playback_options.get("minTime") != startFr:
+        correct_fr = False
+    if playback_options.get("animationStartTime") != startFr:
+        correct_fr = False
+    if playback_options.get("animationEndTime") != endFr:
+        correct_fr = False
+    if playback_options.get("maxTime") != endFr:
+        correct_fr = False
+    return correct_fr
+
+
+# ________________________________________________________________________________________________________
+##########################
+# ----- NODE TYPE -------#
+##########################
+
+def check_unauthorized_nodes(index, exception=None, blackList=[], logger=logging):
+    """
+    Check if other nodes besides transform and shape
+    :param: index => SceneIndex
+    :param: exception => None by default
+    :param: blackList => empty list by default
+    :return: unauthorized
+    :rtype: list
+    """
+    basic_nodes = set(check_nodes.get_basic_nodes())
+    authorized = list(check_nodes.AUTHORIZED_NODE_TYPES)
+    if exception:
+        if type(exception) == list:
+            authorized += exception
+        else:
+            authorized.append(exception)
+    unauthorized = []
+    for node in index.nodes.values():
+        name = get_short_name(node)
+        if name.split(':')[-1] in basic_nodes:
+            continue
+        # type is None for existing nodes only selected in file, it cant be authorized
+        if name in blackList or node["type"] not in authorized:
+            unauthorized.append(name)
+    if unauthorized:
+        logger.error('WARNING! Unauthorized nodes in scene! {}'.format(unauthorized))
+    return unauthorized
+
+
+def check_unknow_nodes(index, logger=logging):
+    """
+    Check if scene has unknown nodes
+    :param: index => SceneIndex
+    :return: unknown
+    :rtype: list
+    """
+    unknown_types = set(read_nodes.UNKNOWN_NODE_TYPES)
+    unknown = [get_short_name(node) for node in index.nodes.values() if node["type"] in unknown_types]
+    if len(unknown) > 0:
+        logger.error("Warning! Unknown nodes found: {}".format(unknown))
+    return unknown
+
+
+# ________________________________________________________________________________________________________
+##########################
+# ------- LAYERS --------#
+##########################
+
+def check_display_layer(index, logger=logging):
+    """
+    Check if scene has display layer besides default
+    :param: index => SceneIndex
+    :return: all_disp
+    :rtype : list
+    """
+    all_disp = [get_short_name(node) for node in index.get_nodes_by_type("displayLayer")
+                if get_short_name(node) != DEFAULT_DISPLAY_LAYER]
+    if len(all_disp) > 0:
+        logger.error("DisplayLayers found: {}".format(all_disp))
+    return all_disp
+
+
+# ________________________________________________________________________________________________________
+##########################
+# ----- REFERENCES ------#
+##########################
+
+def check_if_scene_has_ref(index, logger=logging):
+    """
+    Check if scene has references
+    :param: index => SceneIndex
+    :return: ref
+    :rtype: list
+    """
+    ref = [get_short_name(node) for node in index.get_nodes_by_type("reference")]
+    for reference in index.references:
+        if reference["reference_node"] and reference["reference_node"] not in ref:
+            ref.append(reference["reference_node"])
+    if len(ref) > 0:
+        logger.error("References found: {}".format(ref))
+    return ref
+
+
+def check_unknown_ref_node(index, logger=logging):
+    """
+    Check if scene containts _UNKNOWN_REF_NODE_
+    :param: index => SceneIndex
+    :return: unknows
+    :rtype: list
+    """
+    unknown_ref = [get_short_name(node) for node in index.get_nodes_by_type("reference")
+                   if get_short_name(node) == UNKNOWN_REF_NODE]
+    if unknown_ref:
+        logger.error('{} // {}'.format('_UNKNOWN_REF_NODE_ found !!', unknown_ref))
+    return unknown_ref
+
+
+def check_namespaces(index, logger=logging):
+    """
+    Check if scene has namespaces: namespaces of references and of nodes
+    :param: index => SceneIndex
+    :return: namespaces
+    :rtype: list
+    """
+    namespaces = []
+    names = [reference["namespace"].lstrip(":") + ":" for reference in index.references if reference["namespace"]]
+    names += [get_short_name(node) for node in index.nodes.values()]
+    for name in names:
+        parts = name.split(":")[:-1]
+        # nested namespaces are listed with their parents, like namespaceInfo(recurse=True)
+        for idx in range(1, len(parts) + 1):
+            namespace = ":".join(parts[:idx])
+            if namespace and namespace not in DEFAULT_NAMESPACES and namespace not in namespaces:
+                namespaces.append(namespace)
+    if len(namespaces) > 0:
+        logger.error("NameSpaces found: {}".format(namespaces))
+    return namespaces
+
+
+# ________________________________________________________________________________________________________
+##########################
+# -------- RUN ----------#
+##########################
+
+# check name => check function, names are the ones of the checks run in maya
+CHECKS = [
+    ("check_time_unit", check_time_unit),
+    ("check_frame_range", check_frame_range),
+    ("check_namespaces", check_namespaces),
+    ("check_unknow_nodes", check_unknow_nodes),
+    ("check_unauthorized_nodes", check_unauthorized_nodes),
+    ("check_display_layer", check_display_layer),
+    ("check_if_scene_has_ref", check_if_scene_has_ref),
+    ("check_unknown_ref_node", check_unknown_ref_node),
+]
+
+
+def is_passed(result):
+    """
+    :param: result => value returned by a check: True / False, or list of bad nodes
+    :rtype: boolean
+    """
+    if isinstance(result, bool):
+        return result
+    return not result
+
+
+def run_checks(file_path, checks=None, check_kwargs=None, logger=logging):
+    """
+    Parse file_path once and run checks on it.
+    :param: file_path => .ma file
+    :param: checks => names of checks to run, None for all CHECKS
+    :param: check_kwargs => {check name: kwargs}, for ex {"check_frame_range": {"startFr": 101}}
+    :return: report => {"path", "results": {check name: result}, "passed": {check name: bool}, "error"}
+    :rtype: dict
+    """
+    report = {"path": file_path, "results": {}, "passed": {}, "error": None}
+    try:
+        index = parse_scene(file_path)
+    except (IOError, OSError) as e:
+        logger.error('Scene "{}" cant be read: {}'.format(file_path, e))
+        report["error"] = str(e)
+        return report
+    check_kwargs = check_kwargs or {}
+    for check_name, check_funct in CHECKS:
+        if checks is not None and check_name not in checks:
+            continue
+        result = check_funct(index, logger=logger, **check_kwargs.get(check_name, {}))
+        report["results"][check_name] = result
+        report["passed"][check_name] = is_passed(result)
+    return report
+
+
+def run_checks_job(job):
+    """
+    Pool job: job => (file_path, checks, check_kwargs)
+    :rtype: dict
+    """
+    file_path, checks, check_kwargs = job
+    return run_checks(file_path, checks=checks, check_kwargs=check_kwargs, logger=SILENT_LOGGER)
+
+
+def run_checks_on_files(files_path_list, checks=None, check_kwargs=None, processes=None, logger=logging):
+    """
+    Run checks on all scenes, shared between processes.
+    :param: files_path_list => .ma files
+    :param: checks => names of checks to run, None for all CHECKS
+    :param: check_kwargs => {check name: kwargs}
+    :param: processes => nb of processes, None for nb of cpus, 0 or 1 to stay in current process
+    :return: reports => one report per scene, same order as files_path_list, see run_checks
+    :rtype: list
+    """
+    jobs = [(file_path, checks, check_kwargs) for file_path in files_path_list]
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    processes = min(processes, len(jobs))
+    if processes <= 1:
+        reports = [run_checks_job(job) for job in jobs]
+    else:
+        pool = multiprocessing.Pool(processes)
+        try:
+            reports = pool.map(run_checks_job, jobs, max(1, len(jobs) // (processes * 8)))
+        finally:
+            pool.close()
+            pool.join()
+
+    for report in reports:
+        if report["error"] is not None:
+            logger.error('Scene "{}" cant be read: {}'.format(report["path"], report["error"]))
+            continue
+        for check_name, passed in report["passed"].items():
+            if not passed:
+                logger.error('{} // {}: {}'.format(report["path"], check_name, report["results"][check_name]))
+    return reports
+
+
+def main():
+    """
+    Ex:
+    python -m fw_common.studio.libs.checks.offline L:/Project/assets -x reference -j 8 -o L:/tmp/checks.json
+    """
+    parser = argparse.ArgumentParser(description="Run scene checks on .ma files, without maya.")
+    parser.add_argument("folders", nargs="+", help=".ma files or folders to look for .ma files in")
+    parser.add_argument("-c", "--checks", nargs="*", default=None, help="names of checks to run, all by default")
+    parser.add_argument("-x", "--exclude-dirs", nargs="*", default=[], help="names of folders not to go in")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="nb of processes, nb of cpus by default")
+    parser.add_argument("-o", "--output", default=None, help="json file where reports are written")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    files_path_list = [path for path in args.folders if path.endswith(".ma")]
+    folders = [path for path in args.folders if not path.endswith(".ma")]
+    if folders:
+        files_path_list += system_crawler.get_files(folders, exclude_dirs=args.exclude_dirs, extensions=[".ma"])
+    reports = run_checks_on_files(files_path_list, checks=args.checks, processes=args.jobs)
+
+    nb_failed = len([report for report in reports if report["error"] or not all(report["passed"].values())])
+    logging.info("{} scenes checked, {} failed".format(len(reports), nb_failed))
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(reports, output_file, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,8 @@
 #   DESCRIPTION :       Shaders checks lib
 #
 #   Update  1.0.0 :     We start here.
+#           1.1.0 :     Udims checks answered from bulk uvs (reads.uvs).
+#                       Face assignations answered from shading assignments of scene (reads.shaders).
 #
 #   KnownBugs :         None atm.
 # ------------------------------------------------------------------------------------------------------------------------------------- #
@@ -20,6 +22,7 @@ except ImportError:
 
 from ..reads import shaders as read_shaders
 from ..reads import nodes as read_nodes
+from ..reads import uvs as read_uvs
 
 
 def check_materials(logger=logging):
@@ -54,21 +57,18 @@ def is_displacement(shape):
                 return False
 
 
-def check_face_assignation(mesh):
+def check_face_assignation(mesh, assignments=None):
     """
     Check if mesh has face assignation
-    :param: mesh
+    :param: mesh => mesh transform or shape
+    :param: assignments => read_shaders.ShadingAssignments of scene, shared by many checks, None to read them now
     :return: assigned_face_sg, True if mesh has face assignations
     :rtype: boolean
     """
-    all_sg = cmds.ls(type='shadingEngine')
-    faces = read_nodes.get_nb_of_component_of_mesh(mesh, co_type="face")
-    assigned_face_sg = False
-    for sg in all_sg:
-        for f in range(faces):
-            if cmds.sets(mesh + ".f[{}]".format(f), isMember=sg):
-                assigned_face_sg = True
-
+    if assignments is None:
+        assignments = read_shaders.get_shading_assignments()
+    shapes = cmds.listRelatives(mesh, shapes=True, fullPath=True, ni=True) or [mesh]
+    assigned_face_sg = any(assignments.has_face_assignments(shape) for shape in shapes)
     return assigned_face_sg
 
 
@@ -86,43 +86,26 @@ def check_file_mode(file):
     return check_color_space
 
 
-def check_negatives_udims(mesh):
+def check_negatives_udims(mesh, cache=None):
     """
     True if mesh has negatives udim
     :parama: mesh
+    :param: cache => read_uvs.UvCache shared by many queries, None to read uvs of mesh now
     :return: check_uv_pos
     :rtype: boolean
     """
-    uvs = read_nodes.get_nb_of_component_of_mesh(mesh, co_type="uv")
-    check_uv_pos = False
-    if uvs:
-        for u in range(uvs):
-            uv_pos = cmds.polyEditUV("%s.map[%d]" % (mesh, u), q=1)
-            uv_pos_u = int(uv_pos[0])
-            uv_pos_v = int(uv_pos[1])
-            if uv_pos_u < 0:
-                check_uv_pos = True
-            if uv_pos_v < 0:
-                check_uv_pos = True
-    return check_uv_pos
+    return read_uvs.get_uv_tiles(mesh, cache=cache).has_negative_tiles()
 
 
-def check_upper_udims(mesh):
+def check_upper_udims(mesh, cache=None):
     """
     True if mesh has vertical udims
     :param: mesh
+    :param: cache => read_uvs.UvCache shared by many queries, None to read uvs of mesh now
     :return: check_uv_pos
     :rtype: boolean
     """
-    uvs = read_nodes.get_nb_of_component_of_mesh(mesh, co_type="uv")
-    check_uv_pos = False
-    if uvs:
-        for u in range(uvs):
-            uv_pos = cmds.polyEditUV("%s.map[%d]" % (mesh, u), q=1)
-            uv_pos_v = int(uv_pos[1])
-            if uv_pos_v > 1:
-                check_uv_pos = True
-    return check_uv_pos
+    return read_uvs.get_uv_tiles(mesh, cache=cache).has_upper_tiles(max_tile_v=1)
 
 
 # FIXME: Important! this will never work because it's not a method (it misses the `()`) and also no args passed
@@ -22,3 +22,13 @@ try:
     from . import scene
 except Exception as e:
     print("{}: Failed to import `fw_maya.libs.reads.scene`: {}'".format(e.__class__.__name__, e.message))
+
+try:
+    from . import meshes
+except Exception as e:
+    print("{}: Failed to import `fw_maya.libs.reads.meshes`: {}'".format(e.__class__.__name__, e.message))
+
+try:
+    from . import uvs
+except Exception as e:
+    print("{}: Failed to import `fw_maya.libs.reads.uvs`: {}'".format(e.__class__.__name__, e.message))
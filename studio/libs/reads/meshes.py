@@ -0,0 +1,375 @@
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+#   AUTHORS :           Nicolas Dorey
+#                       Sophie Chauvet
+#
+#   DESCRIPTION :       Bulk meshes queries (whole buffers in one call instead of one call per component)
+#
+#   Update  1.0.0 :     We start here.
+#           1.1.0 :     MeshInspection: everything mesh checks need, queried once per mesh.
+#           1.2.0 :     Vertex colors of a color set in a single query.
+#           1.3.0 :     Triangles, quads, ngons and lamina faces from face vertices arrays, without selection.
+#           1.3.1 :     get_faces_vertices keeps the first vtx of faces whose index fills the padding.
+#           1.3.2 :     MeshInspection reads color sets and faces on first access only.
+#           1.3.3 :     Vertex colors are read with MFnMesh, without switching the current color set.
+#
+#   KnownBugs :         None atm.
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+
+import logging
+
+try:
+    import maya.cmds as cmds
+    import maya.api.OpenMaya as om
+except ImportError:
+    pass
+
+try:
+    import numpy as np
+except ImportError:
+    pass
+
+
+AXIS_INDEX = {"x": 0, "y": 1, "z": 2}
+# same as read_nodes.get_renderstats
+RENDER_STATS = ['castsShadows', 'receiveShadows', 'holdOut', 'motionBlur', 'primaryVisibility', 'smoothShading',
+                'visibleInReflections', 'visibleInRefractions', 'doubleSided', 'opposite']
+# polyEvaluate flag of each component type, same keys as read_nodes.get_nb_of_component_of_mesh
+COMPONENT_FLAGS = {"vtx": "v", "edge": "e", "face": "f", "uv": "uv"}
+
+
+# ________________________________________________________________________________________________________
+##########################
+# --------POINTS---------#
+##########################
+
+def get_world_points(mesh):
+    """
+    Get the world space position of every vertex of mesh in a single query.
+    :param: mesh => mesh transform or shape
+    :return: points => contiguous float array of shape (nb_vtx, 3)
+    :rtype: numpy.ndarray
+    """
+    flat_points = cmds.xform('{}.vtx[*]'.format(mesh), q=True, ws=True, t=True) or []
+    points = np.ascontiguousarray(flat_points, dtype=np.float64).reshape(-1, 3)
+    return points
+
+
+class MeshPointsCache(object):
+    """
+    Cache of world space vertex buffers for the duration of a run.
+    Meshes may have moved between two runs: call clear() when a new one starts.
+    """
+    def __init__(self):
+        self._points = {}
+
+    def get_points(self, mesh):
+        """
+        :param: mesh => mesh transform or shape
+        :return: points => (nb_vtx, 3) float array, fetched once per mesh
+        :rtype: numpy.ndarray
+        """
+        key = cmds.ls(mesh, long=True)[0]
+        if key not in self._points:
+            self._points[key] = get_world_points(key)
+        return self._points[key]
+
+    def get_axis(self, mesh, axis):
+        """
+        View (no copy) on one column of the points buffer
+        :param: mesh
+        :param: axis => 0, 1, 2 or x, y, z
+        :return: positions of all vtx on axis
+        :rtype: numpy.ndarray
+        """
+        axis = AXIS_INDEX.get(axis, axis)
+        return self.get_points(mesh)[:, axis]
+
+    def clear(self):
+        self._points.clear()
+        logging.debug('Mesh points cache cleared.')
+
+
+# ________________________________________________________________________________________________________
+##########################
+# -------COLORS----------#
+##########################
+
+def get_vertex_colors(shape, color_set=None):
+    """
+    Get the color of every vertex of shape in a single query.
+    Read through the api: current color set of shape is not changed, nothing goes in the undo queue.
+    :param: shape => mesh shape or transform
+    :param: color_set => name of color set, current one by default
+    :return: colors => float array of shape (nb_vtx, 3), rgb, -1 on vertices without color
+    :rtype: numpy.ndarray
+    """
+    selection = om.MSelectionList()
+    selection.add(shape)
+    dag_path = selection.getDagPath(0)
+    if dag_path.hasFn(om.MFn.kTransform):
+        dag_path.extendToShape()
+    mesh_fn = om.MFnMesh(dag_path)
+    colors = mesh_fn.getVertexColors(color_set or "")
+    return np.asarray([(color.r, color.g, color.b) for color in colors], dtype=np.float32).reshape(-1, 3)
+
+
+def get_colored_vertices_count(shape, color_sets=None):
+    """
+    Nb of vertices with a color channel above 0, in each color set of shape.
+    :param: shape => mesh shape or transform
+    :param: color_sets => names of color sets, all color sets of shape by default
+    :return: {color set: nb of colored vertices}
+    :rtype: dict
+    """
+    if color_sets is None:
+        color_sets = cmds.polyColorSet(shape, q=True, allColorSets=True) or []
+    colored_vertices = {}
+    for color_set in color_sets:
+        colors = get_vertex_colors(shape, color_set)
+        colored_vertices[color_set] = int(np.count_nonzero((colors > 0).any(axis=1)))
+    return colored_vertices
+
+
+# ________________________________________________________________________________________________________
+##########################
+# --------FACES----------#
+##########################
+
+def get_faces_vertices(shape):
+    """
+    Vertices of every face of shape in a single query, nothing is selected.
+    :param: shape => mesh shape or transform
+    :return: face_sizes, face_vertices => nb of vertices of each face (nb_faces,),
+             vertices of all faces one after the other (sum of face_sizes,)
+    :rtype: tuple of numpy.ndarray
+    """
+    # one line per face: "FACE     0:      0      1      3      2 \n"
+    faces_info = cmds.polyInfo(shape, faceToVertex=True) or []
+    face_sizes = []
+    face_vertices = []
+    for face_info in faces_info:
+        # big indices fill the padding ("FACE123456:"), split on the colon and not on spaces
+        vertices = face_info.split(":", 1)[1].split()
+        face_sizes.append(len(vertices))
+        face_vertices.extend(vertices)
+    return np.array(face_sizes, dtype=np.int32), np.array(face_vertices, dtype=np.int64)
+
+
+def get_face_sizes(shape):
+    """
+    :param: shape => mesh shape or transform
+    :return: face_sizes => nb of vertices of each face (nb_faces,)
+    :rtype: numpy.ndarray
+    """
+    return get_faces_vertices(shape)[0]
+
+
+def get_lamina_faces(face_sizes, face_vertices):
+    """
+    Lamina faces: faces sharing all their vertices with another face.
+    :param: face_sizes, face_vertices => see get_faces_vertices
+    :return: sorted indices of lamina faces
+    :rtype: numpy.ndarray
+    """
+    faces_by_vertices = {}
+    ends = np.cumsum(face_sizes)
+    for face_index, vertices in enumerate(np.split(face_vertices, ends[:-1]) if len(ends) else []):
+        faces_by_vertices.setdefault(tuple(np.sort(vertices)), []).append(face_index)
+    lamina = [face_index for faces in faces_by_vertices.values() if len(faces) > 1 for face_index in faces]
+    return np.array(sorted(lamina), dtype=np.int64)
+
+
+class FacesAnalysis(object):
+    """
+    Faces of a shape sorted by nb of vertices, all faces at once.
+    Lamina faces are only looked for when asked, see get_lamina.
+    """
+    def __init__(self, face_sizes, face_vertices):
+        """
+        :param: face_sizes, face_vertices => see get_faces_vertices
+        """
+        self.face_sizes = face_sizes
+        self.face_vertices = face_vertices
+        self.triangles = np.flatnonzero(face_sizes == 3)
+        self.quads = np.flatnonzero(face_sizes == 4)
+        self.ngons = np.flatnonzero(face_sizes > 4)
+        self.lamina = None
+
+    def get_lamina(self):
+        """
+        :return: indices of lamina faces
+        :rtype: numpy.ndarray
+        """
+        if self.lamina is None:
+            self.lamina = get_lamina_faces(self.face_sizes, self.face_vertices)
+        return self.lamina
+
+    def get_counts(self, lamina=False):
+        """
+        :param: lamina => True to count lamina faces too
+        :return: {faces, triangles, quads, ngons(, lamina)}
+        :rtype: dict
+        """
+        counts = {"faces": len(self.face_sizes), "triangles": len(self.triangles), "quads": len(self.quads),
+                  "ngons": len(self.ngons)}
+        if lamina:
+            counts["lamina"] = len(self.get_lamina())
+        return counts
+
+
+def analyse_faces(shape):
+    """
+    :param: shape => mesh shape or transform
+    :rtype: FacesAnalysis
+    """
+    return FacesAnalysis(*get_faces_vertices(shape))
+
+
+class FacesCache(object):
+    """
+    Cache of faces analysis of shapes for the duration of a run.
+    Topology may have changed between two runs: call clear() when a new one starts.
+    """
+    def __init__(self):
+        self._analysis = {}
+
+    def get_analysis(self, shape):
+        """
+        :param: shape => mesh shape or transform
+        :rtype: FacesAnalysis
+        """
+        key = cmds.ls(shape, long=True)[0]
+        if key not in self._analysis:
+            self._analysis[key] = analyse_faces(key)
+        return self._analysis[key]
+
+    def clear(self):
+        self._analysis.clear()
+        logging.debug('Faces cache cleared.')
+
+
+def analyse_meshes_faces(meshes_list, cache=None):
+    """
+    Faces analysis of many meshes, for batch checks.
+    :param: meshes_list => mesh transforms or shapes
+    :param: cache => FacesCache, None to analyse all meshes
+    :return: {mesh: FacesAnalysis}
+    :rtype: dict
+    """
+    if cache is None:
+        cache = FacesCache()
+    return dict((mesh, cache.get_analysis(mesh)) for mesh in meshes_list)
+
+
+# ________________________________________________________________________________________________________
+##########################
+# -----INSPECTION--------#
+##########################
+
+class MeshInspection(object):
+    """
+    Everything the mesh checks of checks.nodes read on a mesh, queried once.
+    Ex:
+        inspections = inspect_meshes(read_nodes.list_all_meshes())
+        bad_meshes = [mesh for mesh, inspection in inspections.items()
+                      if not check_nodes.check_history(mesh, inspection=inspection)]
+    """
+    def __init__(self, mesh):
+        """
+        :param: mesh => mesh transform
+        """
+        self.mesh = mesh
+        # all shapes under mesh (intermediate ones too), and the one drawn
+        self.shapes = []
+        self.shape = None
+        # transforms the shape is under, more than one if instanced
+        self.parents = []
+        # {vtx, edge, face, uv}, None if it cant be evaluated
+        self.counts = {}
+        self.translate = []
+        self.rotate = []
+        self.scale = []
+        self.visibility = True
+        # {render stat: value} of shape
+        self.render_stats = {}
+        # history nodes which are not shapes of mesh, and their types
+        self.history = []
+        self.history_types = []
+        # color sets and faces are only read by a few checks: queried on first access, see properties
+        self._color_sets = None
+        self._faces = None
+
+    def read(self):
+        mesh = self.mesh
+        self.shapes = cmds.listRelatives(mesh, shapes=True, fullPath=True) or []
+        drawn_shapes = cmds.listRelatives(mesh, shapes=True, fullPath=True, type='mesh', ni=True) or []
+        self.shape = drawn_shapes[0] if drawn_shapes else None
+
+        for co_type, flag in COMPONENT_FLAGS.items():
+            nb_of_elmt = cmds.polyEvaluate(mesh, **{flag: True})
+            self.counts[co_type] = nb_of_elmt if type(nb_of_elmt) == int else None
+
+        self.translate = list(cmds.getAttr('{}.t'.format(mesh))[0])
+        self.rotate = list(cmds.getAttr('{}.r'.format(mesh))[0])
+        self.scale = list(cmds.getAttr('{}.s'.format(mesh))[0])
+        self.visibility = cmds.getAttr('{}.visibility'.format(mesh))
+
+        short_shapes = cmds.ls(self.shapes, sn=True) if self.shapes else []
+        self.history = [node for node in cmds.listHistory(mesh, lv=0) or [] if node not in short_shapes]
+        self.history_types = [cmds.nodeType(node) for node in self.history]
+
+        if self.shape is not None:
+            self.parents = cmds.listRelatives(self.shape, allParents=True, fullPath=True) or []
+            for render_stat in RENDER_STATS:
+                self.render_stats[render_stat] = cmds.getAttr('{}.{}'.format(self.shape, render_stat))
+        return self
+
+    @property
+    def color_sets(self):
+        if self._color_sets is None:
+            self._color_sets = []
+            if self.shape is not None:
+                self._color_sets = cmds.polyColorSet(self.shape, q=True, allColorSets=True) or []
+        return self._color_sets
+
+    @property
+    def faces(self):
+        """
+        Faces sorted by nb of vertices, None without drawn shape
+        :rtype: FacesAnalysis
+        """
+        if self._faces is None and self.shape is not None:
+            self._faces = analyse_faces(self.shape)
+        return self._faces
+
+    @property
+    def face_sizes(self):
+        """
+        Nb of vertices of each face, None without drawn shape
+        :rtype: numpy.ndarray
+        """
+        return self.faces.face_sizes if self.faces is not None else None
+
+
+def inspect_mesh(mesh):
+    """
+    :param: mesh => mesh transform
+    :rtype: MeshInspection
+    """
+    return MeshInspection(mesh).read()
+
+
+def inspect_meshes(meshes_list):
+    """
+    Inspect all meshes in one sweep.
+    :param: meshes_list => mesh transforms, eg read_nodes.list_all_meshes()
+    :return: inspections => {mesh: MeshInspection}
+    :rtype: dict
+    """
+    inspections = {}
+    for mesh in meshes_list:
+        inspections[mesh] = inspect_mesh(mesh)
+    logging.debug('{} meshes inspected.'.format(len(inspections)))
+    return inspections
@@ -6,6 +6,7 @@
 #   DESCRIPTION :       Utils for nodes queries
 #
 #   Update  1.0.0 :     We start here.
+#           1.1.0 :     Udims are read from bulk uvs (reads.uvs).
 #
 #   KnownBugs :         None atm.
 # ------------------------------------------------------------------------------------------------------------------------------------- #
@@ -19,6 +20,11 @@ try:
 except ImportError:
     pass
 
+from . import uvs as read_uvs
+
+
+UNKNOWN_NODE_TYPES = ['unknown', 'unknownDag', 'unknownTransform', 'aiStandIn', 'nodeGraphEditorInfo']
+
 
 # ________________________________________________________________________________________________________
 ##########################
@@ -362,24 +368,15 @@ def get_meshes_polycount_dict(meshes_list):
 # -----------UVS----------#
 # #########################
 
-def get_udims_list(mesh):
+def get_udims_list(mesh, cache=None):
     """
     Returns multiples udims space
     :param: mesh
+    :param: cache => read_uvs.UvCache shared by many queries, None to read uvs of mesh now
     :return: all_udims => for ex: 1002,1004
     :rtype: list
     """
-    uvs = get_nb_of_component_of_mesh(mesh, co_type="uv")
-    pos = []
-    if uvs:
-        for u in range(uvs):
-            uv_pos = cmds.polyEditUV("%s.map[%d]" % (mesh, u), q=1)
-            uv_pos_u = int(uv_pos[0]) + 1
-            uv_pos_v = int(uv_pos[1]) * 10
-            pos.append(1000 + uv_pos_u + uv_pos_v)
-    all_udim = list(set(pos))
-    all_udim.sort()
-    return all_udim
+    return read_uvs.get_uv_tiles(mesh, cache=cache).get_udims_list()
 
 
 # TODO: snakecase args
@@ -409,24 +406,17 @@ def convert_udim(udim=None, uvPos=None):
         return 1000 + uv_pos_u + uv_pos_v
 
 
-def return_uvs_from_udims(mesh, udim):
+def return_uvs_from_udims(mesh, udim, cache=None):
     """
     Return list of uvs components in given udim
     :param: mesh
     :param: udim
+    :param: cache => read_uvs.UvCache shared by many queries, None to read uvs of mesh now
     :return: uvNb
     :rtype: list
     """
-    uvs = get_nb_of_component_of_mesh(mesh, co_type="uv")
-    u, v = convert_udim(udim=udim)
-    uv_nb = []
-    if uvs:
-        for idx_uv in range(uvs):
-            uv_pos = cmds.polyEditUV("%s.map[%d]" % (mesh, idx_uv), q=1)
-            uv_pos_u = int(uv_pos[0])
-            uv_pos_v = int(uv_pos[1])
-            if uv_pos_u == u and uv_pos_v == v:
-                uv_nb.append("%s.map[%d]" % (mesh, idx_uv))
+    uv_indices = read_uvs.get_uv_tiles(mesh, cache=cache).get_uv_indices(udim)
+    uv_nb = ["%s.map[%d]" % (mesh, idx_uv) for idx_uv in uv_indices]
     if not uv_nb:
         logging.warning('No udim found for mesh : %s' % mesh)
     return uv_nb
@@ -754,4 +744,4 @@ def list_unknown_nodes():
     :return: a list of all unknown nodes
     :rtype: list
     """
-    return cmds.ls(type=['unknown', 'unknownDag', 'unknownTransform', 'aiStandIn', 'nodeGraphEditorInfo'])
+    return cmds.ls(type=UNKNOWN_NODE_TYPES)
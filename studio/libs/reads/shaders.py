@@ -8,12 +8,15 @@
 #   DESCRIPTION :       Utils for shaders queries
 #
 #   Update  1.0.0 :     We start here.
+#           1.1.0 :     Shading assignments of all shapes from instObjGroups / objectGroups connections.
+#           1.1.1 :     Object groups without faces are not face assignments.
 #
 #   KnownBugs :         None atm.
 # ------------------------------------------------------------------------------------------------------------------------------------- #
 # ------------------------------------------------------------------------------------------------------------------------------------- #
 
 import logging
+import re
 
 try:
     import maya.cmds as cmds
@@ -25,6 +28,10 @@ from . import nodes as read_nodes
 from . import references as read_references
 
 
+# source plug of a shading engine member: shape.instObjGroups[0] or shape.instObjGroups[0].objectGroups[1]
+MEMBER_PLUG_REGEX = re.compile(r'^(.+?)\.(?:instObjGroups|iog)\[(\d+)\](?:\.(?:objectGroups|og)\[(\d+)\])?$')
+FACES_REGEX = re.compile(r'f\[(\d+)(?::(\d+))?\]$')
+
 SHADERS_TYPE = [
     'lambert',
     'RedshiftMaterial',
@@ -508,3 +515,110 @@ def get_sss_shaders(mtls):
             if ms > 0:
                 sss_shrs.append(mtl)
     return sss_shrs
+
+
+# _________________________________________________________________________________________________________
+# #########################
+# -------ASSIGNMENTS------#
+# #########################
+
+def get_face_ranges(components):
+    """
+    :param: components => component list of an object group, eg ['f[0:5]', 'f[8]']
+    :return: face_ranges => first and last face of each range, eg [(0, 5), (8, 8)]
+    :rtype: list
+    """
+    face_ranges = []
+    for component in components or []:
+        match = FACES_REGEX.search(component)
+        if match:
+            start = int(match.group(1))
+            end = int(match.group(2)) if match.group(2) is not None else start
+            face_ranges.append((start, end))
+    return face_ranges
+
+
+class ShadingAssignments(object):
+    """
+    Shading engines of every shape, and the faces they own, read once for the whole scene
+    from the instObjGroups / objectGroups connections of shapes to shading engines.
+    Ex:
+        assignments = get_shading_assignments()
+        assignments.has_face_assignments(shape)
+        assignments.get_shading_engines(shape) => {shading engine: [(first face, last face)] or None if whole shape}
+    """
+    def __init__(self):
+        # {shape longname: {shading engine: None for the whole shape, else face ranges}}
+        self.shapes = {}
+
+    def add(self, shape, shading_engine, face_ranges=None):
+        """
+        :param: shape => longname
+        :param: shading_engine
+        :param: face_ranges => None if shading engine is assigned on the whole shape,
+                               an empty group (no face) is not an assignment
+        """
+        if face_ranges is not None and not face_ranges:
+            return
+        shading_engines = self.shapes.setdefault(shape, {})
+        if face_ranges is None:
+            shading_engines[shading_engine] = None
+        elif shading_engines.get(shading_engine, []) is not None:
+            shading_engines.setdefault(shading_engine, []).extend(face_ranges)
+
+    def get_shading_engines(self, shape):
+        """
+        :param: shape
+        :return: {shading engine: face ranges, None if assigned on the whole shape}
+        :rtype: dict
+        """
+        return self.shapes.get(cmds.ls(shape, long=True)[0], {})
+
+    def has_face_assignments(self, shape):
+        """
+        :param: shape
+        :return: True if a shading engine is assigned on faces of shape instead of the whole shape
+        :rtype: boolean
+        """
+        return any(face_ranges is not None for face_ranges in self.get_shading_engines(shape).values())
+
+    def get_face_assigned_shapes(self):
+        """
+        :return: longnames of shapes with face assignments
+        :rtype: list
+        """
+        return sorted(shape for shape, shading_engines in self.shapes.items()
+                      if any(face_ranges is not None for face_ranges in shading_engines.values()))
+
+
+def get_shading_assignments(shading_engines=None):
+    """
+    Assignments of all shapes in a single pass: one query of the members of all shading engines,
+    then one query of the component list of each face assignment.
+    :param: shading_engines => None for all shading engines of scene
+    :rtype: ShadingAssignments
+    """
+    if shading_engines is None:
+        shading_engines = cmds.ls(type='shadingEngine')
+    assignments = ShadingAssignments()
+    if not shading_engines:
+        return assignments
+    members_plugs = ['{}.dagSetMembers'.format(shading_engine) for shading_engine in shading_engines]
+    # [shading engine plug, shape plug, shading engine plug, shape plug...]
+    connections = cmds.listConnections(members_plugs, source=True, destination=False, plugs=True,
+                                       connections=True) or []
+    longnames = {}
+    for shading_engine_plug, member_plug in zip(connections[::2], connections[1::2]):
+        match = MEMBER_PLUG_REGEX.match(member_plug)
+        if match is None:
+            continue
+        node, instance, group = match.groups()
+        if node not in longnames:
+            longnames[node] = cmds.ls(node, long=True)[0]
+        shading_engine = shading_engine_plug.split('.')[0]
+        if group is None:
+            assignments.add(longnames[node], shading_engine)
+        else:
+            components = cmds.getAttr('{}.instObjGroups[{}].objectGroups[{}].objectGrpCompList'.format(node, instance, group))
+            assignments.add(longnames[node], shading_engine, get_face_ranges(components))
+    return assignments
@@ -0,0 +1,148 @@
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+#   AUTHORS :           Nicolas Dorey
+#                       Sophie Chauvet
+#
+#   DESCRIPTION :       Bulk uvs queries: all uvs of a mesh in one call, udim of each uv computed at once
+#
+#   Update  1.0.0 :     We start here.
+#
+#   KnownBugs :         Udims of uvs with u < 0 or u >= 10 overlap udims of other tiles, they only exist for the checks.
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+
+import logging
+
+try:
+    import maya.cmds as cmds
+except ImportError:
+    pass
+
+try:
+    import numpy as np
+except ImportError:
+    pass
+
+
+# udim of tile (0, 0)
+FIRST_UDIM = 1001
+# nb of tiles on u
+UDIM_ROW_SIZE = 10
+
+
+def get_uvs(mesh, uv_set=None):
+    """
+    Get the position of every uv of mesh in a single query.
+    :param: mesh => mesh transform or shape
+    :param: uv_set => name of uv set, current one by default
+    :return: uvs => float array of shape (nb_uvs, 2)
+    :rtype: numpy.ndarray
+    """
+    flags = {"uvSetName": uv_set} if uv_set else {}
+    try:
+        flat_uvs = cmds.polyEditUV('{}.map[*]'.format(mesh), q=True, **flags) or []
+    except RuntimeError:
+        # mesh without uvs
+        flat_uvs = []
+    if not flat_uvs:
+        logging.error('NO UVS ON MESH !! : {}'.format(mesh))
+    return np.asarray(flat_uvs, dtype=np.float64).reshape(-1, 2)
+
+
+def get_udim_tile(udim):
+    """
+    :param: udim => for ex: 1012
+    :return: u, v of the tile => for ex: 1, 1
+    :rtype: tuple
+    """
+    return (udim - FIRST_UDIM) % UDIM_ROW_SIZE, (udim - FIRST_UDIM) // UDIM_ROW_SIZE
+
+
+class UvTiles(object):
+    """
+    Tile of each uv of a mesh, and nb of uvs in each udim.
+    Ex:
+        uv_tiles = UvTiles(get_uvs(mesh))
+        uv_tiles.get_udims_list() => [1001, 1002]
+        uv_tiles.get_uv_indices(1002) => indices of uvs in 1002
+    """
+    def __init__(self, uvs):
+        """
+        :param: uvs => (nb_uvs, 2) float array, see get_uvs
+        """
+        self.uvs = uvs
+        tiles = np.floor(uvs).astype(np.int64)
+        self.tile_u = tiles[:, 0]
+        self.tile_v = tiles[:, 1]
+        # udim of each uv
+        self.udims = FIRST_UDIM + self.tile_u + UDIM_ROW_SIZE * self.tile_v
+        udims, counts = np.unique(self.udims, return_counts=True)
+        # {udim: nb of uvs}
+        self.histogram = dict(zip(udims.tolist(), counts.tolist()))
+
+    def get_udims_list(self):
+        """
+        :return: udims used by uvs => for ex: [1002, 1004]
+        :rtype: list
+        """
+        return sorted(self.histogram)
+
+    def get_uv_indices(self, udim):
+        """
+        :param: udim
+        :return: indices of uvs in tile of udim
+        :rtype: numpy.ndarray
+        """
+        tile_u, tile_v = get_udim_tile(udim)
+        return np.flatnonzero((self.tile_u == tile_u) & (self.tile_v == tile_v))
+
+    def has_negative_tiles(self):
+        """
+        :return: True if an uv is under 0 on u or v
+        :rtype: boolean
+        """
+        return bool((self.tile_u < 0).any() or (self.tile_v < 0).any())
+
+    def has_upper_tiles(self, max_tile_v=1):
+        """
+        :param: max_tile_v => highest row of tiles allowed
+        :return: True if an uv is over row max_tile_v
+        :rtype: boolean
+        """
+        return bool((self.tile_v > max_tile_v).any())
+
+
+class UvCache(object):
+    """
+    Cache of uv tiles of meshes for the duration of a run.
+    Uvs may have moved between two runs: call clear() when a new one starts.
+    """
+    def __init__(self):
+        self._tiles = {}
+
+    def get_tiles(self, mesh, uv_set=None):
+        """
+        :param: mesh => mesh transform or shape
+        :param: uv_set => name of uv set, current one by default
+        :rtype: UvTiles
+        """
+        key = (cmds.ls(mesh, long=True)[0], uv_set)
+        if key not in self._tiles:
+            self._tiles[key] = UvTiles(get_uvs(key[0], uv_set=uv_set))
+        return self._tiles[key]
+
+    def clear(self):
+        self._tiles.clear()
+        logging.debug('Uv cache cleared.')
+
+
+def get_uv_tiles(mesh, uv_set=None, cache=None):
+    """
+    :param: mesh => mesh transform or shape
+    :param: uv_set => name of uv set, current one by default
+    :param: cache => UvCache shared by many queries, None to read uvs of mesh now
+    :rtype: UvTiles
+    """
+    if cache is not None:
+        return cache.get_tiles(mesh, uv_set=uv_set)
+    return UvTiles(get_uvs(mesh, uv_set=uv_set))
@@ -27,6 +27,7 @@ except ImportError:
 from ..reads import nodes as read_nodes
 from ..reads import scene as read_scenes
 from ..reads import shaders as read_shaders
+from ..reads import uvs as read_uvs
 from ..checks import nodes as check_nodes
 from ..checks import shaders as check_shaders
 
@@ -313,19 +314,31 @@ def combineSeparate(mesh):  # sourcery skip: invert-any-all, use-any
 # #########################
 
 # TODO: return new name
-def rename_top_node(task_name=None, logger=logging):
+def get_top_node_name(task_name=None):
     """
-    Rename top group with scene name.
-    Eg: {ASSET_NAME}_MDL_Grp
+    Name of top group from scene name.
+    Eg: {ASSET_NAME}_MDL_Top
     :param: task_name => None by default
+    :return: new_name_grp
+    :rtype: string
     """
-    top_grp = read_nodes.get_top_node()[0]
-    logger.debug('Top node name {}'.format(top_grp))
     file_name = read_scenes.get_file_informations()[1]
     file_name = "_".join(file_name.split('_')[0:3])
     new_name_grp = file_name + "_Top"
     if task_name:
         new_name_grp = file_name.replace("_" + task_name, "") + "_Top"
+    return new_name_grp
+
+
+def rename_top_node(task_name=None, logger=logging):
+    """
+    Rename top group with scene name.
+    Eg: {ASSET_NAME}_MDL_Grp
+    :param: task_name => None by default
+    """
+    top_grp = read_nodes.get_top_node()[0]
+    logger.debug('Top node name {}'.format(top_grp))
+    new_name_grp = get_top_node_name(task_name=task_name)
     if top_grp != new_name_grp:
         rename_obj(obj=top_grp, new_name=new_name_grp)
         logger.info("*" * 10 + "TOP NODE HAS BEEN RENAMED: {}".format(new_name_grp))
@@ -650,9 +663,11 @@ def move_uv(mesh, udimSrc, udimDst):
     :param: udimSrc
     :param: udimDst
     """
-    uvsInUdim = read_nodes.return_uvs_from_udims(mesh=mesh, udim=udimSrc)
+    # uvs of mesh are read once for both queries
+    uv_cache = read_uvs.UvCache()
+    uvsInUdim = read_nodes.return_uvs_from_udims(mesh=mesh, udim=udimSrc, cache=uv_cache)
     cmds.select(uvsInUdim, r=True)
-    udim_check = read_nodes.get_udims_list(mesh)
+    udim_check = read_nodes.get_udims_list(mesh, cache=uv_cache)
     if udimDst not in udim_check:
         uvsSrc = read_nodes.convert_udim(udim=udimSrc)
         uvsDst = read_nodes.convert_udim(udim=udimDst)
@@ -16,6 +16,8 @@
 #                       Production purpose (Millimages Shotgun Pipeline) : Reverse suffix from node in maya with the Step name.
 #           1.3.1 :     Now delete others shots in the splitted file.
 #           1.3.2 :     Now will create folder if the one in the browse menu don't exist before.
+#           1.4.0 :     Fast split: scene is loaded once, each shot file is written from its ascii,
+#                       camera fbx are exported at the end.
 #
 #   KnownBugs :         None atm.
 # -------------------------------------------------------------------------------------------------------------------------------------##
@@ -23,12 +25,23 @@
 
 import os
 import re
+import tempfile
 
 try:
     import maya.cmds as cmds
 except ImportError:
     pass
 
+from ....libs.mayaascii import updates as mayaascii_updates
+
+
+FORCE_SAVE = True
+VERSION = 'v001'
+TASK_NAME = 'ANM'
+AXIS_LIST = ['tx', 'ty', 'tz', 'rx', 'ry', 'rz']
+REG_EXPRESSION = r'(.*)_(.*)_(.*).(v\d+.*?)$'
+PLAYBACK_SCRIPT_NODE = 'sceneConfigurationScriptNode'
+
 
 # UI
 def camseq_split_createui():
@@ -38,7 +51,7 @@ def camseq_split_createui():
         cmds.deleteUI(window_tag)
 
     # Version
-    version = ' {}'.format('1.3.2')
+    version = ' {}'.format('1.4.0')
     # Preroll
     default_path = os.path.join(os.path.join(os.environ['USERPROFILE']), 'Desktop')
     # Main Window
@@ -74,6 +87,9 @@ def camseq_split_createui():
         cw2=[88, 62],
         p=camseq_split_c)
 
+    camseq_split_e = cmds.rowColumnLayout(nc=1, cw=[(1, 200)], p=main_layout)
+    cmds.checkBox('camseq_split_fast', label='Fast split (scene loaded once)', value=True, p=camseq_split_e)
+
     camseq_split_separator = cmds.rowColumnLayout(nc=1, cw=[(1, 200)], p=main_layout)
     cmds.separator(height=3, style='double', p=camseq_split_separator)
 
@@ -107,12 +123,6 @@ def camseq_split_createui():
 
 # UV Tools def
 def split_sequencer(self):
-    FORCE_SAVE = True
-    VERSION = 'v001'
-    TASK_NAME = 'ANM'
-    AXIS_LIST = ['tx', 'ty', 'tz', 'rx', 'ry', 'rz']
-    REG_EXPRESSION = r'(.*)_(.*)_(.*).(v\d+.*?)$'
-
     camseq_split_radiobutton_a = cmds.radioButtonGrp(
         'camseq_split_collection_a_name', query=True, sl=True,
         la2=True)  # 1 for Browse, 2 for Same Folder
@@ -135,7 +145,10 @@ def split_sequencer(self):
             destination_file_path = user_path
 
         shots = cmds.listConnections(sequencer_to_split, type='shot')
-        if shots:
+        if shots and cmds.checkBox('camseq_split_fast', query=True, value=True):
+            split_shots_from_ascii(shots, destination_file_path)
+            cmds.warning('--- Succesfully splitted "{}" shots from "{}" ! Scene has not been modified... ---'.format(len(shots), sequencer_to_split))
+        elif shots:
             for shot in shots:
                 # Get shot infos
                 shot_name = cmds.getAttr('{}.shotName'.format(shot))
@@ -165,44 +178,15 @@ def split_sequencer(self):
                 except Exception as e:
                     print(e)
                     cmds.warning("--- Can't look through the camera, skipping... ---")
-                export_name = '{}{}_{}.{}'.format(destination_file_path, shot_name_splitted, TASK_NAME, VERSION)
-
-                # Regex rename to reverse step and extra_name from maya, should be in a def later
-                regex = re.compile(REG_EXPRESSION, re.IGNORECASE)
-                match = re.search(regex, export_name)
-                if match:
-                    name = match.group(1)
-                    extra_name = match.group(2)
-                    step = match.group(3)
-                    version_extension = match.group(4)
-                export_name = '{}_{}.{}'.format(name, step, version_extension)
+                export_name = get_shot_export_name(destination_file_path, shot_name_splitted)
 
                 print('Now spliting : ', shot_name, shot_startframe,
                       shot_endframe)
 
                 # Fbx export settings
-                cmds.select(shot_camera)
-                shot_camera_splitted = shot_camera[0].split(':')[-1]
                 for axis in AXIS_LIST:
                     cmds.setAttr('{}.{}'.format(shot_camera[0], axis), lock=True)
-                fbx_camera_name = ('{}{}_{}.{}.fbx'.format(destination_file_path, shot_camera_splitted, TASK_NAME, VERSION))
-
-                # Regex rename to reverse step and extra_name from maya, should be in a def later
-                regex = re.compile(REG_EXPRESSION, re.IGNORECASE)
-                match = re.search(regex, fbx_camera_name)
-                if match:
-                    name = match.group(1)
-                    extra_name = match.group(2)
-                    step = match.group(3)
-                    version_extension = match.group(4)
-                fbx_camera_name = '{}_{}_{}.{}'.format(name, step, extra_name, version_extension)
-
-                cmds.FBXResetExport()
-                cmds.FBXExportUpAxis('z')
-                cmds.FBXExportConvertUnitString('cm')
-                cmds.FBXExportInAscii('-v', True)
-                cmds.FBXExportCameras('-v', True)
-                cmds.FBXExport('-f', fbx_camera_name, '-s')
+                export_camera_fbx(shot_camera[0], get_camera_fbx_name(destination_file_path, shot_camera[0]))
 
                 cmds.delete(camera_delete_list)
                 cmds.delete(shot_delete_list)
@@ -215,6 +199,127 @@ def split_sequencer(self):
             cmds.warning('--- Succesfully splitted "{}" shots from "{}" ! Scene has been re-opened from original state... ---'.format(len(shots), sequencer_to_split))
 
 
+def get_shot_export_name(destination_file_path, shot_name_splitted):
+    """
+    Regex rename to reverse step and extra_name from maya
+    :return: path of shot scene, without extension
+    :rtype: string
+    """
+    export_name = '{}{}_{}.{}'.format(destination_file_path, shot_name_splitted, TASK_NAME, VERSION)
+    match = re.search(re.compile(REG_EXPRESSION, re.IGNORECASE), export_name)
+    if match:
+        export_name = '{}_{}.{}'.format(match.group(1), match.group(3), match.group(4))
+    return export_name
+
+
+def get_camera_fbx_name(destination_file_path, shot_camera):
+    """
+    Regex rename to reverse step and extra_name from maya
+    :return: path of camera fbx
+    :rtype: string
+    """
+    shot_camera_splitted = shot_camera.split(':')[-1]
+    fbx_camera_name = '{}{}_{}.{}.fbx'.format(destination_file_path, shot_camera_splitted, TASK_NAME, VERSION)
+    match = re.search(re.compile(REG_EXPRESSION, re.IGNORECASE), fbx_camera_name)
+    if match:
+        fbx_camera_name = '{}_{}_{}.{}'.format(match.group(1), match.group(3), match.group(2), match.group(4))
+    return fbx_camera_name
+
+
+def export_camera_fbx(shot_camera, fbx_camera_name):
+    cmds.select(shot_camera)
+    cmds.FBXResetExport()
+    cmds.FBXExportUpAxis('z')
+    cmds.FBXExportConvertUnitString('cm')
+    cmds.FBXExportInAscii('-v', True)
+    cmds.FBXExportCameras('-v', True)
+    cmds.FBXExport('-f', fbx_camera_name, '-s')
+
+
+def get_playback_script(scene_filter, startframe, endframe):
+    """
+    Script of sceneConfigurationScriptNode with playback options of a shot.
+    :param: scene_filter => mayaascii_updates.SceneFilter
+    :return: value of setAttr ".b", None if scene has no playback script
+    :rtype: string
+    """
+    statement = scene_filter.read_attribute(PLAYBACK_SCRIPT_NODE, '.b')
+    if statement is None:
+        return None
+    match = re.search(r'"((?:[^"\\]|\\.)*)"\s*;\s*$', statement)
+    if match is None:
+        return None
+    script = match.group(1)
+    for flag, frame in (('min', startframe), ('max', endframe), ('ast', startframe), ('aet', endframe)):
+        script = re.sub(r'-{} \S+'.format(flag), '-{} {}'.format(flag, frame), script)
+    return '-type "string" "{}"'.format(script)
+
+
+def split_shots_from_ascii(shots, destination_file_path):
+    """
+    Scene is written once in ascii, each shot file is this ascii without other cameras and shots,
+    with the frame range of the shot. Scene is not modified, camera fbx are exported at the end.
+    :param: shots => shot nodes of sequencer
+    :param: destination_file_path
+    """
+    # shots infos, read once from opened scene
+    shots_infos = []
+    for shot in shots:
+        shot_name = cmds.getAttr('{}.shotName'.format(shot)).lstrip(':')
+        shots_infos.append({'shot': shot,
+                            'shot_name_splitted': shot_name.split(':')[-1],
+                            'startframe': cmds.getAttr('{}.startFrame'.format(shot)),
+                            'endframe': cmds.getAttr('{}.endFrame'.format(shot)),
+                            'camera': cmds.listConnections(shot, t='camera')[0]})
+    camera_list = cmds.ls('*_cam', r=True)
+    shot_list = cmds.ls('*_shot', r=True)
+
+    file_descriptor, ascii_path = tempfile.mkstemp(suffix='.ma')
+    os.close(file_descriptor)
+    try:
+        cmds.file(ascii_path, exportAll=True, preserveReferences=True, type='mayaAscii', force=True)
+        scene_filter = mayaascii_updates.SceneFilter(ascii_path)
+
+        for shot_infos in shots_infos:
+            startframe = shot_infos['startframe']
+            endframe = shot_infos['endframe']
+            print('Now spliting : ', shot_infos['shot'], startframe, endframe)
+            delete_list = [camera for camera in camera_list if camera != shot_infos['camera']]
+            delete_list += [shot for shot in shot_list if shot != shot_infos['shot']]
+            edits = scene_filter.get_delete_edits(scene_filter.get_nodes_to_delete(delete_list))
+            edits += scene_filter.get_set_attr_edits(':defaultRenderGlobals', [('.fs', startframe), ('.ef', endframe)])
+            edits += scene_filter.get_set_attr_edits(':time1', [('.o', startframe)])
+            edits += scene_filter.get_append_edits(shot_infos['camera'],
+                                                   ['setAttr -l on ".{}";'.format(axis) for axis in AXIS_LIST])
+            playback_script = get_playback_script(scene_filter, startframe, endframe)
+            if playback_script is not None:
+                edits += scene_filter.get_set_attr_edits(PLAYBACK_SCRIPT_NODE, [('.b', playback_script)])
+            export_name = get_shot_export_name(destination_file_path, shot_infos['shot_name_splitted'])
+            scene_filter.write('{}.ma'.format(export_name), edits)
+    finally:
+        os.remove(ascii_path)
+
+    # fbx of all cameras, then scene is set back as it was
+    playback = {'min': cmds.playbackOptions(q=True, min=True), 'max': cmds.playbackOptions(q=True, max=True),
+                'ast': cmds.playbackOptions(q=True, ast=True), 'aet': cmds.playbackOptions(q=True, aet=True)}
+    selection = cmds.ls(selection=True)
+    for shot_infos in shots_infos:
+        shot_camera = shot_infos['camera']
+        cmds.playbackOptions(min=shot_infos['startframe'], ast=shot_infos['startframe'], edit=True)
+        cmds.playbackOptions(max=shot_infos['endframe'], aet=shot_infos['endframe'], edit=True)
+        locked = [axis for axis in AXIS_LIST if cmds.getAttr('{}.{}'.format(shot_camera, axis), lock=True)]
+        for axis in AXIS_LIST:
+            cmds.setAttr('{}.{}'.format(shot_camera, axis), lock=True)
+        try:
+            export_camera_fbx(shot_camera, get_camera_fbx_name(destination_file_path, shot_camera))
+        finally:
+            for axis in AXIS_LIST:
+                if axis not in locked:
+                    cmds.setAttr('{}.{}'.format(shot_camera, axis), lock=False)
+    cmds.playbackOptions(edit=True, **playback)
+    cmds.select(selection, replace=True)
+
+
 def update_browse_path(self):
     folder_path = cmds.fileDialog2(fileMode=3, caption="Choose export path")[0]
     cmds.textField('textfield_a_name', edit=True, tx=folder_path)
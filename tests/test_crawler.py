@@ -0,0 +1,55 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+try:
+    import importlib.util
+
+    def load_source(name, path):
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+except ImportError:
+    from imp import load_source
+
+# the crawler only needs the standard library, load it without the package __init__
+crawler = load_source("crawler", os.path.join(os.path.dirname(__file__), "..", "libs", "system", "crawler.py"))
+
+
+@unittest.skipUnless(hasattr(os, "symlink"), "no symlinks on this platform")
+class TestCrawlerSymlinks(unittest.TestCase):
+    def setUp(self):
+        self.top_folder = tempfile.mkdtemp()
+        sub_folder = os.path.join(self.top_folder, "a", "b")
+        os.makedirs(sub_folder)
+        self.scene_path = os.path.join(sub_folder, "x.ma")
+        with open(self.scene_path, "w") as scene_file:
+            scene_file.write("//Maya ASCII\n")
+        # a/b/loop -> a
+        os.symlink(os.path.join(self.top_folder, "a"), os.path.join(sub_folder, "loop"))
+
+    def tearDown(self):
+        shutil.rmtree(self.top_folder)
+
+    def expected_files(self):
+        return sorted(os.path.join(folder, name) for folder, dirs, names in os.walk(self.top_folder) for name in names)
+
+    def test_link_cycle_is_not_followed(self):
+        files = crawler.get_files(self.top_folder, extensions=[".ma"])
+        self.assertEqual(files, [self.scene_path])
+        self.assertEqual(files, self.expected_files())
+
+    def test_link_cycle_is_not_followed_without_scandir(self):
+        scandir = crawler.scandir
+        crawler.scandir = None
+        try:
+            files = crawler.get_files(self.top_folder)
+        finally:
+            crawler.scandir = scandir
+        self.assertEqual(files, self.expected_files())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,34 @@
+try:
+    from . import ascii_stream
+except Exception as e:
+    print("{}: Failed to import `ascii_stream`: {}'".format(e.__class__.__name__, e.message))
+
+try:
+    from . import multi_regex
+except Exception as e:
+    print("{}: Failed to import `multi_regex`: {}'".format(e.__class__.__name__, e.message))
+
+try:
+    from . import scan_index
+except Exception as e:
+    print("{}: Failed to import `scan_index`: {}'".format(e.__class__.__name__, e.message))
+
 try:
     from . import update_string_from_ascii
 except Exception as e:
     print("{}: Failed to import `update_string_from_ascii`: {}'".format(e.__class__.__name__, e.message))
+
+try:
+    from . import reference_graph
+except Exception as e:
+    print("{}: Failed to import `reference_graph`: {}'".format(e.__class__.__name__, e.message))
+
+try:
+    from . import rewrite_journal
+except Exception as e:
+    print("{}: Failed to import `rewrite_journal`: {}'".format(e.__class__.__name__, e.message))
+
+try:
+    from . import scene_stats
+except Exception as e:
+    print("{}: Failed to import `scene_stats`: {}'".format(e.__class__.__name__, e.message))
@@ -0,0 +1,249 @@
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+#   AUTHORS :           Nicolas Dorey
+#                       Romain Leclerc
+#
+#   DESCRIPTION :       Read ascii files (.ma, .nk) line by line or statement by statement,
+#                       so memory doesnt depend on file size.
+#                       The smallest unit a regex can be applied on is found by parsing the regex.
+#
+#   Update  1.0.0 :     We start here.
+#           1.0.1 :     Regex anchored on the file (\A, \Z, ^ and $ without MULTILINE) are applied on the whole file.
+#
+#   KnownBugs :         A statement bigger than max_statement_size is split, a match across the split is missed.
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+
+import logging
+import re
+
+try:
+    import re._parser as sre_parse
+except ImportError:
+    import sre_parse
+
+
+# units of text a regex can be applied on, from smallest to biggest
+LINE = "line"
+STATEMENT = "statement"
+FILE = "file"
+MODES = (LINE, STATEMENT, FILE)
+
+# end of a maya ascii statement
+STATEMENT_END = ";"
+# a statement is flushed when bigger than this, in characters
+MAX_STATEMENT_SIZE = 64 * 1024 * 1024
+
+# chars of regex categories (\s, \d, \w...)
+CATEGORY_TESTS = {
+    "CATEGORY_DIGIT": lambda char: char.isdigit(),
+    "CATEGORY_NOT_DIGIT": lambda char: not char.isdigit(),
+    "CATEGORY_SPACE": lambda char: char.isspace(),
+    "CATEGORY_NOT_SPACE": lambda char: not char.isspace(),
+    "CATEGORY_WORD": lambda char: char.isalnum() or char == "_",
+    "CATEGORY_NOT_WORD": lambda char: not (char.isalnum() or char == "_"),
+    "CATEGORY_LINEBREAK": lambda char: char == "\n",
+    "CATEGORY_NOT_LINEBREAK": lambda char: char != "\n",
+}
+
+
+def _name(opcode):
+    """
+    Opcodes are strings in python 2 and named ints in python 3
+    """
+    return str(opcode).upper()
+
+
+def _in_set_can_match(items, char):
+    """
+    :param: items => content of a [] set of a parsed regex
+    :rtype: boolean
+    """
+    negate = False
+    found = False
+    for op, av in items:
+        op = _name(op)
+        if op == "NEGATE":
+            negate = True
+        elif op == "LITERAL":
+            found = found or av == ord(char)
+        elif op == "RANGE":
+            found = found or av[0] <= ord(char) <= av[1]
+        elif op == "CATEGORY":
+            test = CATEGORY_TESTS.get(_name(av))
+            # unknown category, consider it can match
+            found = found or test is None or test(char)
+        else:
+            found = True
+    return found != negate
+
+
+def _pattern_can_match(parsed, char, dotall):
+    """
+    True if one element of parsed regex can match char.
+    Unknown elements are considered matching, so the answer is never a false negative.
+    :rtype: boolean
+    """
+    for op, av in parsed:
+        op = _name(op)
+        if op == "LITERAL":
+            if av == ord(char):
+                return True
+        elif op == "NOT_LITERAL":
+            if av != ord(char):
+                return True
+        elif op == "ANY":
+            if dotall or char != "\n":
+                return True
+        elif op == "IN":
+            if _in_set_can_match(av, char):
+                return True
+        elif op == "SUBPATTERN":
+            # (group, add_flags, del_flags, pattern) in python 3, (group, pattern) in python 2
+            sub_dotall = dotall
+            if len(av) == 4:
+                if av[1] & re.DOTALL:
+                    sub_dotall = True
+                if av[2] & re.DOTALL:
+                    sub_dotall = False
+            if _pattern_can_match(av[-1], char, sub_dotall):
+                return True
+        elif op == "BRANCH":
+            if any(_pattern_can_match(branch, char, dotall) for branch in av[1]):
+                return True
+        elif op in ("MAX_REPEAT", "MIN_REPEAT", "POSSESSIVE_REPEAT"):
+            if _pattern_can_match(av[2], char, dotall):
+                return True
+        elif op in ("ASSERT", "ASSERT_NOT"):
+            if _pattern_can_match(av[1], char, dotall):
+                return True
+        elif op == "ATOMIC_GROUP":
+            if _pattern_can_match(av, char, dotall):
+                return True
+        elif op == "GROUPREF_EXISTS":
+            if any(_pattern_can_match(branch, char, dotall) for branch in av[1:] if branch):
+                return True
+        elif op in ("AT", "GROUPREF", "GROUPREF_IGNORE"):
+            # anchors match no char, group references match what their group matched
+            continue
+        else:
+            return True
+    return False
+
+
+def can_match_char(regex, char, flags=0):
+    """
+    :param: regex => string or compiled regex
+    :param: char => one character
+    :return: True if a match of regex can contain char
+    :rtype: boolean
+    """
+    compiled = re.compile(regex, flags) if not hasattr(regex, "pattern") else regex
+    dotall = bool(compiled.flags & re.DOTALL)
+    return _pattern_can_match(sre_parse.parse(compiled.pattern, compiled.flags), char, dotall)
+
+
+def _iter_subpatterns(av):
+    """
+    Parsed sub regex in arguments of an opcode, whatever the opcode
+    """
+    if isinstance(av, sre_parse.SubPattern):
+        yield av
+    elif isinstance(av, (tuple, list)):
+        for item in av:
+            for subpattern in _iter_subpatterns(item):
+                yield subpattern
+
+
+def _pattern_has_file_anchor(parsed, multiline):
+    """
+    True if parsed regex has an anchor on start / end of the whole text.
+    :rtype: boolean
+    """
+    for op, av in parsed:
+        if _name(op) == "AT":
+            anchor = _name(av)
+            if anchor in ("AT_BEGINNING_STRING", "AT_END_STRING"):
+                return True
+            if not multiline and anchor in ("AT_BEGINNING", "AT_END"):
+                return True
+            continue
+        if any(_pattern_has_file_anchor(subpattern, multiline) for subpattern in _iter_subpatterns(av)):
+            return True
+    return False
+
+
+def has_file_anchor(regex, flags=0):
+    """
+    :param: regex => string or compiled regex
+    :return: True if regex is anchored on start / end of text (\\A, \\Z, or ^, $ without MULTILINE):
+             it would match at each unit instead of once per file.
+    :rtype: boolean
+    """
+    compiled = re.compile(regex, flags) if not hasattr(regex, "pattern") else regex
+    multiline = bool(compiled.flags & re.MULTILINE)
+    return _pattern_has_file_anchor(sre_parse.parse(compiled.pattern, compiled.flags), multiline)
+
+
+def get_stream_mode(regex_list, flags=0):
+    """
+    Smallest unit of text all regex can be applied on without missing a match.
+    line      => no regex can match a line break
+    statement => no regex can match a line break and a statement end
+    file      => one regex can go across statements or is anchored on the file (see has_file_anchor),
+                 the whole file must be read
+    :param: regex_list
+    :return: mode => line, statement or file
+    :rtype: string
+    """
+    mode = LINE
+    for regex in regex_list:
+        if has_file_anchor(regex, flags):
+            logging.debug('regex "{}" is anchored on start / end of file'.format(getattr(regex, "pattern", regex)))
+            return FILE
+        if not can_match_char(regex, "\n", flags):
+            continue
+        if can_match_char(regex, STATEMENT_END, flags):
+            logging.debug('regex "{}" can go across statements'.format(getattr(regex, "pattern", regex)))
+            return FILE
+        mode = STATEMENT
+    return mode
+
+
+def iter_statements(input_file, max_statement_size=MAX_STATEMENT_SIZE):
+    """
+    Yield statements of a maya ascii file, with their line breaks.
+    Strings are written on one line in maya ascii, so a statement ends on a line ending by ;
+    :param: input_file => file object opened in text mode
+    :param: max_statement_size => size of buffer flushed even if statement is not ended
+    """
+    lines = []
+    size = 0
+    for line in input_file:
+        lines.append(line)
+        size += len(line)
+        if line.rstrip().endswith(STATEMENT_END) or size >= max_statement_size:
+            if size >= max_statement_size:
+                logging.warning('Statement bigger than {} chars in "{}", it is split.'.format(
+                    max_statement_size, getattr(input_file, "name", input_file)))
+            yield "".join(lines)
+            lines = []
+            size = 0
+    if lines:
+        yield "".join(lines)
+
+
+def iter_units(input_file, mode, max_statement_size=MAX_STATEMENT_SIZE):
+    """
+    Yield text of input_file by lines, statements or as a whole.
+    :param: input_file => file object opened in text mode
+    :param: mode => line, statement or file, see get_stream_mode
+    """
+    if mode == LINE:
+        for line in input_file:
+            yield line
+    elif mode == STATEMENT:
+        for statement in iter_statements(input_file, max_statement_size=max_statement_size):
+            yield statement
+    else:
+        yield input_file.read()
@@ -0,0 +1,223 @@
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+#   AUTHORS :           Nicolas Dorey
+#                       Romain Leclerc
+#
+#   DESCRIPTION :       Match a list of regex in a single pass over a text.
+#                       All regex are compiled in one alternation, each hit knows which regex found it.
+#                       Literal prefixes of regex are used to skip texts / files without running the regex engine.
+#
+#   Update  1.0.0 :     We start here.
+#
+#   KnownBugs :         When two regex match at the same position, only the first one in the list is kept.
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+
+import logging
+import re
+
+try:
+    import re._parser as sre_parse
+except ImportError:
+    import sre_parse
+
+
+# size of chunks read to look for literal prefixes in a file
+PREFILTER_CHUNK_SIZE = 1024 * 1024
+
+
+def _name(opcode):
+    """
+    Opcodes are strings in python 2 and named ints in python 3
+    """
+    return str(opcode).upper()
+
+
+def _has_group_reference(parsed):
+    """
+    True if parsed regex uses a backreference, which numbers would change in a combined regex
+    :rtype: boolean
+    """
+    for op, av in parsed:
+        op = _name(op)
+        if op in ("GROUPREF", "GROUPREF_IGNORE", "GROUPREF_EXISTS"):
+            return True
+        if op == "SUBPATTERN" and _has_group_reference(av[-1]):
+            return True
+        if op == "BRANCH" and any(_has_group_reference(branch) for branch in av[1]):
+            return True
+        if op in ("MAX_REPEAT", "MIN_REPEAT", "POSSESSIVE_REPEAT") and _has_group_reference(av[2]):
+            return True
+        if op in ("ASSERT", "ASSERT_NOT") and _has_group_reference(av[1]):
+            return True
+        if op == "ATOMIC_GROUP" and _has_group_reference(av):
+            return True
+    return False
+
+
+def _literal_prefixes(parsed):
+    """
+    Literal strings one of which starts every match of parsed regex.
+    Only ascii chars are kept so prefixes can be looked for in str and bytes.
+    :return: prefixes, None if regex can start with anything
+    :rtype: set
+    """
+    prefix = ""
+    for op, av in parsed:
+        op = _name(op)
+        if op == "LITERAL" and av < 128:
+            prefix += chr(av)
+            continue
+        if prefix:
+            return set([prefix])
+        if op == "AT":
+            # anchors dont consume chars
+            continue
+        if op == "SUBPATTERN":
+            if len(av) == 4 and av[1] & re.IGNORECASE:
+                return None
+            return _literal_prefixes(av[-1])
+        if op == "BRANCH":
+            prefixes = set()
+            for branch in av[1]:
+                branch_prefixes = _literal_prefixes(branch)
+                if branch_prefixes is None:
+                    return None
+                prefixes.update(branch_prefixes)
+            return prefixes
+        return None
+    return set([prefix]) if prefix else None
+
+
+def get_literal_prefixes(regex, flags=0):
+    """
+    :param: regex => string or compiled regex
+    :return: prefixes, None if regex can start with anything
+    :rtype: set
+    """
+    compiled = re.compile(regex, flags) if not hasattr(regex, "pattern") else regex
+    if compiled.flags & re.IGNORECASE:
+        return None
+    return _literal_prefixes(sre_parse.parse(compiled.pattern, compiled.flags))
+
+
+class MultiRegex(object):
+    """
+    All regex of regex_list in one matcher.
+    Ex:
+        matcher = MultiRegex([r"(P:.*Pirata2\\/)", r"(SCALE3)"])
+        for regex, match in matcher.finditer(content):
+            ...
+        content_new = matcher.sub(new_string, content)
+    """
+    def __init__(self, regex_list, flags=0):
+        self.regex_list = list(regex_list)
+        self.flags = flags
+        self.compiled = [re.compile(regex, flags) for regex in self.regex_list]
+
+        # combined regex: one named group per regex
+        self.combined = None
+        self.group_to_regex = {}
+        if not any(_has_group_reference(sre_parse.parse(regex.pattern, regex.flags)) for regex in self.compiled):
+            try:
+                self.combined = re.compile("|".join("(?P<_regex{}>{})".format(idx, regex)
+                                                    for idx, regex in enumerate(self.regex_list)), flags)
+            except re.error as e:
+                logging.debug("Regex cant be combined, they will be matched one by one: {}".format(e))
+        if self.combined is not None:
+            self.group_to_regex = dict((self.combined.groupindex["_regex{}".format(idx)], idx)
+                                       for idx in range(len(self.regex_list)))
+
+        # literal prefixes of all regex, None if one of them can start with anything
+        self.prefixes = set()
+        for regex in self.compiled:
+            prefixes = get_literal_prefixes(regex)
+            if prefixes is None:
+                self.prefixes = None
+                break
+            self.prefixes.update(prefixes)
+        if self.prefixes is not None:
+            self.byte_prefixes = [prefix.encode("ascii") for prefix in self.prefixes]
+
+    def has_candidate(self, content):
+        """
+        Cheap test before running the regex engine.
+        :return: False if no regex can match in content
+        :rtype: boolean
+        """
+        if self.prefixes is None:
+            return True
+        return any(prefix in content for prefix in self.prefixes)
+
+    def file_has_candidate(self, file_path, chunk_size=PREFILTER_CHUNK_SIZE):
+        """
+        Look for literal prefixes of regex in raw bytes of file, chunk by chunk.
+        :return: False if no regex can match in file
+        :rtype: boolean
+        """
+        if self.prefixes is None:
+            return True
+        overlap = max(len(prefix) for prefix in self.byte_prefixes) - 1
+        tail = b""
+        with open(file_path, 'rb') as input_file:
+            while True:
+                chunk = input_file.read(chunk_size)
+                if not chunk:
+                    return False
+                chunk = tail + chunk
+                if any(prefix in chunk for prefix in self.byte_prefixes):
+                    return True
+                tail = chunk[-overlap:] if overlap else b""
+
+    def finditer(self, content):
+        """
+        Single pass over content.
+        Yield (index of regex in regex_list, match of this regex), sorted by position.
+        """
+        if self.combined is None:
+            for regex_index, match in self._finditer_one_by_one(content):
+                yield regex_index, match
+            return
+        for combined_match in self.combined.finditer(content):
+            regex_index = self.group_to_regex.get(combined_match.lastindex)
+            if regex_index is None:
+                regex_index = [idx for group, idx in self.group_to_regex.items()
+                               if combined_match.group(group) is not None][0]
+            # match again with its own regex, to get its own groups
+            match = self.compiled[regex_index].match(content, combined_match.start())
+            yield regex_index, match
+
+    def _finditer_one_by_one(self, content):
+        """
+        Fallback when regex cant be combined. Matches overlapping a previous one are dropped.
+        """
+        all_matches = []
+        for regex_index, regex in enumerate(self.compiled):
+            all_matches.extend((match.start(), regex_index, match) for match in regex.finditer(content))
+        end = -1
+        for start, regex_index, match in sorted(all_matches, key=lambda item: (item[0], item[1])):
+            if start < end or (start == end and match.end() == start):
+                continue
+            end = match.end()
+            yield regex_index, match
+
+    def sub(self, new_string, content, matches=None):
+        """
+        Replace matches of all regex by new_string, in one pass.
+        new_string can use groups of the regex which matched, like re.sub.
+        :param: matches => list of (regex_index, match) from finditer, to not match content again
+        :return: content_new
+        :rtype: string
+        """
+        if matches is None:
+            matches = self.finditer(content)
+        parts = []
+        position = 0
+        for regex_index, match in matches:
+            parts.append(content[position:match.start()])
+            parts.append(match.expand(new_string))
+            position = match.end()
+        if not parts:
+            return content
+        parts.append(content[position:])
+        return "".join(parts)
@@ -0,0 +1,307 @@
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+#   AUTHORS :           Nicolas Dorey
+#                       Romain Leclerc
+#
+#   DESCRIPTION :       Graph of references between maya ascii files of a project (sqlite).
+#                       Headers of .ma files are parsed in parallel to get their file -r statements,
+#                       a file is parsed again only if its size / mtime changed.
+#                       Answer who references a file, and what a file references, directly or transitively.
+#
+#   Update  1.0.0 :     We start here.
+#
+#   KnownBugs :         Relative paths and paths using a variable not set in current environment cant be resolved,
+#                       they are kept as written in file.
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+
+import argparse
+import logging
+import multiprocessing
+import os
+import re
+import sqlite3
+
+from ...libs.mayaascii import reads as mayaascii_reads
+from ...libs.system import crawler as system_crawler
+
+
+GRAPH_VERSION = 1
+# copy number maya adds to paths of a file referenced more than once: scene.ma{1}
+COPY_NUMBER_PATTERN = re.compile(r"\{\d+\}$")
+
+
+def get_path_key(path):
+    """
+    Same key for all spellings of a path: variables expanded, absolute, separators, case on windows, copy number.
+    :param: path
+    :rtype: string
+    """
+    path = COPY_NUMBER_PATTERN.sub("", path.strip())
+    return os.path.normcase(os.path.abspath(os.path.expandvars(path)))
+
+
+def read_references_job(file_path):
+    """
+    Pool job: references of one scene.
+    :return: file_path, references (None if file cant be read), error
+    :rtype: tuple
+    """
+    try:
+        references = mayaascii_reads.parse_references(file_path)
+    except (IOError, OSError) as e:
+        return file_path, None, str(e)
+    # -rdi statements describe references of references, which are in the graph with their own scene
+    return file_path, [reference for reference in references if reference["depth_info"] is None], None
+
+
+class ReferenceGraph(object):
+    """
+    scenes => scene: size, mtime
+    refs   => scene -> referenced path, namespace, reference node, deferred
+    Ex:
+        graph = ReferenceGraph(graph_path)
+        graph.refresh("L:/Project/assets", exclude_dirs=["reference"], processes=8)
+        scenes = graph.get_referencing_scenes("L:/Project/assets/chr/Hero/publish/Hero_MDL.ma", recursive=True)
+        graph.close()
+    """
+    def __init__(self, graph_path):
+        self.graph_path = graph_path
+        folder = os.path.dirname(graph_path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        self.connection = sqlite3.connect(graph_path)
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version != GRAPH_VERSION:
+            self.connection.execute("DROP TABLE IF EXISTS scenes")
+            self.connection.execute("DROP TABLE IF EXISTS refs")
+            self.connection.execute("PRAGMA user_version = {}".format(GRAPH_VERSION))
+        self.connection.execute("CREATE TABLE IF NOT EXISTS scenes ("
+                                "key TEXT PRIMARY KEY, "
+                                "path TEXT NOT NULL, "
+                                "size INTEGER NOT NULL, "
+                                "mtime REAL NOT NULL)")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS refs ("
+                                "scene TEXT NOT NULL, "
+                                "target TEXT NOT NULL, "
+                                "path TEXT NOT NULL, "
+                                "namespace TEXT, "
+                                "reference_node TEXT, "
+                                "deferred INTEGER NOT NULL)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS refs_scene ON refs (scene)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS refs_target ON refs (target)")
+        self.connection.commit()
+
+    def get_scenes(self, top_folders=None):
+        """
+        :param: top_folders => only scenes in these folders, None for all
+        :return: scenes => {key: (path, size, mtime)}
+        :rtype: dict
+        """
+        scenes = {}
+        top_prefixes = None
+        if top_folders is not None:
+            top_prefixes = tuple(os.path.join(get_path_key(folder), "") for folder in top_folders)
+        for key, path, size, mtime in self.connection.execute("SELECT key, path, size, mtime FROM scenes"):
+            if top_prefixes is None or key.startswith(top_prefixes):
+                scenes[key] = (path, size, mtime)
+        return scenes
+
+    def store(self, file_path, size, mtime, references):
+        """
+        Replace references of a scene.
+        :param: file_path
+        :param: size, mtime => stat of file_path, taken before reading it
+        :param: references => from mayaascii_reads.parse_references
+        """
+        key = get_path_key(file_path)
+        self.connection.execute("DELETE FROM refs WHERE scene=?", (key,))
+        self.connection.execute("INSERT OR REPLACE INTO scenes (key, path, size, mtime) VALUES (?, ?, ?, ?)",
+                                (key, file_path, size, mtime))
+        self.connection.executemany("INSERT INTO refs (scene, target, path, namespace, reference_node, deferred) "
+                                    "VALUES (?, ?, ?, ?, ?, ?)",
+                                    [(key, get_path_key(reference["path"]), reference["path"], reference["namespace"],
+                                      reference["reference_node"], int(reference["deferred"]))
+                                     for reference in references if reference["path"]])
+
+    def remove(self, key):
+        self.connection.execute("DELETE FROM refs WHERE scene=?", (key,))
+        self.connection.execute("DELETE FROM scenes WHERE key=?", (key,))
+
+    def refresh(self, top_folders, exclude_dirs=None, processes=None):
+        """
+        Parse again scenes of top_folders whose size / mtime changed, forget deleted ones.
+        :param: top_folders => folder or list of folders
+        :param: exclude_dirs => names of folders not to go in
+        :param: processes => nb of processes, None for nb of cpus, 0 or 1 to stay in current process
+        :return: stats => {"scenes", "parsed", "removed", "errors"}
+        :rtype: dict
+        """
+        if not isinstance(top_folders, (list, tuple)):
+            top_folders = [top_folders]
+        files = system_crawler.crawl(top_folders, exclude_dirs=exclude_dirs, extensions=[".ma"])
+        known_scenes = self.get_scenes(top_folders)
+
+        stats_by_path = {}
+        for file_path, size, mtime in files:
+            known = known_scenes.pop(get_path_key(file_path), None)
+            if known is None or known[1] != size or known[2] != mtime:
+                stats_by_path[file_path] = (size, mtime)
+        # scenes not found anymore
+        for key in known_scenes:
+            self.remove(key)
+
+        to_parse = sorted(stats_by_path)
+        if processes is None:
+            processes = multiprocessing.cpu_count()
+        processes = min(processes, len(to_parse))
+        if processes <= 1:
+            results = [read_references_job(file_path) for file_path in to_parse]
+        else:
+            logging.info("Reading {} scenes on {} processes".format(len(to_parse), processes))
+            pool = multiprocessing.Pool(processes)
+            try:
+                results = pool.map(read_references_job, to_parse, max(1, len(to_parse) // (processes * 8)))
+            finally:
+                pool.close()
+                pool.join()
+
+        errors = 0
+        for file_path, references, error in results:
+            if references is None:
+                # not stored, so it will be read again next time
+                logging.warning('Scene "{}" cant be read: {}'.format(file_path, error))
+                errors += 1
+                continue
+            size, mtime = stats_by_path[file_path]
+            self.store(file_path, size, mtime, references)
+        self.connection.commit()
+
+        stats = {"scenes": len(files), "parsed": len(to_parse) - errors, "removed": len(known_scenes), "errors": errors}
+        logging.info("{scenes} scenes, {parsed} parsed, {removed} removed, {errors} errors".format(**stats))
+        return stats
+
+    def get_references(self, scene_path):
+        """
+        :param: scene_path
+        :return: references of scene => list of {"path", "namespace", "reference_node", "deferred"}
+        :rtype: list
+        """
+        rows = self.connection.execute("SELECT path, namespace, reference_node, deferred FROM refs WHERE scene=?",
+                                       (get_path_key(scene_path),))
+        return [{"path": path, "namespace": namespace, "reference_node": reference_node, "deferred": bool(deferred)}
+                for path, namespace, reference_node, deferred in rows]
+
+    def get_referencing(self, file_path):
+        """
+        :param: file_path => referenced file
+        :return: references to file_path => list of {"scene", "namespace", "reference_node", "deferred"}
+        :rtype: list
+        """
+        rows = self.connection.execute("SELECT scenes.path, refs.namespace, refs.reference_node, refs.deferred "
+                                       "FROM refs JOIN scenes ON scenes.key = refs.scene WHERE refs.target=?",
+                                       (get_path_key(file_path),))
+        return [{"scene": scene, "namespace": namespace, "reference_node": reference_node, "deferred": bool(deferred)}
+                for scene, namespace, reference_node, deferred in rows]
+
+    def _walk(self, key, query):
+        """
+        Keys reached from key by query, breadth first, each key once (cycles are possible).
+        :return: {key: depth}
+        :rtype: dict
+        """
+        depths = {key: 0}
+        level = [key]
+        depth = 0
+        while level:
+            depth += 1
+            next_level = []
+            for current in level:
+                for (found,) in self.connection.execute(query, (current,)):
+                    if found not in depths:
+                        depths[found] = depth
+                        next_level.append(found)
+            level = next_level
+        del depths[key]
+        return depths
+
+    def get_referencing_scenes(self, file_path, recursive=False):
+        """
+        :param: file_path => referenced file
+        :param: recursive => also scenes referencing these scenes, and so on
+        :return: scenes => sorted paths of scenes
+        :rtype: list
+        """
+        if not recursive:
+            return sorted(set(reference["scene"] for reference in self.get_referencing(file_path)))
+        keys = self._walk(get_path_key(file_path), "SELECT DISTINCT scene FROM refs WHERE target=?")
+        return sorted(self.get_scene_path(key) for key in keys)
+
+    def get_referenced_files(self, scene_path, recursive=False):
+        """
+        :param: scene_path
+        :param: recursive => also files referenced by the referenced files, and so on
+        :return: files => sorted paths of referenced files, as written in scenes
+        :rtype: list
+        """
+        if not recursive:
+            return sorted(set(reference["path"] for reference in self.get_references(scene_path)))
+        keys = self._walk(get_path_key(scene_path), "SELECT DISTINCT target FROM refs WHERE scene=?")
+        return sorted(self.get_scene_path(key) for key in keys)
+
+    def get_scene_path(self, key):
+        """
+        :return: path of a key, as found on disk or as written in scenes
+        :rtype: string
+        """
+        row = self.connection.execute("SELECT path FROM scenes WHERE key=?", (key,)).fetchone()
+        if row is None:
+            row = self.connection.execute("SELECT path FROM refs WHERE target=? LIMIT 1", (key,)).fetchone()
+        return row[0] if row is not None else key
+
+    def close(self):
+        try:
+            self.connection.commit()
+        except sqlite3.Error as e:
+            logging.error('Reference graph "{}" cant be saved: {}'.format(self.graph_path, e))
+        self.connection.close()
+
+
+def main():
+    """
+    Command line, eg:
+    python -m fw_common.tools.ascii.reference_graph L:/tmp/refs.sqlite refresh L:/Project/assets -x reference -j 8
+    python -m fw_common.tools.ascii.reference_graph L:/tmp/refs.sqlite who L:/Project/assets/chr/Hero/publish/Hero_MDL.ma -t
+    """
+    parser = argparse.ArgumentParser(description="Graph of references between .ma files")
+    parser.add_argument("graph_path", help="sqlite file of the graph")
+    subparsers = parser.add_subparsers(dest="command")
+    refresh_parser = subparsers.add_parser("refresh", help="read again scenes changed since last refresh")
+    refresh_parser.add_argument("top_folders", nargs="+", help="folders to walk on")
+    refresh_parser.add_argument("-x", "--exclude-dirs", nargs="+", default=[])
+    refresh_parser.add_argument("-j", "--jobs", type=int, default=None, help="nb of processes, nb of cpus by default")
+    who_parser = subparsers.add_parser("who", help="scenes referencing a file")
+    who_parser.add_argument("file_path")
+    who_parser.add_argument("-t", "--transitive", action="store_true", help="also scenes referencing them, and so on")
+    deps_parser = subparsers.add_parser("deps", help="files referenced by a scene")
+    deps_parser.add_argument("file_path")
+    deps_parser.add_argument("-t", "--transitive", action="store_true", help="also files they reference, and so on")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    graph = ReferenceGraph(args.graph_path)
+    try:
+        if args.command == "refresh":
+            graph.refresh(args.top_folders, exclude_dirs=args.exclude_dirs, processes=args.jobs)
+        elif args.command == "who":
+            for path in graph.get_referencing_scenes(args.file_path, recursive=args.transitive):
+                print(path)
+        elif args.command == "deps":
+            for path in graph.get_referenced_files(args.file_path, recursive=args.transitive):
+                print(path)
+    finally:
+        graph.close()
+
+
+if __name__ == "__main__":
+    main()
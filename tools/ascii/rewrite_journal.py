@@ -0,0 +1,283 @@
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+#   AUTHORS :           Nicolas Dorey
+#                       Romain Leclerc
+#
+#   DESCRIPTION :       Append only journal of files rewritten by UpdateAsciiString (json lines).
+#                       Each rewritten file is backed up first, then journaled with hashes before / after.
+#                       A run interrupted can be started again: journaled files which didnt change since are skipped.
+#                       A run can be rolled back: files are restored from their backups.
+#
+#   Update  1.0.0 :     We start here.
+#           1.0.1 :     Worker processes journal in their own part file, right after each rewrite.
+#                       Parts are merged on read.
+#
+#   KnownBugs :         A file rewritten just before a crash, and not journaled yet, has a backup but no entry:
+#                       it is scanned again on resume.
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+
+import argparse
+import glob
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+
+from ...libs.system import updates as system_updates
+
+
+DONE = "done"
+ROLLED_BACK = "rolled_back"
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def get_file_hash(file_path):
+    """
+    :param: file_path
+    :return: sha1 of file bytes
+    :rtype: string
+    """
+    file_hash = hashlib.sha1()
+    with open(file_path, "rb") as input_file:
+        while True:
+            chunk = input_file.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def get_backup_path(backup_folder, file_path):
+    """
+    Backup of file_path in backup_folder, keeping its folders: L:/Project/a.ma => backup_folder/L/Project/a.ma
+    :rtype: string
+    """
+    drive, path = os.path.splitdrive(os.path.abspath(file_path))
+    parts = [part for part in drive.replace(":", "").replace("\\", "/").split("/") if part]
+    return os.path.join(backup_folder, *(parts + [path.lstrip("\\/")]))
+
+
+def backup_file(file_path, backup_folder):
+    """
+    Copy file_path in backup_folder before it is rewritten.
+    :return: backup_path, pre_hash
+    :rtype: tuple
+    """
+    backup_path = get_backup_path(backup_folder, file_path)
+    folder = os.path.dirname(backup_path)
+    if not os.path.exists(folder):
+        try:
+            os.makedirs(folder)
+        except OSError:
+            # created by another process
+            if not os.path.isdir(folder):
+                raise
+    shutil.copy2(file_path, backup_path)
+    return backup_path, get_file_hash(backup_path)
+
+
+class RewriteJournal(object):
+    """
+    One json line per event: {"run", "signature", "path", "status", "pre_hash", "post_hash", "size", "mtime", "backup",
+    "time", "clock"}
+    Each worker process writes in its own part file (rewrite_journal.<part>.jsonl), all parts are read together.
+    Ex:
+        journal = RewriteJournal(journal_path, signature)
+        done = journal.get_done_files()
+        ...
+        journal.append_done(path, pre_hash, backup_path)
+        journal.close()
+    """
+    def __init__(self, journal_path, signature=None, run=None, part=None):
+        """
+        :param: journal_path => .jsonl file
+        :param: signature => what is done to files (hash of regex and new string), runs with another signature are ignored
+        :param: run => name of current run, date by default
+        :param: part => name of the part file entries are written in (pid of a worker), None for journal_path
+        """
+        self.journal_path = journal_path
+        self.signature = signature
+        self.run = run or time.strftime("%Y%m%d-%H%M%S")
+        self.part = part
+        self.file = None
+
+    def get_part_path(self, part):
+        """
+        :param: part => for ex 12345 => rewrite_journal.12345.jsonl
+        :rtype: string
+        """
+        root, extension = os.path.splitext(self.journal_path)
+        return "{}.{}{}".format(root, part, extension)
+
+    def get_journal_paths(self):
+        """
+        :return: journal_path and its part files which exist
+        :rtype: list
+        """
+        root, extension = os.path.splitext(self.journal_path)
+        paths = sorted(glob.glob("{}.*{}".format(glob.escape(root) if hasattr(glob, "escape") else root, extension)))
+        if os.path.exists(self.journal_path):
+            paths.insert(0, self.journal_path)
+        return paths
+
+    def read_entries(self):
+        """
+        :return: entries of journal and its parts, in the order they were written.
+                 A line half written by a crash is ignored.
+        :rtype: list
+        """
+        entries = []
+        for journal_path in self.get_journal_paths():
+            with open(journal_path, "r") as journal_file:
+                for line in journal_file:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        logging.warning('Invalid line in journal "{}" is ignored'.format(journal_path))
+        # stable sort: entries without clock (older journals) keep their order
+        entries.sort(key=lambda entry: entry.get("clock", 0))
+        return entries
+
+    def get_done_files(self):
+        """
+        Files rewritten with same signature, and not rolled back.
+        :return: {absolute path: last entry}
+        :rtype: dict
+        """
+        done_files = {}
+        for entry in self.read_entries():
+            if entry.get("signature") != self.signature:
+                continue
+            if entry["status"] == DONE:
+                done_files[entry["path"]] = entry
+            elif entry["status"] == ROLLED_BACK:
+                done_files.pop(entry["path"], None)
+        return done_files
+
+    def is_done(self, file_path, entry):
+        """
+        :param: file_path
+        :param: entry => from get_done_files
+        :return: True if file_path didnt change since it has been journaled
+        :rtype: boolean
+        """
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return False
+        return stat.st_size == entry["size"] and stat.st_mtime == entry["mtime"]
+
+    def append(self, entry):
+        """
+        Write an entry and flush it to disk, so it survives a crash.
+        """
+        if self.file is None:
+            journal_path = self.journal_path if self.part is None else self.get_part_path(self.part)
+            folder = os.path.dirname(journal_path)
+            if folder and not os.path.exists(folder):
+                try:
+                    os.makedirs(folder)
+                except OSError:
+                    # created by another process
+                    if not os.path.isdir(folder):
+                        raise
+            self.file = open(journal_path, "a")
+        entry = dict(entry, run=self.run, signature=self.signature, time=time.strftime("%Y/%m/%d - %H:%M:%S"),
+                     clock=time.time())
+        self.file.write(json.dumps(entry, sort_keys=True) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def append_done(self, file_path, pre_hash, backup_path):
+        """
+        :param: file_path => rewritten file
+        :param: pre_hash => hash of file before rewrite
+        :param: backup_path => copy of file before rewrite
+        """
+        stat = os.stat(file_path)
+        self.append({"path": os.path.abspath(file_path), "status": DONE, "pre_hash": pre_hash,
+                     "post_hash": get_file_hash(file_path), "size": stat.st_size, "mtime": stat.st_mtime,
+                     "backup": backup_path})
+
+    def rollback(self, run=None, force=False):
+        """
+        Restore files rewritten by run from their backups, last rewritten first.
+        A file edited since its rewrite is not restored, unless force is True.
+        :param: run => run to roll back, None for all runs
+        :param: force
+        :return: restored => paths of restored files
+        :rtype: list
+        """
+        done_entries = []
+        for entry in self.read_entries():
+            if run is not None and entry.get("run") != run:
+                continue
+            if entry["status"] == DONE:
+                done_entries.append(entry)
+            elif entry["status"] == ROLLED_BACK:
+                done_entries = [done for done in done_entries if done["path"] != entry["path"]]
+
+        restored = []
+        for entry in reversed(done_entries):
+            file_path = entry["path"]
+            if not os.path.exists(entry["backup"]):
+                logging.error('Backup of "{}" not found: {}'.format(file_path, entry["backup"]))
+                continue
+            if not force and os.path.exists(file_path) and get_file_hash(file_path) != entry["post_hash"]:
+                logging.error('"{}" changed since it has been rewritten, it is not restored'.format(file_path))
+                continue
+            with open(entry["backup"], "rb") as backup_file:
+                with system_updates.AtomicFile(file_path, mode="wb") as output_file:
+                    shutil.copyfileobj(backup_file, output_file)
+                    output_file.commit()
+            # keep run and signature of the rewrite, so it is not seen as done anymore
+            self.signature = entry.get("signature")
+            self.run = entry.get("run")
+            self.append({"path": file_path, "status": ROLLED_BACK, "pre_hash": entry["post_hash"],
+                         "post_hash": entry["pre_hash"], "backup": entry["backup"]})
+            logging.info('"{}" restored from "{}"'.format(file_path, entry["backup"]))
+            restored.append(file_path)
+        return restored
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def main():
+    """
+    Command line, eg:
+    python -m fw_common.tools.ascii.rewrite_journal tools/ascii/jsons/rewrite_journal.jsonl list
+    python -m fw_common.tools.ascii.rewrite_journal tools/ascii/jsons/rewrite_journal.jsonl rollback --run 20200610-154906
+    """
+    parser = argparse.ArgumentParser(description="Journal of files rewritten by update_string_from_ascii")
+    parser.add_argument("journal_path", help=".jsonl journal")
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.add_parser("list", help="nb of files rewritten by each run")
+    rollback_parser = subparsers.add_parser("rollback", help="restore rewritten files from their backups")
+    rollback_parser.add_argument("--run", default=None, help="run to roll back, all runs by default")
+    rollback_parser.add_argument("--force", action="store_true", help="restore files even if edited since rewrite")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    journal = RewriteJournal(args.journal_path)
+    try:
+        if args.command == "list":
+            runs = {}
+            for entry in journal.read_entries():
+                runs.setdefault(entry.get("run"), {DONE: 0, ROLLED_BACK: 0})[entry["status"]] += 1
+            for run in sorted(runs):
+                print("{}: {} rewritten, {} rolled back".format(run, runs[run][DONE], runs[run][ROLLED_BACK]))
+        elif args.command == "rollback":
+            restored = journal.rollback(run=args.run, force=args.force)
+            logging.info("{} files restored".format(len(restored)))
+    finally:
+        journal.close()
+
+
+if __name__ == "__main__":
+    main()
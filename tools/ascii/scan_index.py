@@ -0,0 +1,114 @@
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+#   AUTHORS :           Nicolas Dorey
+#                       Romain Leclerc
+#
+#   DESCRIPTION :       Persistent index of scan results of UpdateAsciiString (sqlite).
+#                       A file is read again only if its size / mtime changed, or if regex are not the same.
+#
+#   Update  1.0.0 :     We start here.
+#
+#   KnownBugs :         A file edited without changing size and mtime is not scanned again.
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+
+
+INDEX_VERSION = 1
+# nb of stored files between two commits
+COMMIT_EVERY = 500
+
+
+def get_patterns_hash(regex_list, flags=0):
+    """
+    :param: regex_list
+    :param: flags => flags used to compile regex
+    :return: hash of the pattern set
+    :rtype: string
+    """
+    datas = json.dumps({"version": INDEX_VERSION, "regex_list": list(regex_list), "flags": int(flags)}, sort_keys=True)
+    return hashlib.sha1(datas.encode("utf-8")).hexdigest()
+
+
+class ScanIndex(object):
+    """
+    Scan result of each file: (path, patterns hash) => size, mtime, detected, logs
+    Ex:
+        index = ScanIndex(index_path, regex_list, re.MULTILINE)
+        stat = os.stat(path)
+        result = index.lookup(path, stat)
+        if result is None:
+            ...
+            index.store(path, stat, regex_detected, logs)
+        index.close()
+    """
+    def __init__(self, index_path, regex_list, flags=0):
+        self.index_path = index_path
+        self.patterns_hash = get_patterns_hash(regex_list, flags)
+        self.nb_stored = 0
+        folder = os.path.dirname(index_path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        self.connection = sqlite3.connect(index_path)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS scans ("
+                                "path TEXT NOT NULL, "
+                                "patterns TEXT NOT NULL, "
+                                "size INTEGER NOT NULL, "
+                                "mtime REAL NOT NULL, "
+                                "detected INTEGER NOT NULL, "
+                                "logs TEXT NOT NULL, "
+                                "PRIMARY KEY (path, patterns))")
+        self.connection.commit()
+
+    @staticmethod
+    def get_key(path):
+        return os.path.normcase(os.path.abspath(path))
+
+    def lookup(self, path, stat):
+        """
+        :param: path
+        :param: stat => os.stat of path, taken before reading it
+        :return: (regex_detected, logs) if file didnt change since last scan, else None
+        :rtype: tuple
+        """
+        row = self.connection.execute("SELECT size, mtime, detected, logs FROM scans WHERE path=? AND patterns=?",
+                                      (self.get_key(path), self.patterns_hash)).fetchone()
+        if row is None:
+            return None
+        size, mtime, detected, logs = row
+        if size != stat.st_size or mtime != stat.st_mtime:
+            return None
+        return bool(detected), [tuple(log) for log in json.loads(logs)]
+
+    def store(self, path, stat, regex_detected, logs):
+        """
+        :param: path
+        :param: stat => os.stat of path, taken before reading it
+        :param: regex_detected
+        :param: logs => list of (level, message)
+        """
+        self.connection.execute("INSERT OR REPLACE INTO scans (path, patterns, size, mtime, detected, logs) "
+                                "VALUES (?, ?, ?, ?, ?, ?)",
+                                (self.get_key(path), self.patterns_hash, stat.st_size, stat.st_mtime,
+                                 int(bool(regex_detected)), json.dumps(logs)))
+        self.nb_stored += 1
+        if self.nb_stored % COMMIT_EVERY == 0:
+            self.connection.commit()
+
+    def remove(self, path):
+        """
+        Forget path for all pattern sets, for ex when it has been edited
+        """
+        self.connection.execute("DELETE FROM scans WHERE path=?", (self.get_key(path),))
+
+    def close(self):
+        try:
+            self.connection.commit()
+        except sqlite3.Error as e:
+            logging.error('Scan index "{}" cant be saved: {}'.format(self.index_path, e))
+        self.connection.close()
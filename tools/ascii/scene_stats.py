@@ -0,0 +1,185 @@
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+#   AUTHORS :           Nicolas Dorey
+#                       Romain Leclerc
+#
+#   DESCRIPTION :       Statistics of maya ascii files (.ma), without maya: nodes of each type, polycount of each mesh
+#                       and textures. Polycounts come from sizes of .vt / .ed / .fc / .uvsp setAttr headers,
+#                       arrays are never read. Scenes are shared between processes, stats are written in json and csv.
+#
+#   Update  1.0.0 :     We start here.
+#
+#   KnownBugs :         Meshes built by construction history (polyCube...) have no arrays in file: their polycount is None.
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+# ------------------------------------------------------------------------------------------------------------------------------------- #
+
+import argparse
+import csv
+import json
+import logging
+import multiprocessing
+
+from ...libs.mayaascii import reads as mayaascii_reads
+from ...libs.mayaascii import updates as mayaascii_updates
+from ...libs.system import crawler as system_crawler
+
+
+# same keys as read_nodes.get_meshes_polycount_dict => array attribute of mesh
+POLYCOUNT_ATTRIBUTES = [("vtx", ".vt"), ("edge", ".ed"), ("face", ".fc"), ("uv", ".uvst[0].uvsp")]
+# node types holding a texture path, and their attributes
+TEXTURE_ATTRIBUTES = dict((node_type, mayaascii_updates.PATH_ATTRIBUTES[node_type])
+                          for node_type in ["file", "aiImage", "RedshiftNormalMap", "RedshiftSprite", "RedshiftDomeLight"])
+CSV_COLUMNS = ["path", "nodes", "meshes", "vtx", "edge", "face", "uv", "textures", "error"]
+
+
+def get_meshes_polycount_dict(index):
+    """
+    Polycount of each mesh of index, read from sizes of its arrays.
+    Same result as read_nodes.get_meshes_polycount_dict, intermediate shapes (Orig) are skipped.
+    :param: index => SceneIndex
+    :return: dict_to_return => {mesh transform: {vtx:999, edge:999, face:999, uv:999}...}
+    :rtype: dict
+    """
+    dict_to_return = {}
+    for shape in index.get_nodes_by_type("mesh"):
+        intermediate = shape["attributes"].get(".io")
+        if intermediate is not None and intermediate["values"] in (["yes"], ["1"], ["true"]):
+            continue
+        value_dict = {}
+        for what_to_evaluate, attribute in POLYCOUNT_ATTRIBUTES:
+            value_dict[what_to_evaluate] = mayaascii_reads.get_array_size(shape, attribute)
+        mesh_element = shape["parent"] or shape["path"]
+        # many shapes under a transform are kept apart
+        if mesh_element in dict_to_return:
+            mesh_element = shape["path"]
+        dict_to_return[mesh_element] = value_dict
+    return dict_to_return
+
+
+def get_textures(index):
+    """
+    :param: index => SceneIndex
+    :return: textures => sorted paths of textures
+    :rtype: list
+    """
+    textures = set()
+    for node_type, attributes in TEXTURE_ATTRIBUTES.items():
+        for node in index.get_nodes_by_type(node_type):
+            for attribute in attributes:
+                values = node["attributes"].get(attribute)
+                if values is None:
+                    continue
+                path_values = values["values"]
+                if path_values is None:
+                    statement = mayaascii_reads.read_statement(index.file_path, values["offset"], values["length"])
+                    flags, positionals = mayaascii_reads.split_flags(mayaascii_reads.tokenize(statement)[1:],
+                                                                    mayaascii_reads.FLAGS_WITH_ARG["setAttr"])
+                    path_values = positionals[1:]
+                if path_values and path_values[-1]:
+                    textures.add(path_values[-1])
+    return sorted(textures)
+
+
+def get_scene_stats(file_path):
+    """
+    :param: file_path => .ma file
+    :return: stats => {"path", "node_types": {type: nb}, "meshes": {mesh: polycount}, "textures", "error"}
+    :rtype: dict
+    """
+    stats = {"path": file_path, "node_types": {}, "meshes": {}, "textures": [], "error": None}
+    try:
+        # only attributes of meshes and textures are kept
+        index = mayaascii_reads.parse_scene(file_path, attribute_node_types=["mesh"] + list(TEXTURE_ATTRIBUTES))
+        stats["node_types"] = index.get_node_types()
+        stats["meshes"] = get_meshes_polycount_dict(index)
+        stats["textures"] = get_textures(index)
+    except (IOError, OSError) as e:
+        stats["error"] = str(e)
+    return stats
+
+
+def get_stats_of_files(files_path_list, processes=None):
+    """
+    :param: files_path_list => .ma files
+    :param: processes => nb of processes, None for nb of cpus, 0 or 1 to stay in current process
+    :return: stats => one per scene, same order as files_path_list, see get_scene_stats
+    :rtype: list
+    """
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    processes = min(processes, len(files_path_list))
+    if processes <= 1:
+        return [get_scene_stats(file_path) for file_path in files_path_list]
+
+    logging.info("Reading {} scenes on {} processes".format(len(files_path_list), processes))
+    pool = multiprocessing.Pool(processes)
+    try:
+        return pool.map(get_scene_stats, files_path_list, max(1, len(files_path_list) // (processes * 8)))
+    finally:
+        pool.close()
+        pool.join()
+
+
+def get_rollup(stats):
+    """
+    One row per scene: totals of nodes, meshes, polycount, textures.
+    Meshes without arrays in file are not counted in polycount.
+    :param: stats => from get_stats_of_files
+    :rtype: list
+    """
+    rows = []
+    for scene_stats in stats:
+        row = {"path": scene_stats["path"],
+               "nodes": sum(scene_stats["node_types"].values()),
+               "meshes": len(scene_stats["meshes"]),
+               "textures": len(scene_stats["textures"]),
+               "error": scene_stats["error"] or ""}
+        for what_to_evaluate, attribute in POLYCOUNT_ATTRIBUTES:
+            row[what_to_evaluate] = sum(polycount[what_to_evaluate] or 0 for polycount in scene_stats["meshes"].values())
+        rows.append(row)
+    return rows
+
+
+def export_stats(stats, json_path=None, csv_path=None):
+    """
+    :param: stats => from get_stats_of_files
+    :param: json_path => all stats of each scene
+    :param: csv_path => rollup, one row per scene
+    """
+    if json_path:
+        with open(json_path, "w") as json_file:
+            json.dump(stats, json_file, indent=4)
+    if csv_path:
+        # csv module of python 2 wants binary files
+        with open(csv_path, "wb" if str is bytes else "w") as csv_file:
+            writer = csv.DictWriter(csv_file, fieldnames=CSV_COLUMNS)
+            writer.writeheader()
+            for row in get_rollup(stats):
+                writer.writerow(row)
+
+
+def main():
+    """
+    Command line, eg:
+    python -m fw_common.tools.ascii.scene_stats L:/Project/assets -x reference -j 8 --json L:/tmp/stats.json --csv L:/tmp/stats.csv
+    """
+    parser = argparse.ArgumentParser(description="Node types, polycounts and textures of .ma files")
+    parser.add_argument("folders", nargs="+", help=".ma files or folders to look for .ma files in")
+    parser.add_argument("-x", "--exclude-dirs", nargs="*", default=[], help="names of folders not to go in")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="nb of processes, nb of cpus by default")
+    parser.add_argument("--json", default=None, help="json file where stats of each scene are written")
+    parser.add_argument("--csv", default=None, help="csv file where the rollup is written")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    files_path_list = [path for path in args.folders if path.endswith(".ma")]
+    folders = [path for path in args.folders if not path.endswith(".ma")]
+    if folders:
+        files_path_list += system_crawler.get_files(folders, exclude_dirs=args.exclude_dirs, extensions=[".ma"])
+    stats = get_stats_of_files(files_path_list, processes=args.jobs)
+    export_stats(stats, json_path=args.json, csv_path=args.csv)
+    logging.info("{} scenes read, {} errors".format(len(stats), len([scene for scene in stats if scene["error"]])))
+
+
+if __name__ == "__main__":
+    main()
@@ -7,20 +7,189 @@
 #                       Two modes! first one logs what will be change, the other will edit ascii
 #
 #   Update  1.0.0 :     We start here.
+#           1.0.1 :     ^ and $ replace only at start / end of file, like the old re.sub on the whole file.
+#                       Temp file of a rewrite is opened at the first change only.
+#           1.0.2 :     Rewrites are journaled by the process which did them, backups folder is a parameter.
 #
 #   KnownBugs :         None atm.
 # ------------------------------------------------------------------------------------------------------------------------------------- #
 # ------------------------------------------------------------------------------------------------------------------------------------- #
 
+import argparse
 import os
 import re
 import logging
 import logging.config
 import json
+import multiprocessing
 import sys
 import time
 
 from ..logger import extra_logger
+from ...libs.system import crawler as system_crawler
+from ...libs.system import updates as system_updates
+from . import ascii_stream
+from . import multi_regex
+from . import rewrite_journal
+from . import scan_index
+
+
+# matchers and journal of each worker process, see init_worker
+worker_matcher = None
+worker_replace_matcher = None
+worker_journal = None
+
+
+class RecordsHandler(logging.Handler):
+    """
+    Keep log records as (level, message) instead of writing them,
+    so worker processes never write in the log file of the main process.
+    """
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append((record.levelno, record.getMessage()))
+
+
+def copy_units(file_found, mode, nb_units, output_file):
+    """
+    Write the first nb_units units of file_found (see ascii_stream.iter_units) in output_file.
+    """
+    if not nb_units:
+        return
+    with open(file_found, 'r') as input_file:
+        for unit_index, content in enumerate(ascii_stream.iter_units(input_file, mode)):
+            if unit_index >= nb_units:
+                break
+            output_file.write(content)
+
+
+def search_and_replace_in_file(file_found, matcher, new_string=None, write=False, mode=ascii_stream.FILE,
+                               backup_folder=None, replace_matcher=None, journal=None):
+    """
+    Find matches of matcher in file, and replace them if write is True.
+    File is read by lines, statements or whole (see ascii_stream.get_stream_mode),
+    and written in a temp file moved over file_found only if something changed.
+    The temp file is opened at the first change: units read before are copied from file_found.
+    All regex are matched and replaced in a single pass (see multi_regex.MultiRegex).
+    Nothing is logged here: logs are returned, to be written by the caller.
+    :param: file_found
+    :param: matcher => MultiRegex
+    :param: new_string, write
+    :param: mode => line, statement or file
+    :param: backup_folder => file is copied in it before being rewritten, None for no backup
+    :param: replace_matcher => MultiRegex used to replace if not matcher, see get_replace_matcher
+    :param: journal => RewriteJournal the rewrite is written in right after the file is replaced, with its backup
+    :return: regex_detected, file_updated, logs, backup => logs is a list of (level, message),
+             backup is (backup_path, pre_hash) if file has been backed up, else None
+    :rtype: tuple
+    """
+    logs = []
+    backup = None
+    # files without literal prefix of any regex are not read
+    if not matcher.file_has_candidate(file_found):
+        return False, False, logs, backup
+
+    regex_detected = False
+    write = write and new_string is not None
+    content_changed = False
+    output_file = None
+
+    with open(file_found, 'r') as input_file:
+        try:
+            for unit_index, content in enumerate(ascii_stream.iter_units(input_file, mode)):
+                matches = []
+                if matcher.has_candidate(content):
+                    matches = list(matcher.finditer(content))
+                for regex_index, match in matches:
+                    regex_detected = True
+                    logs.append((logging.WARNING, 'regex "{}" found in {} --> string :{}'.format(
+                        matcher.regex_list[regex_index], file_found, match.group())))
+                if write and matches:
+                    if replace_matcher is None:
+                        content_new = matcher.sub(new_string, content, matches=matches)
+                    else:
+                        content_new = replace_matcher.sub(new_string, content)
+                    if content_new != content:
+                        if output_file is None:
+                            output_file = system_updates.AtomicFile(file_found)
+                            copy_units(file_found, mode, unit_index, output_file)
+                        content_changed = True
+                        content = content_new
+                if output_file is not None:
+                    output_file.write(content)
+        except Exception:
+            if output_file is not None:
+                output_file.discard()
+            raise
+
+    if output_file is not None:
+        if backup_folder is not None:
+            try:
+                backup = rewrite_journal.backup_file(file_found, backup_folder)
+            except Exception:
+                output_file.discard()
+                raise
+        output_file.commit()
+        if journal is not None and backup is not None:
+            journal.append_done(file_found, backup[1], backup[0])
+        logs.append((logging.INFO, 'File {} updated '.format(file_found)))
+    return regex_detected, content_changed, logs, backup
+
+
+def get_replace_matcher(regex_list):
+    """
+    Matches are found with MULTILINE, but were always replaced without it (re.sub on the whole file):
+    ^ and $ of regex replace only at start / end of file.
+    :return: matcher to replace without MULTILINE, None if matches of search can be replaced
+    :rtype: multi_regex.MultiRegex
+    """
+    if not any(ascii_stream.has_file_anchor(regex) for regex in regex_list):
+        return None
+    return multi_regex.MultiRegex(regex_list)
+
+
+def init_worker(regex_list, journal_args=None):
+    """
+    Initializer of worker processes: build the matcher once, open the journal part of the process,
+    and drop log handlers inherited from main process.
+    :param: regex_list
+    :param: journal_args => (journal_path, signature, run) of the journal of main process, None to not journal
+    """
+    global worker_matcher
+    global worker_replace_matcher
+    global worker_journal
+    worker_matcher = multi_regex.MultiRegex(regex_list, re.MULTILINE)
+    worker_replace_matcher = get_replace_matcher(regex_list)
+    if journal_args is not None:
+        journal_path, signature, run = journal_args
+        worker_journal = rewrite_journal.RewriteJournal(journal_path, signature=signature, run=run, part=os.getpid())
+    root_logger = logging.getLogger()
+    for handler in list(root_logger.handlers):
+        root_logger.removeHandler(handler)
+
+
+def search_and_replace_job(job):
+    """
+    Work of one file in a worker process.
+    :param: job => (file_found, new_string, write, mode, backup_folder)
+    :return: file_found, regex_detected, file_updated, logs, backup
+    :rtype: tuple
+    """
+    file_found, new_string, write, mode, backup_folder = job
+    # logs of libs used during the job are returned too
+    records_handler = RecordsHandler()
+    root_logger = logging.getLogger()
+    root_logger.addHandler(records_handler)
+    try:
+        regex_detected, file_updated, logs, backup = search_and_replace_in_file(
+            file_found, worker_matcher, new_string=new_string, write=write, mode=mode, backup_folder=backup_folder,
+            replace_matcher=worker_replace_matcher, journal=worker_journal)
+    finally:
+        root_logger.removeHandler(records_handler)
+    return file_found, regex_detected, file_updated, records_handler.records + logs, backup
 
 
 class UpdateAsciiString(object):
@@ -38,7 +207,14 @@ class UpdateAsciiString(object):
                  export_logs_folder='logs',
                  exclude_dirs=[""], extensions=[".*"],
                  write=False,
-                 loadExistingFile=None):
+                 loadExistingFile=None,
+                 stream=True,
+                 jobs=1,
+                 useScanIndex=True,
+                 useJournal=True,
+                 backupFolder=None,
+                 asyncLogs=True,
+                 maxRepeats=None):
 
         self.current_dir = os.path.dirname(os.path.realpath(__file__))
         self.is_load_existing_file = False
@@ -63,9 +239,19 @@ class UpdateAsciiString(object):
         self.extensions = extensions
         self.write = write
         self.loadExistingFile = loadExistingFile
-        # Prepare extra log
+        # read files by lines / statements instead of loading them whole
+        self.stream = stream
+        # nb of processes reading files
+        self.jobs = jobs
+        # results of unchanged files are read from the scan index, see get_scan_index
+        self.useScanIndex = useScanIndex
+        # rewritten files are backed up and journaled, see get_journal
+        self.useJournal = useJournal
+        # backups of rewritten files, in a folder by run: never in the tool folder, they are full copies of scenes
+        self.backupFolder = backupFolder or os.path.join(os.path.expanduser("~"), "update_string_from_ascii", "backups")
+        # Prepare extra log: written by a background thread, same messages written maxRepeats times at most
         self.extra_logger = extra_logger.ExtraLogger()
-        self.extra_logger.execute_logger(self.log_path)
+        self.extra_logger.execute_logger(self.log_path, use_queue=asyncLogs, max_repeats=maxRepeats)
         self.extra_logging = logging.getLogger()
 
 
@@ -92,48 +278,145 @@ class UpdateAsciiString(object):
         else:
             self.is_load_existing_file = True
             # Get list of file in path_to_walk_on directory
-            exclude = set(self.exclude_dirs)
-            extensions = set(self.extensions)
-            files_path_list = []
-
-            for root, dirs, files in os.walk(self.top_folders, topdown=True):
-                dirs[:] = [d for d in dirs if d not in exclude]
-                files = [file for file in files if os.path.splitext(file)[1] in extensions]
-                for fname in files:
-                    current_path_file = os.path.join(root, fname)
-                    files_path_list.append(current_path_file)
-                    self.extra_logging.info('File found: {}'.format(current_path_file))
+            manifest_path = os.path.join(self.current_dir, self.export_json_folder, "crawl_manifest.json")
+            files_path_list = system_crawler.get_files(self.top_folders,
+                                                       exclude_dirs=self.exclude_dirs,
+                                                       extensions=self.extensions,
+                                                       manifest_path=manifest_path)
+            for current_path_file in files_path_list:
+                self.extra_logging.info('File found: {}'.format(current_path_file))
             list_files_found = sorted(list(dict.fromkeys(files_path_list)))
 
         return list_files_found
 
 
+    def get_scan_index(self):
+        """
+        Scan index stored next to exported jsons.
+        :return: index, None if useScanIndex is False
+        :rtype: scan_index.ScanIndex
+        """
+        if not self.useScanIndex:
+            return None
+        index_path = os.path.join(self.current_dir, self.export_json_folder, "scan_index.sqlite")
+        try:
+            return scan_index.ScanIndex(index_path, self.regex_list, re.MULTILINE)
+        except Exception as e:
+            self.extra_logging.error('Scan index "{}" cant be opened, all files will be read: {}'.format(index_path, e))
+            return None
+
+
+    def get_journal(self):
+        """
+        Journal of rewritten files stored next to exported jsons, backups are in <backupFolder>/<run>.
+        :return: journal, None if not writing or useJournal is False
+        :rtype: rewrite_journal.RewriteJournal
+        """
+        if not self.write or not self.useJournal or self.new_string is None:
+            return None
+        journal_path = os.path.join(self.current_dir, self.export_json_folder, "rewrite_journal.jsonl")
+        signature = scan_index.get_patterns_hash(list(self.regex_list) + [self.new_string], re.MULTILINE)
+        return rewrite_journal.RewriteJournal(journal_path, signature=signature, run=self.timestr)
+
+
     def search_and_replace_in_file_with_regex(self, files_path_list):
         """
+        Files are shared between self.jobs processes if more than one.
+        Files which didnt change since last scan with same regex are not read (see get_scan_index).
+        When writing, files already rewritten by an interrupted run are skipped (see get_journal).
         :param: files_path_list
         :return: sorted(list(dict.fromkeys(list_files_regex_detected)))
         :rtype: list
         """
         list_files_regex_detected = []
-        for file_found in files_path_list:
-
-            self.extra_logging.info('Working on "{}"'.format(file_found))
-
-            with open(file_found, 'r') as input_file:
-                content = input_file.read()
-                for regex in self.regex_list:
-                    matches = re.finditer(regex, content, re.MULTILINE)
-                    for match in matches:
-                        list_files_regex_detected.append(file_found)
-                        self.extra_logging.warning('regex "{}" found in {} --> string :{}'.format(regex, file_found, match.group()))
-                if self.write:
-                    if self.new_string is None:
-                        self.extra_logging.error("Cannot replace string with nothing! Put your new string: {}".format(self.new_string))
-                    content_new = re.sub(regex, self.new_string, content)
-                    if content_new != content:
-                        with open(file_found, 'w') as output_file:
-                            output_file.write(content_new)
-                            self.extra_logging.info('File {} updated '.format(file_found))
+        if self.write and self.new_string is None:
+            self.extra_logging.error("Cannot replace string with nothing! Put your new string: {}".format(self.new_string))
+        mode = ascii_stream.FILE
+        if self.stream:
+            # ^ and $ are line anchors to search, but file anchors to replace (see get_replace_matcher)
+            mode = ascii_stream.get_stream_mode(self.regex_list, 0 if self.write else re.MULTILINE)
+            self.extra_logging.info('Files are read by {}'.format(mode))
+
+        files_path_list = sorted(files_path_list)
+
+        # results of unchanged files
+        index = self.get_scan_index()
+        stats = {}
+        results_found = {}
+        if index is not None:
+            for file_found in files_path_list:
+                try:
+                    stats[file_found] = os.stat(file_found)
+                except OSError:
+                    continue
+                result = index.lookup(file_found, stats[file_found])
+                # files with matches must be read again to be edited
+                if result is not None and not (self.write and result[0]):
+                    results_found[file_found] = (file_found, result[0], False, result[1], None)
+            self.extra_logging.info('{} files unchanged since last scan'.format(len(results_found)))
+
+        # files rewritten by a previous run with same regex and new string, untouched since
+        journal = self.get_journal()
+        backup_folder = None
+        if journal is not None:
+            backup_folder = os.path.join(self.backupFolder, journal.run)
+            done_files = journal.get_done_files()
+            nb_done = 0
+            for file_found in files_path_list:
+                entry = done_files.get(os.path.abspath(file_found))
+                if entry is not None and file_found not in results_found and journal.is_done(file_found, entry):
+                    results_found[file_found] = (file_found, True, False,
+                                                 [(logging.INFO, 'Already rewritten by run {}'.format(entry["run"]))], None)
+                    nb_done += 1
+            self.extra_logging.info('{} files already rewritten, see journal {}'.format(nb_done, journal.journal_path))
+        files_to_read = [file_found for file_found in files_path_list if file_found not in results_found]
+
+        jobs = min(self.jobs, len(files_to_read))
+        pool = None
+        if jobs > 1:
+            self.extra_logging.info('Files are shared between {} processes'.format(jobs))
+            # workers journal each rewrite themselves, right after it, in their own part of the journal
+            journal_args = (journal.journal_path, journal.signature, journal.run) if journal is not None else None
+            pool = multiprocessing.Pool(processes=jobs, initializer=init_worker, initargs=(self.regex_list, journal_args))
+            # results come back in the order of files_to_read
+            results = pool.imap(search_and_replace_job,
+                                [(file_found, self.new_string, self.write, mode, backup_folder)
+                                 for file_found in files_to_read],
+                                max(1, len(files_to_read) // (jobs * 8)))
+        else:
+            matcher = multi_regex.MultiRegex(self.regex_list, re.MULTILINE)
+            replace_matcher = get_replace_matcher(self.regex_list)
+            results = ((file_found,) + search_and_replace_in_file(file_found, matcher, new_string=self.new_string,
+                                                                  write=self.write, mode=mode,
+                                                                  backup_folder=backup_folder,
+                                                                  replace_matcher=replace_matcher, journal=journal)
+                       for file_found in files_to_read)
+
+        try:
+            for file_found in files_path_list:
+                if file_found in results_found:
+                    result = results_found[file_found]
+                else:
+                    result = next(results)
+                    if index is not None and file_found in stats:
+                        if result[2]:
+                            index.remove(file_found)
+                        else:
+                            index.store(file_found, stats[file_found], result[1], result[3])
+                file_found, regex_detected, file_updated, logs, backup = result
+                self.extra_logging.info('Working on "{}"'.format(file_found))
+                for level, message in logs:
+                    self.extra_logging.log(level, message)
+                if regex_detected:
+                    list_files_regex_detected.append(file_found)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+            if index is not None:
+                index.close()
+            if journal is not None:
+                journal.close()
         return sorted(list(dict.fromkeys(list_files_regex_detected)))
 
 
@@ -180,6 +463,7 @@ class UpdateAsciiString(object):
         self.export_json(data=list_files_regex_detected, filename=filename)
 
         self.extra_logging.info("END OF PROCESS.")
+        self.extra_logger.stop_logger()
 
         return {"files_found": list_files_found,
                 "files_regex_detected": list_files_regex_detected,
@@ -187,9 +471,50 @@ class UpdateAsciiString(object):
                 "jsons_files": self.files_jsons_exported}
 
 
+def main():
+    """
+    Command line, eg:
+    python -m fw_common.tools.ascii.update_string_from_ascii L:/Project/assets -r "(BalloonFish01)" -n "TestBalloonFish01" -e .ma --jobs 8
+    """
+    parser = argparse.ArgumentParser(description="Search and replace strings in ascii files like .ma, .nk")
+    parser.add_argument("top_folders", help="folder to walk on")
+    parser.add_argument("-r", "--regex", action="append", dest="regex_list", required=True, help="regex to find, can be repeated")
+    parser.add_argument("-n", "--new-string", default=None, help="replace matches by this string")
+    parser.add_argument("-e", "--extensions", nargs="+", default=[".ma"])
+    parser.add_argument("-x", "--exclude-dirs", nargs="+", default=[""])
+    parser.add_argument("-l", "--load-existing-file", default=None, help="json of files to work on, instead of walking top_folders")
+    parser.add_argument("-w", "--write", action="store_true", help="edit files, else only log what would change")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="nb of processes reading files")
+    parser.add_argument("--no-scan-index", action="store_true", help="read all files, even if unchanged since last scan")
+    parser.add_argument("--no-journal", action="store_true", help="dont backup and journal rewritten files")
+    parser.add_argument("--backup-folder", default=None,
+                        help="folder of backups of rewritten files, ~/update_string_from_ascii/backups by default")
+    parser.add_argument("--max-repeats", type=int, default=None, help="nb of times a same message is logged, all by default")
+    args = parser.parse_args()
+
+    tree_ops = UpdateAsciiString(top_folders=args.top_folders,
+                                 new_string=args.new_string,
+                                 regex_list=args.regex_list,
+                                 exclude_dirs=args.exclude_dirs,
+                                 extensions=args.extensions,
+                                 loadExistingFile=args.load_existing_file,
+                                 write=args.write,
+                                 jobs=args.jobs,
+                                 useScanIndex=not args.no_scan_index,
+                                 useJournal=not args.no_journal,
+                                 backupFolder=args.backup_folder,
+                                 maxRepeats=args.max_repeats)
+    results = tree_ops.execute()
+    tree_ops.extra_logging.info("RESULTS :{}".format(results))
+
+
+if __name__ == "__main__":
+    main()
+
+
 # if __name__ == "__main__":
 #     top_folders = "L:/Millimages/PirataEtCapitano/PirataEtCapitano02/ProjectFiles/assets/TestBalloonFish01"
-#     # Folder you don't want to edit / In case of crash, put already treated asset folders name in exclude_dirs
+#     # Folder you don't want to edit / In case of crash, run again: files in jsons/rewrite_journal.jsonl are skipped
 #     exclude_dirs = ["reference", 'jobs', 'DSN', 'review', 'tmp', 'photoshop', 'substancepainter', 'aftereffects', 'image', 'cache', 'fbx', 'alembic']
 #     # Type of ascii file you want to edit (, .ma, .nk, ...)
 #     extensions = [".ma"]
@@ -6,15 +6,325 @@
 #   DESCRIPTION :       Custom logger, usefull for debug (used in a lot of our tools)
 #
 #   Update  1.0.0 :     We start here.
+#           1.1.0 :     Queue mode: records are written by a background thread, by batches.
+#                       Json lines handler, and aggregation of repeated messages.
+#           1.2.0 :     Timings: spans and decorator recording wall / cpu time, calls and nesting,
+#                       written as a summary table and a chrome trace (chrome://tracing).
 #
-#   KnownBugs :         None atm.
+#   KnownBugs :         Aggregation keeps a counter for each different message until stop_logger.
 # ------------------------------------------------------------------------------------------------------------------------------------- #
 # ------------------------------------------------------------------------------------------------------------------------------------- #
 
+import atexit
+import contextlib
+import functools
 import os
 import logging
 import logging.config
 import json
+import threading
+import time
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+
+# records waiting to be written, logging blocks when queue is full
+QUEUE_SIZE = 100000
+# max records written between two flushes
+BATCH_SIZE = 1000
+# max spans kept for the chrome trace, older ones are still counted in the summary
+MAX_TRACE_EVENTS = 100000
+
+get_wall_time = getattr(time, "perf_counter", time.time)
+# time.clock of python 2 is the wall time on windows
+get_cpu_time = getattr(time, "process_time", None) or (lambda: sum(os.times()[:2]))
+
+
+class QueueHandler(logging.Handler):
+    """
+    Put records in a queue, they are written by a QueueListener.
+    (logging.handlers.QueueHandler doesnt exist in python 2)
+    """
+    def __init__(self, record_queue):
+        logging.Handler.__init__(self)
+        self.queue = record_queue
+
+    def emit(self, record):
+        try:
+            # args can be changed by caller before record is written
+            record.msg = record.getMessage()
+            record.args = None
+            self.queue.put(record)
+        except Exception:
+            self.handleError(record)
+
+
+def write_batch(handler, records):
+    """
+    Write records with handler, stream handlers are flushed once for all records.
+    :param: handler => logging.Handler
+    :param: records => list of logging.LogRecord
+    """
+    handler.acquire()
+    try:
+        flush = handler.flush
+        # emit of stream handlers flushes after each record
+        handler.flush = lambda: None
+        try:
+            for record in records:
+                if record.levelno >= handler.level:
+                    handler.handle(record)
+        finally:
+            del handler.flush
+        flush()
+    finally:
+        handler.release()
+
+
+class QueueListener(object):
+    """
+    Background thread writing records of a queue with handlers.
+    Ex:
+        listener = QueueListener(record_queue, handlers)
+        listener.start()
+        ...
+        listener.stop()
+    """
+    _sentinel = None
+
+    def __init__(self, record_queue, handlers, batch_size=BATCH_SIZE):
+        self.queue = record_queue
+        self.handlers = handlers
+        self.batch_size = batch_size
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.monitor, name="ExtraLoggerListener")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def monitor(self):
+        """
+        Wait for a record, then take all records already in queue and write them together.
+        """
+        running = True
+        while running:
+            batch = []
+            record = self.queue.get()
+            while True:
+                if record is self._sentinel:
+                    running = False
+                    break
+                batch.append(record)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    record = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+            for handler in self.handlers:
+                try:
+                    write_batch(handler, batch)
+                except Exception:
+                    for record in batch:
+                        handler.handleError(record)
+
+    def stop(self):
+        """
+        Write records left in queue, and wait for thread.
+        """
+        if self.thread is not None:
+            self.queue.put(self._sentinel)
+            self.thread.join()
+            self.thread = None
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One json object per record: {"time", "level", "logger", "message", "data", "exception"}
+    data is given by the caller: logger.info(message, extra={"data": {...}})
+    """
+    def format(self, record):
+        entry = {"time": self.formatTime(record),
+                 "level": record.levelname,
+                 "logger": record.name,
+                 "message": record.getMessage()}
+        data = getattr(record, "data", None)
+        if data is not None:
+            entry["data"] = data
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, sort_keys=True)
+
+
+class JsonLinesHandler(logging.FileHandler):
+    """
+    Write records in a .jsonl file, one json object per line (see JsonFormatter)
+    """
+    def __init__(self, filename, mode="a", encoding="utf8", delay=True):
+        logging.FileHandler.__init__(self, filename, mode=mode, encoding=encoding, delay=delay)
+        self.setFormatter(JsonFormatter())
+
+
+class AggregateFilter(logging.Filter):
+    """
+    Let the first max_repeats records of a message pass, and count the others.
+    Counts are logged by ExtraLogger.stop_logger, see get_summary.
+    Filters of a logger dont see records of its child loggers: add it to handlers.
+    A record going through many handlers is counted once.
+    """
+    def __init__(self, max_repeats=10):
+        logging.Filter.__init__(self)
+        self.max_repeats = max(1, max_repeats)
+        self.counts = {}
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        # answer of each filter, stored in record for its next handlers
+        answers = record.__dict__.setdefault("aggregate_answers", {})
+        if id(self) not in answers:
+            key = (record.name, record.levelno, record.getMessage())
+            with self.lock:
+                count = self.counts.get(key, 0) + 1
+                self.counts[key] = count
+            answers[id(self)] = count <= self.max_repeats
+        return answers[id(self)]
+
+    def get_summary(self):
+        """
+        :return: (logger name, level, message, nb of records not written) of each message repeated too much
+        :rtype: list
+        """
+        return [(name, level, message, count - self.max_repeats)
+                for (name, level, message), count in sorted(self.counts.items())
+                if count > self.max_repeats]
+
+
+class Timings(object):
+    """
+    Wall and cpu time of spans, by nesting path.
+    Ex:
+        with TIMINGS.span("update_master_sets"):
+            ...
+        @timed()
+        def update_elt_default(self):
+            ...
+        logging.info(TIMINGS.get_summary_table())
+        TIMINGS.write_trace(trace_path)
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.start_time = get_wall_time()
+            # (parent name, ..., name) => {"calls", "wall", "cpu"}
+            self.stats = {}
+            # path => wall time of its children, children are closed before their parent
+            self.children_wall = {}
+            self.paths = []
+            self.events = []
+        self.local = threading.local()
+
+    def get_stack(self):
+        if not hasattr(self.local, "stack"):
+            self.local.stack = []
+        return self.local.stack
+
+    @contextlib.contextmanager
+    def span(self, name, **args):
+        """
+        :param: name => name of span, spans opened in it are its children
+        :param: args => written in the trace event, eg mesh=mesh
+        """
+        stack = self.get_stack()
+        stack.append(name)
+        path = tuple(stack)
+        wall_start = get_wall_time()
+        cpu_start = get_cpu_time()
+        try:
+            yield
+        finally:
+            wall = get_wall_time() - wall_start
+            cpu = get_cpu_time() - cpu_start
+            stack.pop()
+            self.add(path, wall_start, wall, cpu, args)
+
+    def add(self, path, wall_start, wall, cpu, args=None):
+        with self.lock:
+            stats = self.stats.get(path)
+            if stats is None:
+                stats = self.stats[path] = {"calls": 0, "wall": 0.0, "cpu": 0.0}
+                self.paths.append(path)
+            stats["calls"] += 1
+            stats["wall"] += wall
+            stats["cpu"] += cpu
+            self.children_wall[path[:-1]] = self.children_wall.get(path[:-1], 0.0) + wall
+            if len(self.events) < MAX_TRACE_EVENTS:
+                self.events.append({"name": path[-1], "ph": "X", "pid": os.getpid(),
+                                    "tid": threading.current_thread().ident,
+                                    "ts": int((wall_start - self.start_time) * 1000000), "dur": int(wall * 1000000),
+                                    "args": dict(args or {}, cpu=round(cpu, 6))})
+
+    def timed(self, name=None):
+        """
+        Decorator: each call of the function is a span
+        :param: name => name of span, name of function by default
+        """
+        def decorator(function):
+            span_name = name or getattr(function, "__qualname__", function.__name__)
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.span(span_name):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def get_summary_table(self):
+        """
+        One row per span path, children under their parent. Self is the wall time not spent in children.
+        :rtype: string
+        """
+        with self.lock:
+            # parents are closed after their children: sort paths as a tree, in order of first call
+            order = dict((path, index) for index, path in enumerate(self.paths))
+            paths = sorted(self.paths, key=lambda path: [order.get(path[:depth], -1) for depth in range(1, len(path) + 1)])
+            rows = [("span", "calls", "wall (s)", "mean (s)", "self (s)", "cpu (s)")]
+            for path in paths:
+                stats = self.stats[path]
+                rows.append(("  " * (len(path) - 1) + path[-1], str(stats["calls"]),
+                             "{:.3f}".format(stats["wall"]), "{:.3f}".format(stats["wall"] / stats["calls"]),
+                             "{:.3f}".format(stats["wall"] - self.children_wall.get(path, 0.0)), "{:.3f}".format(stats["cpu"])))
+        widths = [max(len(row[column]) for row in rows) for column in range(len(rows[0]))]
+        lines = []
+        for row in rows:
+            cells = [row[0].ljust(widths[0])] + [cell.rjust(width) for cell, width in zip(row[1:], widths[1:])]
+            lines.append("  ".join(cells))
+        return "\n".join(lines)
+
+    def write_trace(self, trace_path):
+        """
+        :param: trace_path => .json file, opened by chrome://tracing or https://ui.perfetto.dev
+        """
+        folder = os.path.dirname(trace_path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        with self.lock:
+            trace = {"traceEvents": list(self.events), "displayTimeUnit": "ms"}
+        with open(trace_path, "w") as trace_file:
+            json.dump(trace, trace_file)
+
+
+# timings of code outside of a tool, never reset: each tool times its run in its own Timings
+TIMINGS = Timings()
+span = TIMINGS.span
+timed = TIMINGS.timed
 
 
 class ExtraLogger(object):
@@ -22,8 +332,41 @@ class ExtraLogger(object):
     Custom logger for TDs
     logging_config.json should always be in the same folder as extra_logger.py
     You can use another logging_config if needed.
+    Ex:
+        extra_logger = ExtraLogger()
+        extra_logger.execute_logger(logs_path, use_queue=True, max_repeats=10)
+        ...
+        extra_logger.stop_logger()
     """
-    def execute_logger(self, logs_path, logs_config=os.path.join(os.path.dirname(os.path.realpath(__file__)), 'logging_config.json')):
+    def __init__(self):
+        self.logger = None
+        self.listener = None
+        self.aggregate_filter = None
+        self.handlers = []
+        # own timings, a logger started by another tool doesnt reset them
+        self.timings = Timings()
+        self.trace_path = None
+        atexit.register(self.stop_logger)
+
+    def span(self, name, **args):
+        """
+        Time a step of the tool, see Timings.span
+        """
+        return self.timings.span(name, **args)
+
+    def execute_logger(self, logs_path, logs_config=os.path.join(os.path.dirname(os.path.realpath(__file__)), 'logging_config.json'),
+                       use_queue=False, json_path=None, max_repeats=None, trace_path=None):
+        """
+        :param: logs_path => log file
+        :param: logs_config => dictConfig of logging, as json
+        :param: use_queue => True to write records in a background thread, logging only puts them in a queue
+        :param: json_path => .jsonl file where records are written too, None for no json
+        :param: max_repeats => nb of times a same message is written, None to write all records
+        :param: trace_path => .json where spans are written by stop_logger, None for no trace
+        """
+        self.stop_logger()
+        self.timings.reset()
+        self.trace_path = trace_path
         # Where the logs should be saved. Logs should always be in a "logs" folder!
         log_folder = os.path.dirname(logs_path)
         if not os.path.exists(log_folder):
@@ -35,6 +378,54 @@ class ExtraLogger(object):
             logging.config.dictConfig(config)
         self.logger = logging.getLogger()
 
+        if json_path:
+            json_handler = JsonLinesHandler(json_path)
+            json_handler.setLevel(logging.DEBUG)
+            self.logger.addHandler(json_handler)
+        if use_queue:
+            # handlers of config are moved behind the queue
+            self.handlers = list(self.logger.handlers)
+            for handler in self.handlers:
+                self.logger.removeHandler(handler)
+            record_queue = queue.Queue(QUEUE_SIZE)
+            self.listener = QueueListener(record_queue, self.handlers)
+            self.logger.addHandler(QueueHandler(record_queue))
+            self.listener.start()
+        if max_repeats:
+            # on handlers of root (the queue handler in queue mode), to see records of all loggers
+            self.aggregate_filter = AggregateFilter(max_repeats)
+            for handler in self.logger.handlers:
+                handler.addFilter(self.aggregate_filter)
+
+    def stop_logger(self):
+        """
+        Log the summary of timings and of repeated messages, write records left in queue,
+        then handlers of config are used directly again.
+        """
+        if self.logger is not None and self.timings.stats:
+            self.logger.info("Timings:\n{}".format(self.timings.get_summary_table()))
+            if self.trace_path:
+                self.timings.write_trace(self.trace_path)
+                self.logger.info("Trace written in {}".format(self.trace_path))
+                self.trace_path = None
+            self.timings.reset()
+        if self.aggregate_filter is not None:
+            for handler in self.logger.handlers:
+                handler.removeFilter(self.aggregate_filter)
+            for name, level, message, count in self.aggregate_filter.get_summary():
+                logging.getLogger(name).log(level, 'Repeated {} more times: {}'.format(count, message),
+                                            extra={"data": {"repeated": count}})
+            self.aggregate_filter = None
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+            for handler in list(self.logger.handlers):
+                if isinstance(handler, QueueHandler):
+                    self.logger.removeHandler(handler)
+            for handler in self.handlers:
+                self.logger.addHandler(handler)
+            self.handlers = []
+
 # if __name__ == "__main__":
 #     log_path = r'\\srv-data1\Roaming_profile$\n.dorey\Desktop\tests\masterscene\logs\remove_redshift_stuff.log'
 #     ExtraLogger().execute_logger(log_path)
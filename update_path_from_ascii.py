@@ -1,9 +1,11 @@
 import os
-import re
 import logging
 import json
 from datetime import datetime
 
+from libs.mayaascii import updates as mayaascii_updates
+from libs.system import crawler
+
 
 
 # Path to change: path_to_walk_on
@@ -11,40 +13,69 @@ path_to_walk_on = os.path.normpath(r"\\srv-data1\Roaming_profile$\n.dorey\Deskto
 
 
 # Update maya ascii scene from path_to_walk_on
-update_server_path_log = "{}\update_server_path_log.json".format(path_to_walk_on)
-regex = r"(P:.*Pirata2\/|P:.*Pirata2\\)"
+update_server_path_log = os.path.join(path_to_walk_on, "update_server_path_log.json")
 new_assets_path = "L:/Millimages/PirataEtCapitano/PirataEtCapitano02/ProjectFiles"
+# Old roots => new roots, the first one starting a path is used (case and separators are ignored)
+path_mapping = [
+    ("P:/Pirata2/", new_assets_path + "/"),
+]
+# Every path on these roots should be remapped: the ones no root of path_mapping starts are logged as errors,
+# add their root in path_mapping (the old regex took anything between P: and Pirata2/)
+unmapped_roots = ["P:"]
 obsolete_list = ["SCALE3", "Roaming_profile", "C:", "D:", "E:"]
-# In case of crash, put already treated asset folders name in exception_directory
+# Folders not to go in
 exception_directory = ["reference"]
 maya_extension = ".ma"
-# Get list of maya file in path_to_walk_on directory
-maya_files_list = [os.path.join(root, x) for root, dirs, files in os.walk(path_to_walk_on) for x in files if x.endswith(maya_extension)]
-data_list_logs = []
-# Time log
-current_time = datetime.now().strftime("%Y/%m/%d - %H:%M:%S")
-time_log = "UPDATE DATE: {}".format(current_time)
-logging.info(time_log)
-data_list_logs.append(time_log)
-# Edit ascii from each scene not in exception_directory
-for maya_file_found in maya_files_list:
-    for except_dir in exception_directory:
-        if except_dir not in maya_file_found:
-            data = 'Working on "{}"'.format(maya_file_found)
+# False to only log what would change
+write = True
+# Nb of processes, None for nb of cpus
+processes = None
+# Folders content cached by the crawler, kept with the tool and not in the tree to migrate
+crawl_manifest_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "jsons", "crawl_manifest.json")
+
+
+def main():
+    """
+    Remap paths of maya files of path_to_walk_on.
+    Run under if __name__ == "__main__": processes of remap_files import this script again.
+    """
+    # Get list of maya file in path_to_walk_on directory
+    maya_files_list = crawler.get_files(path_to_walk_on, exclude_dirs=exception_directory, extensions=[maya_extension],
+                                        manifest_path=crawl_manifest_path)
+    data_list_logs = []
+    # Time log
+    current_time = datetime.now().strftime("%Y/%m/%d - %H:%M:%S")
+    time_log = "UPDATE DATE: {}".format(current_time)
+    logging.info(time_log)
+    data_list_logs.append(time_log)
+    # Remap paths of each scene, only scenes with something to remap are written
+    results = mayaascii_updates.remap_files(maya_files_list, path_mapping, obsolete_roots=obsolete_list,
+                                            write=write, processes=processes, unmapped_roots=unmapped_roots)
+    for result in results:
+        data = 'Working on "{}"'.format(result["path"])
+        data_list_logs.append(data)
+        logging.info(data)
+        for old_path, new_path in result["remapped"]:
+            data = '"{}" --> "{}"'.format(old_path, new_path)
             data_list_logs.append(data)
             logging.info(data)
-            # Open and write maya ascii
-            with open(maya_file_found, 'r') as input_file:
-                content = input_file.read()
-                content_new = re.sub(regex, new_assets_path, content)
-                for obsolete_tag in obsolete_list:
-                    if obsolete_tag in content:
-                        data = 'Obsolete tag "{}" found in "{}"!'.format(obsolete_tag, maya_file_found)
-                        data_list_logs.append(data)
-                        logging.error(data)
-            with open(maya_file_found, 'w') as output_file:
-                output_file.write(content_new)
-
-# Save logs in a json file
-with open(update_server_path_log, 'a') as f:
-    json.dump(data_list_logs, f, indent=4)
+        for path in result["unmapped"]:
+            data = 'Path "{}" found in "{}" is not remapped, its root is not in path_mapping!'.format(path, result["path"])
+            data_list_logs.append(data)
+            logging.error(data)
+        for obsolete_tag, path in result["obsolete"]:
+            data = 'Obsolete tag "{}" found in "{}" ("{}")!'.format(obsolete_tag, result["path"], path)
+            data_list_logs.append(data)
+            logging.error(data)
+        for warning in result["warnings"]:
+            data = '{}: {}'.format(result["path"], warning)
+            data_list_logs.append(data)
+            logging.warning(data)
+
+    # Save logs in a json file
+    with open(update_server_path_log, 'a') as f:
+        json.dump(data_list_logs, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()